@@ -0,0 +1 @@
+"""Benchmarks of dotty on synthetic data, see ``python -m benchmarks.run --help``."""
@@ -0,0 +1,274 @@
+"""Benchmark startup, memory and latency of dotty on synthetic data.
+
+Generates synthetic data with ``benchmarks.synthetic`` unless present, then measures the time
+and the peak memory of loading the data and building the indexes as on server startup, and
+the throughput and latency of sequential ``to-spdi``, ``find-transcripts`` and ``find-genes``
+requests, and the speedup of the fast path for parsing simple variants.  The results are written as JSON and can be compared against the results of an
+earlier run, e.g., of the main branch, to catch regressions.
+
+Run as ``python -m benchmarks.run --genes 60000 --baseline main.json --output results.json``.
+"""
+
+import argparse
+import contextlib
+import json
+import logging
+import pathlib
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import typing
+import urllib.parse
+from unittest import mock
+
+from fastapi.testclient import TestClient
+
+from benchmarks import synthetic
+from dotty import main as dotty_main
+from dotty.config import settings
+from dotty.core import Assembly
+from dotty.metrics import LOAD_DURATION
+from dotty.parser import FastParser
+
+#: Logger used in this module.
+_logger = logging.getLogger(__name__)
+
+#: Results where more is better, the others are better when lower.
+HIGHER_IS_BETTER = ("throughput", "speedup")
+
+
+def _percentile(values: list[float], percent: float) -> float:
+    """Return the nearest-rank ``percent`` percentile of ``values``."""
+    values = sorted(values)
+    return values[max(0, min(len(values) - 1, round(percent / 100 * len(values)) - 1))]
+
+
+def _latency_stats(latencies: list[float]) -> dict[str, float]:
+    """Summarize the latencies in seconds of sequential requests."""
+    return {
+        "throughput": len(latencies) / sum(latencies),
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p99_ms": _percentile(latencies, 99) * 1000,
+    }
+
+
+def _time_requests(client: TestClient, urls: list[str]) -> tuple[list[float], int]:
+    """Request ``urls`` one after another, return the latencies and the number of errors.
+
+    Requests fail if the HTTP status is not 200 or, for ``to-spdi``, the result is not a
+    success.
+    """
+    latencies = []
+    errors = 0
+    for url in urls:
+        start_time = time.perf_counter()
+        response = client.get(url)
+        latencies.append(time.perf_counter() - start_time)
+        if response.status_code != 200 or response.json().get("success") is False:
+            _logger.debug("Request %s failed: %s", url, response.text)
+            errors += 1
+    return latencies, errors
+
+
+def _parse_stats(parser: FastParser, variants: list[str]) -> dict[str, float]:
+    """Time parsing ``variants`` with the fast path for simple variants and with the grammar
+    only, in microseconds per variant."""
+    times = {}
+    for name, parse in (("fast_us", parser.parse), ("grammar_us", parser.parser.parse)):
+        start_time = time.perf_counter()
+        for variant in variants:
+            parse(variant)
+        times[name] = (time.perf_counter() - start_time) / len(variants) * 1e6
+    return {"requests": len(variants), **times, "speedup": times["grammar_us"] / times["fast_us"]}
+
+
+def _peak_rss_mb() -> float:
+    """Return the peak resident set size of this process in MiB."""
+    # ``ru_maxrss`` is in KiB on Linux, in bytes on macOS.
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def run(data_dir: pathlib.Path, requests: int = 2000, seed: int = 0) -> dict[str, typing.Any]:
+    """Benchmark dotty on the synthetic data in ``data_dir``.
+
+    ``requests`` variants and HGNC IDs are sampled for the request benchmarks.
+    """
+    params = synthetic.read_params(data_dir)
+    for path in data_dir.glob("*.hgnc-index.json"):
+        path.unlink()  # measure building the index
+    with contextlib.ExitStack() as stack:
+        # Load the data into the app as on startup, restore the app afterwards.
+        stack.enter_context(
+            mock.patch.multiple(
+                settings,
+                DATA_DIR=str(data_dir),
+                DATA_VERSION=params["data_version"],
+                HAVE_SEQREPO=True,
+            )
+        )
+        stack.enter_context(
+            mock.patch.multiple(
+                dotty_main,
+                Driver=synthetic.SyntheticDriver,
+                driver=None,
+                data_loaded=False,
+                hgnc_to_transcripts={},
+                assembly_to_hgnc_to_transcripts={},
+                gene_index=dotty_main.GeneIndex(),
+                transcript_responses={},
+            )
+        )
+        # Measure the projection, not the result cache or the worker pool.
+        stack.enter_context(mock.patch.object(dotty_main.result_cache, "max_size", 0))
+        stack.enter_context(
+            mock.patch.object(dotty_main.dispatcher, "mode", dotty_main.ExecutionMode.INLINE)
+        )
+        start_time = time.perf_counter()
+        dotty_main.load_data()
+        load_seconds = time.perf_counter() - start_time
+        results: dict[str, typing.Any] = {
+            "params": params,
+            "load_seconds": load_seconds,
+            "load_stages": {labels[0]: value for labels, value in LOAD_DURATION.samples()},
+            "peak_rss_mb": _peak_rss_mb(),
+        }
+
+        rng = random.Random(seed)
+        with (data_dir / synthetic.VARIANTS_FILE_NAME).open("rt") as inputf:
+            variants = [line.strip() for line in inputf if line.strip()]
+        hgnc_ids = list(dotty_main.assembly_to_hgnc_to_transcripts[Assembly.GRCH38])
+        symbols = [gene.symbol for gene in dotty_main.gene_index.genes.values()]
+        client = TestClient(dotty_main.app)
+        for name, urls in (
+            (
+                "to_spdi",
+                [
+                    f"/api/v1/to-spdi?q={urllib.parse.quote(q)}"
+                    for q in rng.sample(variants, min(requests, len(variants)))
+                ],
+            ),
+            (
+                "find_transcripts",
+                [
+                    f"/api/v1/find-transcripts?hgnc_id={hgnc_id}"
+                    for hgnc_id in rng.sample(hgnc_ids, min(requests, len(hgnc_ids)))
+                ],
+            ),
+            (
+                "find_genes",
+                [
+                    f"/api/v1/find-genes?q={symbol[:4]}&prefix=true"
+                    for symbol in rng.sample(symbols, min(requests, len(symbols)))
+                ],
+            ),
+        ):
+            latencies, errors = _time_requests(client, urls)
+            results[name] = {"requests": len(urls), "errors": errors, **_latency_stats(latencies)}
+            _logger.info("%s: %s", name, results[name])
+        results["parse"] = _parse_stats(
+            dotty_main.driver.parser,
+            rng.sample(variants, min(requests, len(variants))),
+        )
+        _logger.info("parse: %s", results["parse"])
+    return results
+
+
+def _iter_numbers(
+    results: dict[str, typing.Any], prefix: str = ""
+) -> typing.Iterator[tuple[str, float]]:
+    """Yield the measured numbers of ``results`` by dotted name."""
+    for key, value in results.items():
+        if key in ("params", "load_stages"):
+            continue
+        if isinstance(value, dict):
+            yield from _iter_numbers(value, f"{prefix}{key}.")
+        elif isinstance(value, (int, float)):
+            yield f"{prefix}{key}", value
+
+
+def compare(
+    baseline: dict[str, typing.Any], results: dict[str, typing.Any], tolerance: float
+) -> list[str]:
+    """Return descriptions of the results that are worse than ``baseline`` by more than the
+    relative ``tolerance``."""
+    baseline_numbers = dict(_iter_numbers(baseline))
+    regressions = []
+    for name, value in _iter_numbers(results):
+        old = baseline_numbers.get(name)
+        if name.endswith(".errors") and value > (old or 0):
+            regressions.append(f"{name}: {old} -> {value}")
+        if not old or name.endswith((".requests", ".errors")):
+            continue
+        change = (value - old) / old
+        if name.rsplit(".", 1)[-1] in HIGHER_IS_BETTER:
+            change = -change
+        if change > tolerance:
+            regressions.append(f"{name}: {old:.4g} -> {value:.4g} ({change:+.0%} worse)")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Entry point of ``python -m benchmarks.run``."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--data-dir",
+        type=pathlib.Path,
+        help="Directory with the synthetic data, generated if empty; a temporary directory "
+        "by default",
+    )
+    synthetic.add_arguments(parser)
+    parser.add_argument(
+        "--requests", type=int, default=2000, help="Number of requests per endpoint"
+    )
+    parser.add_argument("--output", type=pathlib.Path, help="File to write the results to")
+    parser.add_argument("--baseline", type=pathlib.Path, help="Results to compare against")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Relative change over the baseline that counts as regression",
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_dir = args.data_dir or pathlib.Path(tmp_dir)
+        if not (data_dir / synthetic.PARAMS_FILE_NAME).exists():
+            # Generate in another process so it does not count towards the peak memory.
+            subprocess.run(
+                [
+                    sys.executable,
+                    "-m",
+                    "benchmarks.synthetic",
+                    str(data_dir),
+                    f"--genes={args.genes}",
+                    f"--transcripts-per-gene={args.transcripts_per_gene}",
+                    f"--exons={args.exons}",
+                    f"--variants={args.variants}",
+                    f"--seed={args.seed}",
+                    f"--data-version={args.data_version}",
+                ],
+                check=True,
+            )
+        results = run(data_dir, requests=args.requests, seed=args.seed)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        args.output.write_text(output + "\n")
+    else:
+        print(output)
+    if args.baseline:
+        regressions = compare(json.loads(args.baseline.read_text()), results, args.tolerance)
+        for regression in regressions:
+            _logger.error("Regression of %s", regression)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,354 @@
+"""Synthetic cdot data of configurable size with an in-memory reference genome.
+
+The data is generated reproducibly from a seed: genes placed at random on the chromosomes of
+both assemblies, each with RefSeq and Ensembl transcripts that use subsets of the exons of
+the gene.  The reference sequence of each contig is a random pattern that is repeated, so it
+takes no space.  Along with the cdot files, a file of variants on the transcripts and contigs
+is written, with the correct reference alleles.
+
+Run as ``python -m benchmarks.synthetic --genes 60000 --transcripts-per-gene 3 DIR``.
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import pathlib
+import random
+import sys
+import typing
+
+import bioutils.assemblies
+from bioutils.sequences import reverse_complement
+
+from dotty.config import settings
+from dotty.core import Assembly, Driver, cdot_file_names
+from dotty.seqfetcher import GenomeSeqFetcher
+
+#: Logger used in this module.
+_logger = logging.getLogger(__name__)
+
+#: Name of the file with the parameters the data was generated with.
+PARAMS_FILE_NAME = "synthetic.json"
+
+#: Name of the file with the variants on the synthetic data, one per line.
+VARIANTS_FILE_NAME = "variants.txt"
+
+#: Length of the pattern that the synthetic reference sequences repeat.
+PATTERN_LENGTH = 1 << 16
+
+#: An exon of a gene, as interbase genomic start and end.
+Exon = tuple[int, int]
+
+
+def _chromosomes(assembly: Assembly) -> list[tuple[str, int]]:
+    """Return the RefSeq accessions and lengths of the chromosomes of ``assembly``."""
+    return [
+        (sr["refseq_ac"], sr["length"])
+        for sr in bioutils.assemblies.get_assembly(assembly.value)["sequences"]
+        if sr["sequence_role"] == "assembled-molecule" and sr["name"] != "MT"
+    ]
+
+
+class SyntheticGenome:
+    """In-memory reference genome of ``assembly``: each contig repeats a random pattern."""
+
+    def __init__(self, assembly: Assembly, seed: int = 0):
+        #: The lengths of the contigs by accession.
+        self.lengths = dict(_chromosomes(assembly))
+        #: The seed of the patterns.
+        self.seed = seed
+        #: The patterns of the contigs, repeated twice.
+        self._patterns: dict[str, str] = {}
+
+    @property
+    def references(self) -> list[str]:
+        """The accessions of the contigs."""
+        return list(self.lengths)
+
+    def _pattern(self, reference: str) -> str:
+        """Return the pattern of ``reference``, repeated twice."""
+        if reference not in self._patterns:
+            rng = random.Random(f"{self.seed}:{reference}")
+            pattern = "".join(rng.choices("ACGT", k=PATTERN_LENGTH))
+            self._patterns[reference] = pattern + pattern
+        return self._patterns[reference]
+
+    def fetch(
+        self, reference: str | None = None, start: int | None = None, end: int | None = None
+    ) -> str:
+        """Return the interbase range ``[start, end)`` of contig ``reference``."""
+        reference = typing.cast(str, reference)
+        length = self.lengths[reference]
+        start = min(max(0, start or 0), length)
+        end = length if end is None else min(max(start, end), length)
+        pattern = self._pattern(reference)
+        chunks = []
+        while start < end:
+            offset = start % PATTERN_LENGTH
+            chunks.append(pattern[offset : offset + min(end - start, PATTERN_LENGTH)])
+            start += len(chunks[-1])
+        return "".join(chunks)
+
+
+def read_params(data_dir: pathlib.Path) -> dict[str, typing.Any]:
+    """Read the parameters that the synthetic data in ``data_dir`` was generated with."""
+    with (data_dir / PARAMS_FILE_NAME).open("rt") as inputf:
+        return json.load(inputf)
+
+
+class SyntheticDriver(Driver):
+    """Driver that reads the reference sequences from ``SyntheticGenome``."""
+
+    def _create_genome_seq_fetcher(self, assembly: Assembly) -> GenomeSeqFetcher | None:
+        genome = SyntheticGenome(assembly, read_params(self.cdot_dir)["seed"])
+        return GenomeSeqFetcher(
+            f"synthetic-{assembly.value}",
+            {ac: ac for ac in genome.references},
+            genome=genome,
+        )
+
+
+class _Transcript(typing.NamedTuple):
+    """A generated transcript, for creating variants on it."""
+
+    #: The accession of the transcript.
+    ac: str
+    #: The accession of the contig.
+    contig: str
+    #: ``+`` or ``-``.
+    strand: str
+    #: The exons, sorted by genomic position.
+    exons: list[Exon]
+    #: 0-based offsets of the first base of the CDS and after its last base, if coding.
+    cds: tuple[int, int] | None
+
+
+def _tx_to_g(exons: list[Exon], strand: str, offset: int) -> int:
+    """Return the genomic position of the base at the 0-based ``offset`` in the transcript."""
+    for start, end in exons if strand == "+" else reversed(exons):
+        if offset < end - start:
+            return start + offset if strand == "+" else end - 1 - offset
+        offset -= end - start
+    raise ValueError("Offset beyond end of transcript")
+
+
+def _transcript_record(
+    tx: _Transcript,
+    assembly: Assembly,
+    gene: dict[str, typing.Any],
+    gene_version: str,
+    protein: str | None,
+) -> dict[str, typing.Any]:
+    """Return the cdot record of ``tx``."""
+    tx_exons = tx.exons if tx.strand == "+" else list(reversed(tx.exons))
+    exon_records = []
+    tx_start = 1
+    for exon_no, (start, end) in enumerate(tx_exons):
+        exon_records.append([start, end, exon_no, tx_start, tx_start + end - start - 1, None])
+        tx_start += end - start
+    build_data: dict[str, typing.Any] = {
+        "contig": tx.contig,
+        "strand": tx.strand,
+        "exons": sorted(exon_records),
+    }
+    record: dict[str, typing.Any] = {
+        "id": tx.ac,
+        "gene_name": gene["gene_symbol"],
+        "gene_version": gene_version,
+        "hgnc": gene["hgnc"],
+        "biotype": gene["biotype"],
+        "genome_builds": {assembly.value: build_data},
+    }
+    if tx.cds is not None:
+        first = _tx_to_g(tx.exons, tx.strand, tx.cds[0])
+        last = _tx_to_g(tx.exons, tx.strand, tx.cds[1] - 1)
+        build_data["cds_start"], build_data["cds_end"] = min(first, last), max(first, last) + 1
+        record["start_codon"], record["stop_codon"] = tx.cds
+        record["protein"] = protein
+    return record
+
+
+def _variant(rng: random.Random, genome: SyntheticGenome, tx: _Transcript) -> str:
+    """Return a random variant on ``tx``, or on its contig."""
+    if tx.cds is None:
+        prefix, first_offset, length = "n", 0, sum(end - start for start, end in tx.exons)
+    else:
+        prefix, first_offset, length = "c", tx.cds[0], tx.cds[1] - tx.cds[0]
+    pos = rng.randint(1, length - 1)
+    g_pos = _tx_to_g(tx.exons, tx.strand, first_offset + pos - 1)
+    ref = genome.fetch(tx.contig, g_pos, g_pos + 1)
+    kind = rng.random()
+    if kind < 0.05:
+        alt = rng.choice([base for base in "ACGT" if base != ref])
+        return f"{tx.contig}:g.{g_pos + 1}{ref}>{alt}"
+    if tx.strand == "-":
+        ref = reverse_complement(ref)
+    if kind < 0.65:
+        alt = rng.choice([base for base in "ACGT" if base != ref])
+        return f"{tx.ac}:{prefix}.{pos}{ref}>{alt}"
+    elif kind < 0.80:
+        return f"{tx.ac}:{prefix}.{pos}del"
+    elif kind < 0.90:
+        return f"{tx.ac}:{prefix}.{pos}dup"
+    else:
+        return f"{tx.ac}:{prefix}.{pos}_{pos + 1}ins{rng.choice('ACGT') * rng.randint(1, 3)}"
+
+
+def generate(
+    data_dir: pathlib.Path,
+    genes: int = 1000,
+    transcripts_per_gene: int = 3,
+    exons: int = 10,
+    variants: int = 10_000,
+    seed: int = 0,
+    data_version: str | None = None,
+):
+    """Write synthetic cdot files of both assemblies and variants on them to ``data_dir``.
+
+    The number of transcripts per gene and exons per transcript varies around the given
+    averages.  The genes are at the same positions on both assemblies.
+    """
+    data_version = data_version or settings.DATA_VERSION
+    rng = random.Random(seed)
+    chromosomes = {assembly: _chromosomes(assembly) for assembly in Assembly}
+    # The genes are placed at the same positions on both assemblies.
+    chrom_lengths = [
+        min(length37, length38)
+        for (_, length37), (_, length38) in zip(
+            chromosomes[Assembly.GRCH37], chromosomes[Assembly.GRCH38]
+        )
+    ]
+    transcripts: dict[Assembly, dict[str, dict[str, typing.Any]]] = {
+        assembly: {"refseq": {}, "ensembl": {}} for assembly in Assembly
+    }
+    gene_records: dict[str, dict[str, typing.Any]] = {"refseq": {}, "ensembl": {}}
+    generated: list[_Transcript] = []
+    tx_no = 0
+    for gene_no in range(genes):
+        gene_exons: list[Exon] = []
+        pos = 0
+        for _ in range(rng.randint(1, 2 * exons - 1)):
+            start = pos + rng.randint(200, 10_000) if gene_exons else pos
+            pos = start + rng.randint(50, 400)
+            gene_exons.append((start, pos))
+        # Place the gene at a random position of the genome.
+        (chrom_no,) = rng.choices(range(len(chrom_lengths)), weights=chrom_lengths)
+        shift = rng.randrange(chrom_lengths[chrom_no] - pos)
+        gene_exons = [(start + shift, end + shift) for start, end in gene_exons]
+        strand = rng.choice("+-")
+        coding = rng.random() < 0.8
+        gene = {
+            "gene_symbol": f"SYN{gene_no}",
+            "hgnc": str(100_000 + gene_no),
+            "aliases": f"SYNA{gene_no}, SYNB{gene_no}",
+            "description": f"synthetic gene {gene_no}",
+            "map_location": "",
+            "summary": "",
+            "biotype": ["protein_coding" if coding else "non_coding"],
+        }
+        gene_ids = {"refseq": str(1_000_000 + gene_no), "ensembl": f"ENSG{gene_no:011d}"}
+        for source, gene_id in gene_ids.items():
+            gene_records[source][gene_id] = gene
+
+        for tx_in_gene in range(rng.randint(1, 2 * transcripts_per_gene - 1)):
+            tx_no += 1
+            # Alternative transcripts skip some of the inner exons.
+            tx_exons = [
+                exon
+                for i, exon in enumerate(gene_exons)
+                if tx_in_gene == 0 or i in (0, len(gene_exons) - 1) or rng.random() < 0.8
+            ]
+            tx_length = sum(end - start for start, end in tx_exons)
+            cds: tuple[int, int] | None = None
+            if coding and tx_length >= 30:
+                cds_start = rng.randint(0, tx_length // 5)
+                cds_length = max(3, (tx_length - cds_start - rng.randint(0, tx_length // 5)))
+                cds = (cds_start, cds_start + min(cds_length, tx_length - cds_start) // 3 * 3)
+            source = "refseq" if tx_in_gene % 2 == 0 else "ensembl"
+            if source == "refseq":
+                ac = f"{'NM' if cds else 'NR'}_{tx_no:09d}.1"
+                protein = f"NP_{tx_no:09d}.1"
+            else:
+                ac = f"ENST{tx_no:011d}.1"
+                protein = f"ENSP{tx_no:011d}.1"
+            for assembly in Assembly:
+                tx = _Transcript(ac, chromosomes[assembly][chrom_no][0], strand, tx_exons, cds)
+                transcripts[assembly][source][ac] = _transcript_record(
+                    tx, assembly, gene, gene_ids[source], protein
+                )
+                if assembly == Assembly.GRCH38:
+                    generated.append(tx)
+
+    data_dir.mkdir(parents=True, exist_ok=True)
+    for assembly, file_names in cdot_file_names(data_version).items():
+        for file_name in file_names:
+            source = "ensembl" if ".ensembl." in file_name else "refseq"
+            with gzip.open(data_dir / file_name, "wt", compresslevel=1) as outputf:
+                json.dump(
+                    {
+                        "cdot_version": data_version,
+                        "genome_builds": [assembly.value],
+                        "transcripts": transcripts[assembly][source],
+                        "genes": gene_records[source],
+                    },
+                    outputf,
+                )
+    genome = SyntheticGenome(Assembly.GRCH38, seed)
+    with (data_dir / VARIANTS_FILE_NAME).open("wt") as outputf:
+        for _ in range(variants):
+            outputf.write(_variant(rng, genome, rng.choice(generated)) + "\n")
+    with (data_dir / PARAMS_FILE_NAME).open("wt") as outputf:
+        json.dump(
+            {
+                "genes": genes,
+                "transcripts_per_gene": transcripts_per_gene,
+                "exons": exons,
+                "variants": variants,
+                "seed": seed,
+                "data_version": data_version,
+                "transcripts": len(generated),
+            },
+            outputf,
+        )
+    _logger.info("Wrote %d genes with %d transcripts to %s", genes, len(generated), data_dir)
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """Add the arguments of ``generate()`` to ``parser``."""
+    parser.add_argument("--genes", type=int, default=1000, help="Number of genes")
+    parser.add_argument(
+        "--transcripts-per-gene",
+        type=int,
+        default=3,
+        help="Average number of transcripts per gene",
+    )
+    parser.add_argument(
+        "--exons", type=int, default=10, help="Average number of exons per transcript"
+    )
+    parser.add_argument("--variants", type=int, default=10_000, help="Number of variants")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the random generator")
+    parser.add_argument("--data-version", default=settings.DATA_VERSION, help="cdot version")
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Entry point of ``python -m benchmarks.synthetic``."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("data_dir", type=pathlib.Path, help="Directory to write the data to")
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    generate(
+        args.data_dir,
+        genes=args.genes,
+        transcripts_per_gene=args.transcripts_per_gene,
+        exons=args.exons,
+        variants=args.variants,
+        seed=args.seed,
+        data_version=args.data_version,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
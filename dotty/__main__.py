@@ -0,0 +1,122 @@
+"""Command line interface of dotty, run as ``python -m dotty``."""
+
+import argparse
+import contextlib
+import logging
+import os
+import sys
+import time
+from datetime import timedelta
+
+from dotty.config import settings
+from dotty.convert import convert
+from dotty.core import Assembly, Driver, cdot_file_names, snapshot_file_name
+from dotty.server import serve
+from dotty.snapshot import compile_snapshot
+
+#: Logger used in this module.
+_logger = logging.getLogger(__name__)
+
+
+def compile_data(args: argparse.Namespace) -> int:
+    """Compile the cdot JSON files of each assembly into a snapshot."""
+    file_names = cdot_file_names(args.data_version)
+    for assembly in Assembly:
+        start_time = time.time()
+        compile_snapshot(
+            [f"{args.data_dir}/{fname}" for fname in file_names[assembly]],
+            f"{args.data_dir}/{snapshot_file_name(args.data_version, assembly)}",
+        )
+        elapsed = timedelta(seconds=time.time() - start_time)
+        _logger.info("... compiled %s in %s", assembly.value, elapsed)
+    return 0
+
+
+def convert_variants(args: argparse.Namespace) -> int:
+    """Convert a file of HGVS variants to VCF-style coordinates."""
+    driver = Driver(cdot_dir=args.data_dir, data_version=args.data_version)
+    driver.load()
+    with contextlib.ExitStack() as stack:
+        inputf = sys.stdin if args.input == "-" else stack.enter_context(open(args.input, "rt"))
+        outputf = sys.stdout if args.output == "-" else stack.enter_context(open(args.output, "wt"))
+        convert(
+            driver,
+            inputf,
+            outputf,
+            assembly=Assembly(args.assembly),
+            column=args.column - 1,
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+        )
+    return 0
+
+
+def serve_app(args: argparse.Namespace) -> int:
+    """Serve the app with worker processes forked after loading the data."""
+    return serve(args.host, args.port, args.workers, args.log_level)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Entry point of the command line interface."""
+    parser = argparse.ArgumentParser(prog="dotty", description="cdot-based position projection")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    parser_compile = subparsers.add_parser(
+        "compile-data", help="compile cdot JSON files into memory-mappable snapshots"
+    )
+    parser_compile.add_argument(
+        "--data-dir", default=settings.DATA_DIR, help="directory with the cdot files"
+    )
+    parser_compile.add_argument(
+        "--data-version", default=settings.DATA_VERSION, help="version of the cdot files"
+    )
+    parser_compile.set_defaults(func=compile_data)
+
+    parser_convert = subparsers.add_parser(
+        "convert", help="convert a file of HGVS variants to VCF-style coordinates"
+    )
+    parser_convert.add_argument("input", help="text or TSV file with the variants, - for stdin")
+    parser_convert.add_argument(
+        "output", nargs="?", default="-", help="output TSV file, - for stdout (default)"
+    )
+    parser_convert.add_argument(
+        "--assembly",
+        default=Assembly.GRCH38.value,
+        choices=[assembly.value for assembly in Assembly],
+        help="assembly to project to",
+    )
+    parser_convert.add_argument(
+        "--column", type=int, default=1, help="1-based column of the variant in the input"
+    )
+    parser_convert.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1, help="number of worker processes"
+    )
+    parser_convert.add_argument(
+        "--chunk-size", type=int, default=1000, help="number of variants per unit of work"
+    )
+    parser_convert.add_argument(
+        "--data-dir", default=settings.DATA_DIR, help="directory with the cdot files"
+    )
+    parser_convert.add_argument(
+        "--data-version", default=settings.DATA_VERSION, help="version of the cdot files"
+    )
+    parser_convert.set_defaults(func=convert_variants)
+
+    parser_serve = subparsers.add_parser(
+        "serve", help="serve the app with worker processes forked after loading the data"
+    )
+    parser_serve.add_argument("--host", default="127.0.0.1", help="address to bind to")
+    parser_serve.add_argument("--port", type=int, default=8080, help="port to bind to")
+    parser_serve.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1, help="number of worker processes"
+    )
+    parser_serve.add_argument("--log-level", default="info", help="uvicorn log level")
+    parser_serve.set_defaults(func=serve_app)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    return args.func(args)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
@@ -0,0 +1,259 @@
+"""Bounded in-process and persistent caches for query results, and coalescing of identical
+queries."""
+
+import asyncio
+import collections
+import logging
+import os
+import sqlite3
+import threading
+import time
+import typing
+
+#: Logger used in this module.
+_logger = logging.getLogger(__name__)
+
+#: Type of the cache keys.
+K = typing.TypeVar("K")
+#: Type of the cached values.
+V = typing.TypeVar("V")
+
+
+class ResultCache(typing.Generic[K, V]):
+    """Thread-safe LRU cache with a maximal size and optional time-to-live."""
+
+    def __init__(self, max_size: int, ttl: float = 0):
+        #: Maximal number of entries, ``0`` disables the cache.
+        self.max_size = max_size
+        #: Time-to-live of entries in seconds, ``0`` for no expiry.
+        self.ttl = ttl
+        #: Number of lookups that found an entry.
+        self.hits = 0
+        #: Number of lookups that did not find an entry.
+        self.misses = 0
+        #: Entries with their expiry time, the least recently used first.
+        self._entries: collections.OrderedDict[K, tuple[float, V]] = collections.OrderedDict()
+        #: Protects the entries and counters.
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: K) -> V | None:
+        """Return the value for ``key`` or ``None`` if it is not cached or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl and entry[0] < time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: K, value: V):
+        """Store ``value`` for ``key``, evicting the least recently used entry if full."""
+        if not self.max_size:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Remove all entries, the counters are kept."""
+        with self._lock:
+            self._entries.clear()
+
+    def reset(self):
+        """Reset the counters."""
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+class SingleFlight(typing.Generic[K, V]):
+    """Coalesces concurrent calls with the same key into one computation on the event loop.
+
+    The computation runs as a task of its own, so it is not cancelled with the call that
+    started it while others wait for it.
+    """
+
+    def __init__(self):
+        #: Number of calls that started a computation.
+        self.calls = 0
+        #: Number of calls that waited for the computation of another call.
+        self.coalesced = 0
+        #: The running computations by key.
+        self._in_flight: dict[K, asyncio.Future[V]] = {}
+
+    def __len__(self) -> int:
+        return len(self._in_flight)
+
+    def _done(self, key: K, future: asyncio.Future[V]):
+        """Forget the finished computation ``future`` of ``key``."""
+        if self._in_flight.get(key) is future:
+            del self._in_flight[key]
+        if not future.cancelled():
+            future.exception()  # retrieved, even if all calls have been cancelled
+
+    async def run(self, key: K, func: typing.Callable[[], typing.Awaitable[V]]) -> V:
+        """Return the result of ``func()``, or of the running computation of ``key``."""
+        future = self._in_flight.get(key)
+        if future is None:
+            self.calls += 1
+            future = asyncio.ensure_future(func())
+            self._in_flight[key] = future
+            future.add_done_callback(lambda done: self._done(key, done))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(future)
+
+    def reset(self):
+        """Reset the counters."""
+        self.calls = 0
+        self.coalesced = 0
+
+
+#: Key of the persistent cache: query, assembly, data version and whether to normalize.
+PersistentKey = tuple[str, str, str, bool]
+
+
+class PersistentCache:
+    """Cache of serialized query results in an SQLite database file.
+
+    The database is opened in WAL mode, so worker processes read it concurrently while one
+    of them writes, and it is kept across restarts.  When it takes more than ``max_size``
+    bytes, the entries written first are evicted.  Errors of the database are logged and
+    the lookups reported as misses, so the cache never fails a query.
+    """
+
+    #: Fraction of the entries evicted at once when the database is too large.
+    EVICT_FRACTION = 0.1
+
+    def __init__(self, path: str, max_size: int = 0):
+        #: Path of the database file.
+        self.path = path
+        #: Maximal size of the entries in bytes, ``0`` for no limit.
+        self.max_size = max_size
+        #: Number of lookups that found an entry, in this process.
+        self.hits = 0
+        #: Number of lookups that did not find an entry, in this process.
+        self.misses = 0
+        #: Number of entries evicted, in this process.
+        self.evictions = 0
+        #: The connection of each thread, with the process ID it has been opened in.
+        self._local = threading.local()
+        #: Protects the counters.
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return the connection of the current thread, opened in the current process."""
+        local: tuple[int, sqlite3.Connection] | None = getattr(self._local, "connection", None)
+        if local is not None and local[0] == os.getpid():
+            return local[1]
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                q TEXT NOT NULL,
+                assembly TEXT NOT NULL,
+                data_version TEXT NOT NULL,
+                normalize INTEGER NOT NULL,
+                payload TEXT NOT NULL,
+                PRIMARY KEY (q, assembly, data_version, normalize)
+            )
+            """)
+        self._local.connection = (os.getpid(), connection)
+        return connection
+
+    def get_many(self, keys: typing.Sequence[PersistentKey]) -> list[str | None]:
+        """Return the payloads for ``keys``, ``None`` for those that are not cached."""
+        payloads: list[str | None] = [None] * len(keys)
+        try:
+            connection = self._connection()
+            connection.execute("BEGIN")
+            try:
+                for i, key in enumerate(keys):
+                    row = connection.execute(
+                        "SELECT payload FROM results "
+                        "WHERE q = ? AND assembly = ? AND data_version = ? AND normalize = ?",
+                        key,
+                    ).fetchone()
+                    if row is not None:
+                        payloads[i] = row[0]
+            finally:
+                connection.execute("COMMIT")
+        except sqlite3.Error as e:
+            _logger.warning("Reading the persistent cache %s failed: %s", self.path, e)
+        hits = sum(payload is not None for payload in payloads)
+        with self._lock:
+            self.hits += hits
+            self.misses += len(keys) - hits
+        return payloads
+
+    def put_many(self, items: typing.Iterable[tuple[PersistentKey, str]]):
+        """Store the payloads of the ``(key, payload)`` pairs ``items``, then evict the entries
+        written first if the database is too large."""
+        try:
+            connection = self._connection()
+            with connection:
+                connection.execute("BEGIN")
+                connection.executemany(
+                    "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                    (key + (payload,) for key, payload in items),
+                )
+            if self.max_size:
+                self._evict(connection)
+        except sqlite3.Error as e:
+            _logger.warning("Writing the persistent cache %s failed: %s", self.path, e)
+
+    def _used_size(self, connection: sqlite3.Connection) -> int:
+        """Return the size of the pages in use, freed pages are reused for new entries."""
+        (page_count,) = connection.execute("PRAGMA page_count").fetchone()
+        (freelist_count,) = connection.execute("PRAGMA freelist_count").fetchone()
+        (page_size,) = connection.execute("PRAGMA page_size").fetchone()
+        return (page_count - freelist_count) * page_size
+
+    def _evict(self, connection: sqlite3.Connection):
+        """Evict the entries written first until the database takes at most ``max_size``."""
+        while self._used_size(connection) > self.max_size:
+            with connection:
+                connection.execute("BEGIN IMMEDIATE")
+                (count,) = connection.execute("SELECT COUNT(*) FROM results").fetchone()
+                if not count:
+                    return
+                # Row IDs are assigned in increasing order, so the smallest are the oldest.
+                evicted = connection.execute(
+                    "DELETE FROM results WHERE rowid IN "
+                    "(SELECT rowid FROM results ORDER BY rowid LIMIT ?)",
+                    (max(1, int(count * self.EVICT_FRACTION)),),
+                ).rowcount
+            with self._lock:
+                self.evictions += evicted
+
+    def size(self) -> int:
+        """Return the size of the entries in bytes."""
+        try:
+            return self._used_size(self._connection())
+        except sqlite3.Error as e:
+            _logger.warning("Reading the persistent cache %s failed: %s", self.path, e)
+            return 0
+
+    def __len__(self) -> int:
+        try:
+            return self._connection().execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        except sqlite3.Error as e:
+            _logger.warning("Reading the persistent cache %s failed: %s", self.path, e)
+            return 0
+
+    def reset(self):
+        """Reset the counters."""
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
@@ -1,6 +1,7 @@
 import logging
 import os
 import secrets
+import typing
 from typing import Any
 
 from pydantic import AnyHttpUrl, BaseModel, EmailStr, HttpUrl, PostgresDsn, field_validator
@@ -24,9 +25,100 @@ class Settings(BaseSettings):
     #: Version of the data to load.
     DATA_VERSION: str = "0.2.21"
 
-    #: Whether seqrepo is available for the reference, allows normalization
-    #: of reference-level variants.
+    #: Maximal number of data versions loaded at a time.  Requests may select another version
+    #: than ``DATA_VERSION`` if greater than 1; it is loaded on first use and evicted when
+    #: least recently used.  Not supported with worker processes, i.e., in ``process``
+    #: execution mode or with ``python -m dotty serve``.
+    MAX_DATA_VERSIONS: int = 1
+
+    #: Memory in MiB for the data versions besides the served one, least recently used
+    #: versions are evicted when exceeded; 0 for no limit.
+    DATA_MEMORY_BUDGET: int = 0
+
+    #: Whether seqrepo (or the ``REFERENCE_*`` files) is available for the reference, allows
+    #: normalization of reference-level variants.
     HAVE_SEQREPO: bool = True
 
+    #: Number of processes for parsing the cdot JSON files in parallel on startup, a value
+    #: of 1 parses them in the main process.  The decoded data is copied back from the processes,
+    #: so this only pays off with a CPU core per process.
+    LOAD_WORKERS: int = 4
+
+    #: Whether to load the data in the background on startup.  The server then answers
+    #: ``/health/live`` right away and requests for data with 503 until it has been loaded.
+    BACKGROUND_LOADING: bool = True
+
+    #: Whether to load the assemblies one after another, GRCh38 first, and serve each as soon
+    #: as it has been loaded.  Ignored in ``process`` execution mode.
+    SERVE_ASSEMBLIES_EARLY: bool = False
+
+    #: Whether to hold the transcripts of the cdot JSON files as compact records rather than
+    #: the decoded JSON, which takes several times the memory.
+    COMPACT_TRANSCRIPTS: bool = True
+
+    #: Maximal number of queries in one batch request.
+    MAX_BATCH_SIZE: int = 10_000
+
+    #: Where to run the projection work: on the event loop (``inline``), in a pool of
+    #: threads (``thread``) or in a pool of forked processes (``process``).
+    EXECUTION_MODE: typing.Literal["inline", "thread", "process"] = "thread"
+
+    #: Number of threads or processes for the projection work.
+    EXECUTION_WORKERS: int = 4
+
+    #: Number of calls that may wait for a free worker, further requests are rejected with
+    #: HTTP 429.
+    EXECUTION_MAX_PENDING: int = 64
+
+    #: Maximal number of cached ``to-spdi`` results, 0 disables the cache.
+    RESULT_CACHE_SIZE: int = 100_000
+
+    #: Time in seconds after which cached ``to-spdi`` results expire, 0 for no expiry.
+    RESULT_CACHE_TTL: int = 86_400
+
+    #: SQLite database file of the persistent cache of ``to-spdi`` results, relative to
+    #: ``DATA_DIR``.  It is shared by the worker processes and kept across restarts; disabled
+    #: if not set.
+    PERSISTENT_CACHE: str | None = None
+
+    #: Maximal size in MiB of the persistent cache, the entries written first are evicted when
+    #: exceeded; 0 for no limit.
+    PERSISTENT_CACHE_SIZE: int = 1024
+
+    #: Reference genome file of GRCh37 to read the sequences from instead of seqrepo, relative
+    #: to ``DATA_DIR``: 2bit, FASTA with ``.fai`` index, or bgzipped FASTA with ``.fai`` and
+    #: ``.gzi`` index.
+    REFERENCE_GRCH37: str | None = None
+
+    #: Reference genome file of GRCh38, see ``REFERENCE_GRCH37``.
+    REFERENCE_GRCH38: str | None = None
+
+    #: Maximal number of cached blocks of reference sequence, 0 disables the cache.
+    SEQ_CACHE_SIZE: int = 16_384
+
+    #: Size of the cached blocks of reference sequence.
+    SEQ_CACHE_BLOCK_SIZE: int = 4_096
+
+    #: Number of neighbouring blocks on each side to fetch along with a missing block.
+    SEQ_CACHE_PREFETCH: int = 1
+
+    #: Maximal number of transcripts per assembly whose exons are kept as arrays for the
+    #: vectorized projection of substitutions in batches, 0 disables the vectorized projection.
+    PROJECTION_CACHE_SIZE: int = 100_000
+
+    #: Token for the admin endpoints, passed as ``Authorization: Bearer <token>``.  The admin
+    #: endpoints are disabled if not set.
+    ADMIN_TOKEN: str | None = None
+
+    #: Number of variants of a streamed ``to-spdi`` request resolved in one chunk.
+    STREAM_CHUNK_SIZE: int = 100
+
+    #: Maximal number of chunks of a streamed ``to-spdi`` request resolved at a time.
+    STREAM_MAX_IN_FLIGHT: int = 8
+
+    #: Maximal length in bytes of a line of newline-delimited request bodies, the request is
+    #: rejected on longer lines.
+    MAX_LINE_LENGTH: int = 65_536
+
 
 settings = Settings(_env_file=".env", _env_file_encoding="utf-8")  # type: ignore[call-arg]
@@ -0,0 +1,155 @@
+"""Offline conversion of files of HGVS variants, run as ``python -m dotty convert``.
+
+The data is loaded once in the main process.  The worker processes are forked afterwards
+and share the loaded data copy-on-write.  The input lines are distributed to the workers
+in chunks, and the output is written in input order.
+"""
+
+import collections
+import gc
+import logging
+import multiprocessing
+import multiprocessing.pool
+import time
+import typing
+
+from dotty.core import Assembly, Driver, project_substitutions_to_vcf, project_to_vcf
+
+#: Logger used in this module.
+_logger = logging.getLogger(__name__)
+
+#: Columns of the output.
+HEADER = ("variant", "assembly", "chrom", "pos", "ref", "alt", "message")
+
+#: Seconds between two progress reports.
+PROGRESS_INTERVAL = 10.0
+
+#: The loaded driver, inherited by the forked worker processes.
+_driver: Driver | None = None
+
+#: A chunk of input lines with the target assembly and the 0-based variant column.
+Chunk = tuple[list[str], Assembly, int]
+
+
+def _variant(line: str, column: int) -> str:
+    """Return the variant in ``column`` of the tab-separated ``line``, empty if the line has
+    no such column."""
+    fields = line.rstrip("\r\n").split("\t")
+    return fields[column].strip() if column < len(fields) else ""
+
+
+def _output_line(
+    q: str, result_assembly: Assembly, chrom: str, pos: int, ref: str, alt: str
+) -> str:
+    """Return the output line of the variant ``q`` projected to VCF-style coordinates."""
+    return "\t".join((q, result_assembly.value, chrom, str(pos), ref, alt, ""))
+
+
+def convert_line(driver: Driver, line: str, assembly: Assembly, column: int = 0) -> str:
+    """Convert the variant in ``column`` of the tab-separated ``line`` to an output line.
+
+    Errors are reported in the ``message`` column.
+    """
+    q = _variant(line, column)
+    if not q:
+        return "\t".join((q, assembly.value, "", "", "", "", f"No variant in column {column + 1}"))
+    try:
+        vcf = project_to_vcf(driver, q, assembly)
+    except Exception as e:
+        message = " ".join(f"{type(e).__name__}: {e}".split())
+        return "\t".join((q, assembly.value, "", "", "", "", message))
+    return _output_line(q, *vcf)
+
+
+def _convert_chunk(chunk: Chunk) -> list[str]:
+    """Convert a chunk of lines with the inherited driver.
+
+    The substitutions are projected together with the vectorized projection, the other
+    variants line by line.
+    """
+    lines, assembly, column = chunk
+    driver = typing.cast(Driver, _driver)
+    queries = [_variant(line, column) for line in lines]
+    projected = project_substitutions_to_vcf(driver, queries, assembly)
+    return [
+        _output_line(q, *vcf) if vcf is not None else convert_line(driver, line, assembly, column)
+        for line, q, vcf in zip(lines, queries, projected)
+    ]
+
+
+def _iter_chunks(
+    inputf: typing.TextIO, assembly: Assembly, column: int, chunk_size: int
+) -> typing.Iterator[Chunk]:
+    """Yield the non-empty, non-comment lines of ``inputf`` in chunks."""
+    lines: list[str] = []
+    for line in inputf:
+        if not line.strip() or line.startswith("#"):
+            continue
+        lines.append(line)
+        if len(lines) >= chunk_size:
+            yield lines, assembly, column
+            lines = []
+    if lines:
+        yield lines, assembly, column
+
+
+def _iter_results(chunks: typing.Iterator[Chunk], workers: int) -> typing.Iterator[list[str]]:
+    """Convert the chunks with ``workers`` forked processes, yield the results in order.
+
+    At most four chunks per worker are pending so memory does not grow with the input.
+    """
+    if workers <= 1:
+        yield from map(_convert_chunk, chunks)
+        return
+    # Move the loaded data out of the way of the garbage collector so the pages stay shared.
+    gc.freeze()
+    try:
+        with multiprocessing.get_context("fork").Pool(workers) as pool:
+            pending: collections.deque[multiprocessing.pool.AsyncResult[list[str]]] = (
+                collections.deque()
+            )
+            for chunk in chunks:
+                pending.append(pool.apply_async(_convert_chunk, (chunk,)))
+                if len(pending) >= 4 * workers:
+                    yield pending.popleft().get()
+            while pending:
+                yield pending.popleft().get()
+    finally:
+        gc.unfreeze()
+
+
+def convert(
+    driver: Driver,
+    inputf: typing.TextIO,
+    outputf: typing.TextIO,
+    assembly: Assembly = Assembly.GRCH38,
+    column: int = 0,
+    workers: int = 1,
+    chunk_size: int = 1000,
+) -> int:
+    """Convert the variants from ``inputf`` and write tab-separated results to ``outputf``.
+
+    Returns the number of converted variants.
+    """
+    global _driver
+    _driver = driver
+    start_time = last_report = time.time()
+    count = 0
+    outputf.write("#" + "\t".join(HEADER) + "\n")
+    for results in _iter_results(_iter_chunks(inputf, assembly, column, chunk_size), workers):
+        for result in results:
+            outputf.write(result + "\n")
+        count += len(results)
+        if time.time() - last_report >= PROGRESS_INTERVAL:
+            last_report = time.time()
+            elapsed = last_report - start_time
+            _logger.info("... converted %d variants (%.0f/s)", count, count / elapsed)
+    elapsed = max(time.time() - start_time, 1e-9)
+    _logger.info(
+        "Converted %d variants in %.1fs with %d workers (%.0f/s)",
+        count,
+        elapsed,
+        workers,
+        count / elapsed,
+    )
+    return count
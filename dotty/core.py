@@ -1,8 +1,13 @@
+import concurrent.futures
+import contextlib
 import enum
+import functools
 import logging
+import multiprocessing
 import os
 import pathlib
 import time
+import typing
 from datetime import timedelta
 from unittest import mock
 
@@ -10,12 +15,24 @@ import bioutils.assemblies
 import hgvs.parser
 from bioutils.sequences import reverse_complement
 from cdot.hgvs.dataproviders import JSONDataProvider
+from cdot.hgvs.dataproviders.json_data_provider import LocalDataProvider
 from hgvs.assemblymapper import AssemblyMapper
 from hgvs.dataproviders.interface import Interface
+from hgvs.dataproviders.seqfetcher import SeqFetcher
+from hgvs.edit import NARefAlt
 from hgvs.extras import babelfish
+from hgvs.location import Interval, SimplePosition
+from hgvs.posedit import PosEdit
 from hgvs.sequencevariant import SequenceVariant
 
+from dotty.cache import ResultCache
 from dotty.config import settings
+from dotty.metrics import LOAD_DURATION, STAGE_DURATION
+from dotty.parser import FastParser, parse_simple
+from dotty.projection import Projector
+from dotty.seqfetcher import BlockKey, CachingSeqFetcher, GenomeSeqFetcher, SeqFetcherProtocol
+from dotty.snapshot import SnapshotDataProvider, load_cdot_json
+from dotty.store import compact_transcripts
 
 #: Logger used in this module.
 _logger = logging.getLogger(__name__)
@@ -36,7 +53,7 @@ class Babelfish(babelfish.Babelfish):
 
         vleft = self.hn.normalize(var_g)
 
-        (start_i, end_i) = babelfish._as_interbase(vleft.posedit)
+        start_i, end_i = babelfish._as_interbase(vleft.posedit)
 
         chrom = self.ac_to_chr_name_map[vleft.ac]
 
@@ -62,6 +79,36 @@ class Babelfish(babelfish.Babelfish):
                     alt = "."
         return chrom, start_i + 1, ref, alt, typ
 
+    def vcf_to_g_hgvs(self, ac: str, pos: int, ref: str, alt: str) -> SequenceVariant:
+        """Create the ``g.`` variant of the VCF-style variant on the contig with accession ``ac``.
+
+        The common prefix of the alleles, e.g., the anchor base of indels, is removed.
+        """
+        ref, alt = ref.upper(), ref.upper() if alt == "." else alt.upper()
+        if ref != alt:
+            prefix = len(os.path.commonprefix([ref, alt]))
+            ref, alt, pos = ref[prefix:], alt[prefix:], pos + prefix
+        if ref:
+            start, end = pos, pos + len(ref) - 1
+        else:  # insertion between the flanking positions
+            start, end = pos - 1, pos
+        return SequenceVariant(
+            ac=ac,
+            type="g",
+            posedit=PosEdit(
+                pos=Interval(start=SimplePosition(start), end=SimplePosition(end)),
+                edit=NARefAlt(ref=ref or None, alt=alt or None),
+            ),
+        )
+
+
+class UnsupportedVariantError(Exception):
+    """Raised for variants that cannot be projected."""
+
+
+class DataNotLoadedError(Exception):
+    """Raised if the data of an assembly is still being loaded."""
+
 
 class Assembly(enum.Enum):
     """Enumeration for supported assemblies."""
@@ -72,61 +119,406 @@ class Assembly(enum.Enum):
     GRCH38 = "GRCh38"
 
 
-class Driver:
-    """Provides references to the data files."""
+#: Contig names per assembly.
+contig_names: dict[Assembly, set[str]] = {
+    assembly: set(
+        sr["refseq_ac"] for sr in bioutils.assemblies.get_assembly(assembly.value)["sequences"]
+    )
+    for assembly in Assembly
+}
 
-    #: The file names to load for each assembly.
-    assembly_file_names = {
-        Assembly.GRCH37: (
-            f"cdot-{settings.DATA_VERSION}.ensembl.grch37.json.gz",
-            f"cdot-{settings.DATA_VERSION}.refseq.grch37.json.gz",
-        ),
-        Assembly.GRCH38: (
-            f"cdot-{settings.DATA_VERSION}.ensembl.grch38.json.gz",
-            f"cdot-{settings.DATA_VERSION}.refseq.grch38.json.gz",
-        ),
+
+def _contig_accessions(assembly: Assembly) -> dict[str, str]:
+    """Map the names, with and without ``chr`` prefix, and accessions of the contigs of
+    ``assembly`` to their RefSeq accession."""
+    result = {}
+    for sr in bioutils.assemblies.get_assembly(assembly.value)["sequences"]:
+        if not sr["refseq_ac"]:
+            continue
+        names = [sr["name"], f"chr{sr['name']}", sr["refseq_ac"], sr["genbank_ac"]]
+        if sr["name"] == "MT":
+            names.append("chrM")
+        result.update({name: sr["refseq_ac"] for name in names if name})
+    return result
+
+
+#: Map from contig names and accessions to RefSeq accessions, per assembly.
+contig_accessions: dict[Assembly, dict[str, str]] = {
+    assembly: _contig_accessions(assembly) for assembly in Assembly
+}
+
+
+def cdot_file_names(data_version: str) -> dict[Assembly, tuple[str, ...]]:
+    """Return the names of the cdot JSON files to load for each assembly."""
+    return {
+        assembly: (
+            f"cdot-{data_version}.ensembl.{assembly.value.lower()}.json.gz",
+            f"cdot-{data_version}.refseq.{assembly.value.lower()}.json.gz",
+        )
+        for assembly in Assembly
     }
 
-    def __init__(self, cdot_dir: str):
+
+def snapshot_file_name(data_version: str, assembly: Assembly) -> str:
+    """Return the name of the snapshot file compiled from the cdot files of ``assembly``."""
+    return f"cdot-{data_version}.{assembly.value.lower()}.snapshot"
+
+
+def missing_data_files(cdot_dir: str, data_version: str) -> list[pathlib.Path]:
+    """Return the files of ``data_version`` that are missing in ``cdot_dir``.
+
+    For each assembly, either the snapshot or all cdot JSON files are required.
+    """
+    result = []
+    for assembly, file_names in cdot_file_names(data_version).items():
+        if not (pathlib.Path(cdot_dir) / snapshot_file_name(data_version, assembly)).exists():
+            paths = [pathlib.Path(cdot_dir) / file_name for file_name in file_names]
+            result += [path for path in paths if not path.exists()]
+    return result
+
+
+@contextlib.contextmanager
+def _log_elapsed(stage: str) -> typing.Iterator[None]:
+    """Log the time spent in ``stage`` and record it in the metrics."""
+    start_time = time.time()
+    yield
+    elapsed = time.time() - start_time
+    LOAD_DURATION.set(elapsed, stage)
+    _logger.info("... %s took %s", stage, timedelta(seconds=elapsed))
+
+
+def _load_cdot_file(path: str) -> dict[str, typing.Any]:
+    """Load the cdot JSON file at ``path``, also used in the worker processes of ``Driver``."""
+    start_time = time.time()
+    data = load_cdot_json(path)
+    _logger.info("... loaded %s in %s", path, timedelta(seconds=time.time() - start_time))
+    return data
+
+
+class DecodedJSONDataProvider(JSONDataProvider):
+    """``JSONDataProvider`` that is built from already decoded cdot JSON data.
+
+    This allows to parse the files in worker processes.  Files are merged in the same way
+    as by ``JSONDataProvider``.  The transcripts are converted to compact records if
+    ``COMPACT_TRANSCRIPTS`` is set.
+    """
+
+    def __init__(
+        self, cdot_data: list[dict[str, typing.Any]], mode=None, cache=None, seqfetcher=None
+    ):
+        assemblies: set[str] = set()
+        self.transcripts = {}
+        self.genes = {}
+        for data in cdot_data:
+            assemblies.update(data["genome_builds"])
+            if settings.COMPACT_TRANSCRIPTS:
+                self.transcripts.update(compact_transcripts(data["transcripts"]))
+            else:
+                self.transcripts.update(data["transcripts"])
+            for gene in (data.get("genes") or {}).values():
+                if gene_symbol := gene.get("gene_symbol"):
+                    self.genes[gene_symbol] = gene
+            self._validate_schema_compatability(data["cdot_version"])
+            self.cdot_data_version = tuple(int(v) for v in data["cdot_version"].split("."))
+        LocalDataProvider.__init__(
+            self, assemblies=assemblies, mode=mode, cache=cache, seqfetcher=seqfetcher
+        )
+
+
+@functools.cache
+def _shared_parser() -> FastParser:
+    """Return the HGVS parser shared by all drivers, as building the grammar takes seconds."""
+    return FastParser(hgvs.parser.Parser())
+
+
+class Driver:
+    """Provides references to the data files."""
+
+    def __init__(self, cdot_dir: str, data_version: str | None = None):
         #: Path to the cdot files.
         self.cdot_dir = pathlib.Path(cdot_dir)
-        #: JSON data provider.
-        self.data_providers: dict[Assembly, JSONDataProvider] = {}
+        #: Version of the cdot data.
+        self.data_version = data_version or settings.DATA_VERSION
+        #: The file names to load for each assembly.
+        self.assembly_file_names = cdot_file_names(self.data_version)
+        #: The files that the data of each assembly has been loaded from.
+        self.data_paths: dict[Assembly, list[pathlib.Path]] = {}
+        #: The data provider (cdot JSON or snapshot) for each assembly.
+        self.data_providers: dict[Assembly, LocalDataProvider] = {}
         #: The assembly mapper to use for each genome.
         self.assembly_mappers: dict[Assembly, AssemblyMapper] = {}
         #: One Babelfish for each assembly.
         self.babelfishes: dict[Assembly, Babelfish] = {}
-        #: The HGVS parser.
-        self.parser = hgvs.parser.Parser()
+        #: The vectorized projection of each assembly, if enabled.
+        self.projectors: dict[Assembly, Projector] = {}
+        #: The HGVS parser with a fast path for simple variants, shared with the drivers of
+        #: other data versions.
+        self.parser = _shared_parser()
+        #: The cache of reference sequence blocks shared by the data providers, if enabled.
+        self.seq_cache: ResultCache[BlockKey, str] | None = None
+        #: The sequence fetchers of the assemblies, created on the first ``load()``.
+        self.seq_fetchers: dict[Assembly, SeqFetcherProtocol] = {}
+
+    def _snapshot_path(self, assembly: Assembly) -> pathlib.Path:
+        """Return the path to the compiled snapshot of ``assembly``."""
+        return self.cdot_dir / snapshot_file_name(self.data_version, assembly)
+
+    def _load_cdot_files(self, assemblies: list[Assembly]) -> dict[str, dict[str, typing.Any]]:
+        """Load the cdot JSON files of ``assemblies``, in parallel if configured."""
+        paths = [
+            str(self.cdot_dir / fname)
+            for assembly in assemblies
+            for fname in self.assembly_file_names[assembly]
+        ]
+        if settings.LOAD_WORKERS > 1 and len(paths) > 1:
+            # Spawned rather than forked, as loading may run in a thread of the server.
+            with concurrent.futures.ProcessPoolExecutor(
+                max_workers=min(settings.LOAD_WORKERS, len(paths)),
+                mp_context=multiprocessing.get_context("spawn"),
+            ) as executor:
+                return dict(zip(paths, executor.map(_load_cdot_file, paths)))
+        else:
+            return {path: _load_cdot_file(path) for path in paths}
 
-    def load(self):
-        """Loads the data from the files."""
-        _logger.info("Loading data from %s: %s ...", self.cdot_dir, self.assembly_file_names)
+    def _create_genome_seq_fetcher(self, assembly: Assembly) -> GenomeSeqFetcher | None:
+        """Create the sequence fetcher of the reference genome file of ``assembly``, ``None``
+        if not configured."""
+        reference = {
+            Assembly.GRCH37: settings.REFERENCE_GRCH37,
+            Assembly.GRCH38: settings.REFERENCE_GRCH38,
+        }[assembly]
+        if not reference:
+            return None
+        path = self.cdot_dir / reference
+        _logger.info("Reading %s sequences from %s", assembly.value, path)
+        return GenomeSeqFetcher(str(path), contig_accessions[assembly])
+
+    def _create_seq_fetchers(self) -> dict[Assembly, SeqFetcherProtocol]:
+        """Create the sequence fetchers of the assemblies.
+
+        The sequences are read from the reference genome file of the assembly if configured,
+        and from seqrepo otherwise.  If enabled, blocks are cached in ``seq_cache``.
+        """
+        self.seq_cache = (
+            ResultCache(max_size=settings.SEQ_CACHE_SIZE) if settings.SEQ_CACHE_SIZE else None
+        )
+        seqrepo_fetcher: SeqFetcher | None = None
+        result: dict[Assembly, SeqFetcherProtocol] = {}
+        for assembly in Assembly:
+            fetcher: SeqFetcherProtocol | None = self._create_genome_seq_fetcher(assembly)
+            if fetcher is None:
+                seqrepo_fetcher = seqrepo_fetcher or SeqFetcher()
+                fetcher = seqrepo_fetcher
+            if self.seq_cache is not None:
+                fetcher = CachingSeqFetcher(
+                    fetcher,
+                    self.seq_cache,
+                    block_size=settings.SEQ_CACHE_BLOCK_SIZE,
+                    prefetch=settings.SEQ_CACHE_PREFETCH,
+                    namespace=assembly.value,
+                )
+            result[assembly] = fetcher
+        return result
+
+    def load(self, assemblies: typing.Iterable[Assembly] | None = None):
+        """Loads the data of ``assemblies``, all by default, from the files.
+
+        The assemblies may be loaded one after another, e.g., to serve the first while the
+        next is being loaded; the attributes are replaced rather than modified.
+        """
+        assemblies = list(Assembly) if assemblies is None else list(assemblies)
+        _logger.info(
+            "Loading data from %s: %s ...",
+            self.cdot_dir,
+            {assembly: self.assembly_file_names[assembly] for assembly in assemblies},
+        )
         start_time = time.time()
 
+        snapshot_paths = {
+            assembly: self._snapshot_path(assembly)
+            for assembly in assemblies
+            if self._snapshot_path(assembly).exists()
+        }
+        with _log_elapsed("loading cdot JSON files"):
+            cdot_data = self._load_cdot_files(
+                [assembly for assembly in assemblies if assembly not in snapshot_paths]
+            )
+
         # We temporarily override the HGVS_SEQREPO_DIR environment variable for construction
         # of hgvs / cdot objects.
         with mock.patch.dict(os.environ, {"HGVS_SEQREPO_DIR": str(self.cdot_dir / "seqrepo")}):
-            self.data_providers = {
-                assembly: JSONDataProvider(
-                    [str(self.cdot_dir / fname) for fname in assembly_file_names],
-                )
-                for assembly, assembly_file_names in self.assembly_file_names.items()
-            }
-            self.assembly_mappers = {
-                assembly: AssemblyMapper(
-                    self.data_providers[assembly],
-                    assembly_name=assembly.value,
-                    alt_aln_method="splign",
-                    normalize=settings.HAVE_SEQREPO,
-                    replace_reference=settings.HAVE_SEQREPO,
-                    prevalidation_level=None,
-                )
-                for assembly in Assembly
-            }
-            self.babelfishes = {
-                assembly: Babelfish(hdp=self.data_providers[assembly], assembly_name=assembly.value)
-                for assembly in Assembly
-            }
+            with _log_elapsed("creating data providers"):
+                if not self.seq_fetchers:
+                    self.seq_fetchers = self._create_seq_fetchers()
+                data_providers: dict[Assembly, LocalDataProvider] = {}
+                for assembly in assemblies:
+                    if assembly in snapshot_paths:
+                        _logger.info("Opening snapshot %s", snapshot_paths[assembly])
+                        self.data_paths[assembly] = [snapshot_paths[assembly]]
+                        data_providers[assembly] = SnapshotDataProvider(
+                            str(snapshot_paths[assembly]), seqfetcher=self.seq_fetchers[assembly]
+                        )
+                    else:
+                        self.data_paths[assembly] = [
+                            self.cdot_dir / fname for fname in self.assembly_file_names[assembly]
+                        ]
+                        # The decoded JSON is released once the provider has been built.
+                        data_providers[assembly] = DecodedJSONDataProvider(
+                            [cdot_data.pop(str(path)) for path in self.data_paths[assembly]],
+                            seqfetcher=self.seq_fetchers[assembly],
+                        )
+                self.data_providers = {**self.data_providers, **data_providers}
+            with _log_elapsed("creating assembly mappers"):
+                assembly_mappers = {
+                    assembly: AssemblyMapper(
+                        data_providers[assembly],
+                        assembly_name=assembly.value,
+                        alt_aln_method="splign",
+                        normalize=settings.HAVE_SEQREPO,
+                        replace_reference=settings.HAVE_SEQREPO,
+                        prevalidation_level=None,
+                    )
+                    for assembly in assemblies
+                }
+                self.assembly_mappers = {**self.assembly_mappers, **assembly_mappers}
+                if settings.PROJECTION_CACHE_SIZE:
+                    self.projectors = {
+                        **self.projectors,
+                        **{
+                            assembly: Projector(
+                                data_providers[assembly],
+                                assembly_mappers[assembly],
+                                settings.PROJECTION_CACHE_SIZE,
+                            )
+                            for assembly in assemblies
+                        },
+                    }
+            with _log_elapsed("creating babelfishes"):
+                self.babelfishes = {
+                    **self.babelfishes,
+                    **{
+                        assembly: Babelfish(
+                            hdp=data_providers[assembly], assembly_name=assembly.value
+                        )
+                        for assembly in assemblies
+                    },
+                }
         elapsed = timedelta(seconds=time.time() - start_time)
         _logger.info("... loaded in %s", elapsed)
+
+
+def _check_loaded(driver: Driver, assembly: Assembly):
+    """Check that the data of ``assembly`` has been loaded into ``driver``.
+
+    :raises DataNotLoadedError: if it has not been loaded yet
+    """
+    if assembly not in driver.babelfishes:
+        raise DataNotLoadedError(f"The data of {assembly.value} has not been loaded yet")
+
+
+def project_to_vcf(
+    driver: Driver, q: str, assembly: Assembly
+) -> tuple[Assembly, str, int, str, str]:
+    """Parse the HGVS variant ``q`` and project it to VCF-style coordinates on ``assembly``.
+
+    Genomic variants on GRCh37 contigs stay on GRCh37.  Returns the assembly, chromosome,
+    1-based position, reference and alternative allele.  The duration of parsing, projecting
+    to the genome and normalizing to VCF is recorded in the metrics.
+
+    :raises hgvs.exceptions.HGVSParseError: if ``q`` cannot be parsed
+    :raises UnsupportedVariantError: if ``q`` is not a ``c.``, ``n.`` or ``g.`` variant
+    :raises DataNotLoadedError: if ``q`` is on GRCh37 contigs that have not been loaded yet
+    """
+    start_time = time.perf_counter()
+    parsed_var = driver.parser.parse(q)
+    parsed_time = time.perf_counter()
+    STAGE_DURATION.observe(parsed_time - start_time, "parse", assembly.value, parsed_var.type)
+    if parsed_var.type == "c":
+        var_g = driver.assembly_mappers[assembly].c_to_g(parsed_var)
+    elif parsed_var.type == "n":
+        var_g = driver.assembly_mappers[assembly].n_to_g(parsed_var)
+    elif parsed_var.type == "g":
+        var_g = parsed_var
+        if var_g.ac in contig_names[Assembly.GRCH37]:
+            assembly = Assembly.GRCH37
+            _check_loaded(driver, assembly)
+    else:  # pragma: no cover
+        raise UnsupportedVariantError("Invalid variant type")
+    projected_time = time.perf_counter()
+    if parsed_var.type != "g":
+        STAGE_DURATION.observe(
+            projected_time - parsed_time, f"{parsed_var.type}_to_g", assembly.value, parsed_var.type
+        )
+
+    contig, pos, reference, alternative, _ = driver.babelfishes[assembly].hgvs_to_vcf(var_g)
+    STAGE_DURATION.observe(
+        time.perf_counter() - projected_time, "g_to_vcf", assembly.value, parsed_var.type
+    )
+    return assembly, contig, pos, reference, alternative
+
+
+def project_substitutions_to_vcf(
+    driver: Driver, queries: typing.Sequence[str], assembly: Assembly
+) -> list[tuple[Assembly, str, int, str, str] | None]:
+    """Project the ``c.`` and ``n.`` substitutions among ``queries`` to VCF-style coordinates
+    on ``assembly`` with the vectorized projection of ``driver``.
+
+    The results are those of ``project_to_vcf()``.  ``None`` is returned for the other
+    queries and for those that need hgvs, e.g., to report an error; they are to be projected
+    with ``project_to_vcf()``.  The duration of the stages is recorded in the metrics for
+    each projected variant as its share of the whole.
+    """
+    results: list[tuple[Assembly, str, int, str, str] | None] = [None] * len(queries)
+    projector = driver.projectors.get(assembly)
+    if projector is None:
+        return results
+    start_time = time.perf_counter()
+    indices = []
+    variants = []
+    for i, q in enumerate(queries):
+        variant = parse_simple(q)
+        # Lower-case alleles are left to hgvs, which handles them inconsistently.
+        if (
+            variant is not None
+            and variant.type in "cn"
+            and variant.posedit.edit.type == "sub"
+            and (variant.posedit.edit.ref + variant.posedit.edit.alt).isupper()
+        ):
+            indices.append(i)
+            variants.append(variant)
+    if not variants:
+        return results
+    parsed_time = time.perf_counter()
+    projections = projector.project(variants)
+    projected_time = time.perf_counter()
+
+    chrom_names = driver.babelfishes[assembly].ac_to_chr_name_map
+    seqfetcher = driver.data_providers[assembly].seqfetcher
+    replace_reference = driver.assembly_mappers[assembly].replace_reference
+    for i, variant, projection in zip(indices, variants, projections):
+        if projection is None or projection[0] not in chrom_names:
+            continue
+        contig, strand, pos, _ = projection
+        ref, alt = variant.posedit.edit.ref, variant.posedit.edit.alt
+        if strand == -1:
+            ref, alt = reverse_complement(ref), reverse_complement(alt)
+        # hgvs reads the reference base on normalization anyway, errors are left to hgvs.
+        try:
+            base = seqfetcher.fetch_seq(contig, pos - 1, pos)
+        except Exception:
+            continue
+        if len(base) != 1:
+            continue
+        if replace_reference:
+            ref = base
+        results[i] = (assembly, chrom_names[contig], pos, ref, "." if ref == alt else alt)
+
+    elapsed = time.perf_counter() - projected_time
+    for variant in variants:
+        labels = (assembly.value, variant.type)
+        STAGE_DURATION.observe((parsed_time - start_time) / len(variants), "parse", *labels)
+        STAGE_DURATION.observe(
+            (projected_time - parsed_time) / len(variants), f"{variant.type}_to_g", *labels
+        )
+        STAGE_DURATION.observe(elapsed / len(variants), "g_to_vcf", *labels)
+    return results
@@ -0,0 +1,122 @@
+"""Execution of the CPU-bound projection work outside of the asyncio event loop.
+
+Parsing, projection and normalization of variants are synchronous and can take a while.
+Running them on the event loop would stall all concurrent requests, so the endpoints hand
+them to a ``Dispatcher`` that runs them in a pool of threads or of pre-forked processes.
+The number of pending calls is bounded; when the limit is reached, callers get a
+``DispatcherSaturatedError`` instead of queueing up more work.
+"""
+
+import asyncio
+import concurrent.futures
+import enum
+import logging
+import multiprocessing
+import typing
+
+#: Logger used in this module.
+_logger = logging.getLogger(__name__)
+
+#: Return type of dispatched functions.
+T = typing.TypeVar("T")
+
+
+class ExecutionMode(enum.Enum):
+    """Enumeration of the supported execution modes."""
+
+    #: Run directly on the event loop.
+    INLINE = "inline"
+    #: Run in a pool of threads.
+    THREAD = "thread"
+    #: Run in a pool of forked processes.  The processes are forked after the data has
+    #: been loaded so each holds its own copy of the ``Driver``.
+    PROCESS = "process"
+
+
+class DispatcherSaturatedError(Exception):
+    """Raised when the dispatcher has too many pending calls."""
+
+
+def _noop() -> None:
+    """Used to start the worker processes."""
+
+
+class Dispatcher:
+    """Dispatches calls to a pool of workers, with a bounded number of pending calls."""
+
+    def __init__(
+        self,
+        mode: ExecutionMode,
+        max_workers: int,
+        max_pending: int,
+        initializer: typing.Callable[[], None] | None = None,
+    ):
+        #: The execution mode.
+        self.mode = mode
+        #: Number of workers in the pool.
+        self.max_workers = max_workers
+        #: Number of calls that may wait for a worker in addition to the running ones.
+        self.max_pending = max_pending
+        #: Called in each worker process on startup.
+        self.initializer = initializer
+        #: The executor, created on ``start()``.
+        self._executor: concurrent.futures.Executor | None = None
+        #: Number of submitted calls that have not finished yet.
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        """Number of submitted calls that have not finished yet."""
+        return self._pending
+
+    def start(self):
+        """Create the worker pool; worker processes are forked right away."""
+        if self.mode == ExecutionMode.THREAD:
+            self._executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="dotty-worker"
+            )
+        elif self.mode == ExecutionMode.PROCESS:
+            self._executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("fork"),
+                initializer=self.initializer,
+            )
+            # With "fork", all worker processes are started on the first submission.
+            self._executor.submit(_noop).result()
+        _logger.info("Started dispatcher in %s mode", self.mode.value)
+
+    def restart(self):
+        """Replace the worker pool, e.g., so new worker processes inherit reloaded data.
+
+        Calls that have been submitted to the old pool finish there.
+        """
+        old_executor = self._executor
+        self.start()
+        if old_executor is not None:
+            old_executor.shutdown(wait=False)
+
+    def shutdown(self, wait: bool = True):
+        """Shut down the worker pool."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+    async def run(self, func: typing.Callable[..., T], *args: typing.Any) -> T:
+        """Run ``func(*args)`` in the worker pool and return its result.
+
+        In process mode, ``func``, its arguments and its result must be picklable.
+
+        :raises DispatcherSaturatedError: if too many calls are pending
+        """
+        if self.mode == ExecutionMode.INLINE:
+            return func(*args)
+        if self._pending >= self.max_workers + self.max_pending:
+            raise DispatcherSaturatedError(f"Too many pending calls ({self._pending})")
+        if self._executor is None:
+            self.start()
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            self._pending -= 1
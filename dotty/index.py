@@ -0,0 +1,243 @@
+"""Indexes over the transcripts of the cdot data, built once per assembly."""
+
+import bisect
+import dataclasses
+import json
+import logging
+import pathlib
+import time
+import typing
+from datetime import timedelta
+
+from cdot.hgvs.dataproviders.json_data_provider import LocalDataProvider
+
+from dotty.core import Assembly, Driver, contig_names
+from dotty.metrics import LOAD_DURATION
+
+#: Logger used in this module.
+_logger = logging.getLogger(__name__)
+
+#: Version of the index file format, bumped on incompatible changes.
+INDEX_FORMAT_VERSION = 1
+
+
+def is_valid_transcript(transcript: typing.Any, assembly: Assembly) -> bool:
+    """Return whether ``transcript`` has all data required for ``find-transcripts``."""
+    build_data = transcript["genome_builds"].get(assembly.value)
+    return (
+        "hgnc" in transcript
+        and build_data is not None
+        and "cds_start" in build_data
+        and "cds_end" in build_data
+        and "exons" in build_data
+    )
+
+
+def hgnc_index_file_name(data_version: str, assembly: Assembly) -> str:
+    """Return the name of the file with the saved HGNC index of ``assembly``."""
+    return f"cdot-{data_version}.{assembly.value.lower()}.hgnc-index.json"
+
+
+def build_hgnc_index(driver: Driver, assembly: Assembly) -> dict[str, list[str]]:
+    """Map the HGNC IDs to the IDs of their valid transcripts on ``assembly``.
+
+    Each transcript is fetched from the data provider only once.
+    """
+    index: dict[str, list[str]] = {}
+    for tx_ac, transcript in driver.data_providers[assembly].transcripts.items():
+        if not is_valid_transcript(transcript, assembly):
+            _logger.debug("Skipping transcript %s as it does not have all required data", tx_ac)
+            continue
+        index.setdefault(f"HGNC:{transcript['hgnc']}", []).append(tx_ac)
+    return index
+
+
+def save_hgnc_index(path: pathlib.Path, data_version: str, index: dict[str, list[str]]):
+    """Save the HGNC ``index`` to ``path``."""
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    with tmp_path.open("wt") as outputf:
+        json.dump(
+            {"format": INDEX_FORMAT_VERSION, "data_version": data_version, "index": index},
+            outputf,
+        )
+    tmp_path.replace(path)
+
+
+def load_hgnc_index(path: pathlib.Path, data_version: str) -> dict[str, list[str]] | None:
+    """Load the HGNC index from ``path``, ``None`` if it was saved for other data."""
+    with path.open("rt") as inputf:
+        data = json.load(inputf)
+    if data.get("format") != INDEX_FORMAT_VERSION or data.get("data_version") != data_version:
+        return None
+    return data["index"]
+
+
+def load_or_build_hgnc_index(driver: Driver, assembly: Assembly) -> dict[str, list[str]]:
+    """Load the saved HGNC index of ``assembly`` or build and save it.
+
+    The saved index is only used if it is newer than the data files.  Failure to save
+    the index, e.g., because the data directory is read-only, is not an error.
+    """
+    start_time = time.time()
+    path = driver.cdot_dir / hgnc_index_file_name(driver.data_version, assembly)
+    data_mtime = max(
+        (data_path.stat().st_mtime for data_path in driver.data_paths[assembly]), default=0
+    )
+    if path.exists() and path.stat().st_mtime >= data_mtime:
+        index = load_hgnc_index(path, driver.data_version)
+        if index is not None:
+            elapsed = time.time() - start_time
+            LOAD_DURATION.set(elapsed, f"loading HGNC index of {assembly.value}")
+            _logger.info("... loaded HGNC index from %s in %s", path, timedelta(seconds=elapsed))
+            return index
+
+    index = build_hgnc_index(driver, assembly)
+    elapsed = time.time() - start_time
+    LOAD_DURATION.set(elapsed, f"building HGNC index of {assembly.value}")
+    _logger.info("... built HGNC index of %s in %s", assembly.value, timedelta(seconds=elapsed))
+    try:
+        save_hgnc_index(path, driver.data_version, index)
+    except OSError as e:
+        _logger.warning("Could not save HGNC index to %s: %s", path, e)
+    return index
+
+
+def build_region_index(driver: Driver, assembly: Assembly):
+    """Build the region index of ``assembly``.
+
+    The data providers index the transcript alignments in one interval tree per contig,
+    which they build lazily on the first region query.  This builds them right away.
+    """
+    start_time = time.time()
+    data_provider = driver.data_providers[assembly]
+    for contig in contig_names[assembly]:
+        data_provider._get_contig_interval_tree(contig)
+    elapsed = time.time() - start_time
+    LOAD_DURATION.set(elapsed, f"building region index of {assembly.value}")
+    _logger.info("... built region index of %s in %s", assembly.value, timedelta(seconds=elapsed))
+
+
+def _overlaps_exon(transcript: typing.Any, contig: str, start: int, end: int) -> bool:
+    """Return whether an exon of ``transcript`` on ``contig`` overlaps ``[start, end)``."""
+    return any(
+        exon[0] < end and start < exon[1]
+        for build_data in transcript["genome_builds"].values()
+        if build_data["contig"] == contig
+        for exon in build_data["exons"]
+    )
+
+
+def find_transcripts_in_region(
+    data_provider: LocalDataProvider, contig: str, start: int, end: int, exonic: bool = False
+) -> list[str]:
+    """Return the IDs of the transcripts overlapping the interbase region ``[start, end)``.
+
+    The transcripts are sorted by start position.  With ``exonic``, only transcripts with an
+    exon overlapping the region are returned.
+    """
+    intervals = sorted(data_provider._get_contig_interval_tree(contig)[start:end])
+    return [
+        interval.data
+        for interval in intervals
+        if not exonic
+        or _overlaps_exon(data_provider.transcripts[interval.data], contig, start, end)
+    ]
+
+
+@dataclasses.dataclass(frozen=True)
+class GeneInfo:
+    """Summary of a gene for the gene search."""
+
+    #: HGNC ID, e.g., ``HGNC:1100``.
+    hgnc_id: str
+    #: HGNC symbol.
+    symbol: str
+    #: Alias symbols.
+    aliases: tuple[str, ...] = ()
+    #: Description, if known.
+    description: str | None = None
+
+
+class GeneIndex:
+    """Index of the gene symbols, aliases and HGNC IDs for exact and prefix search.
+
+    The names are kept in a sorted list, so lookups are binary searches.  Matching is
+    case-insensitive; symbols are ranked before aliases and HGNC IDs of the same name.
+    """
+
+    def __init__(self, genes: typing.Iterable[GeneInfo] = ()):
+        #: The genes by HGNC ID.
+        self.genes: dict[str, GeneInfo] = {}
+        entries: list[tuple[str, int, str, str]] = []
+        for gene in genes:
+            self.genes[gene.hgnc_id] = gene
+            names = [gene.symbol, *gene.aliases, gene.hgnc_id]
+            for rank, name in enumerate(names):
+                entries.append((name.upper(), min(rank, 1), name, gene.hgnc_id))
+        entries.sort()
+        #: The upper-case names, sorted.
+        self._keys = [key for key, _, _, _ in entries]
+        #: The names as given, in the order of ``_keys``.
+        self._names = [name for _, _, name, _ in entries]
+        #: The HGNC IDs of the names, in the order of ``_keys``.
+        self._hgnc_ids = [hgnc_id for _, _, _, hgnc_id in entries]
+
+    def __len__(self) -> int:
+        return len(self.genes)
+
+    def search(
+        self, query: str, prefix: bool = False, limit: int = 10
+    ) -> list[tuple[GeneInfo, str]]:
+        """Return up to ``limit`` genes with a name equal to, or with ``prefix`` starting
+        with, ``query``, each with the first name that matched."""
+        key = query.strip().upper()
+        result: list[tuple[GeneInfo, str]] = []
+        seen: set[str] = set()
+        for idx in range(bisect.bisect_left(self._keys, key), len(self._keys)):
+            if len(result) >= limit or not (
+                self._keys[idx].startswith(key) if prefix else self._keys[idx] == key
+            ):
+                break
+            if self._hgnc_ids[idx] not in seen:
+                seen.add(self._hgnc_ids[idx])
+                result.append((self.genes[self._hgnc_ids[idx]], self._names[idx]))
+        return result
+
+    def lookup(self, name: str) -> str | None:
+        """Return the HGNC ID of the gene with the symbol, alias or HGNC ID ``name``."""
+        matches = self.search(name, limit=1)
+        return matches[0][0].hgnc_id if matches else None
+
+
+def build_gene_index(driver: Driver, hgnc_to_transcripts: dict[str, list[str]]) -> GeneIndex:
+    """Build the ``GeneIndex`` of the genes with transcripts in ``hgnc_to_transcripts``, the
+    accessions of the transcripts by HGNC ID.
+
+    The symbols are taken from the first transcript of each gene, the aliases and
+    descriptions from the gene records of the cdot data, if any.
+    """
+    start_time = time.time()
+    genes = []
+    for hgnc_id, tx_acs in hgnc_to_transcripts.items():
+        symbol = next(
+            data_provider.transcripts[tx_acs[0]]["gene_name"]
+            for data_provider in driver.data_providers.values()
+            if tx_acs[0] in data_provider.transcripts
+        )
+        record = None
+        for data_provider in driver.data_providers.values():
+            record = record or data_provider._get_gene(symbol)
+        aliases = (record or {}).get("aliases") or ""
+        genes.append(
+            GeneInfo(
+                hgnc_id=hgnc_id,
+                symbol=symbol,
+                aliases=tuple(alias.strip() for alias in aliases.split(",") if alias.strip()),
+                description=(record or {}).get("description") or None,
+            )
+        )
+    index = GeneIndex(genes)
+    elapsed = time.time() - start_time
+    LOAD_DURATION.set(elapsed, "building gene index")
+    _logger.info("... built gene index of %d genes in %s", len(index), timedelta(seconds=elapsed))
+    return index
@@ -1,16 +1,53 @@
+import asyncio
+import collections
+import dataclasses
+import enum
+import gzip
+import hashlib
 import logging
+import os
+import re
+import secrets
 import sys
 import typing
+import weakref
+from collections.abc import Mapping
 from contextlib import asynccontextmanager
 
-import bioutils.assemblies
 import hgvs.exceptions
 import pydantic
 import yaml
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.types import Receive, Scope, Send
 
+from dotty.cache import PersistentCache, PersistentKey, ResultCache, SingleFlight
 from dotty.config import settings
-from dotty.core import Assembly, Driver
+from dotty.core import contig_names  # noqa: F401
+from dotty.core import (
+    Assembly,
+    DataNotLoadedError,
+    DecodedJSONDataProvider,
+    Driver,
+    UnsupportedVariantError,
+    contig_accessions,
+    missing_data_files,
+    project_substitutions_to_vcf,
+    project_to_vcf,
+)
+from dotty.executor import Dispatcher, DispatcherSaturatedError, ExecutionMode
+from dotty.index import (
+    GeneIndex,
+    GeneInfo,
+    build_gene_index,
+    build_region_index,
+    find_transcripts_in_region,
+    is_valid_transcript,
+    load_or_build_hgnc_index,
+)
+from dotty.metrics import REGISTRY, CallbackMetric, MetricsMiddleware, Sample
+from dotty.registry import DataRegistry, DataVersionError, TranscriptPool
+from dotty.store import CompactTranscript
 
 logging.basicConfig(level=logging.INFO)
 
@@ -18,65 +55,417 @@ _logger = logging.getLogger(__name__)
 
 #: The global Driver instance.
 driver: Driver = None  # type: ignore[assignment]
-#: Map from HGNC ID to transcripts.
-hgnc_to_transcripts: dict[str, list[typing.Any]] = {}
-#: Map from Assembly to map from hgnc_id to transcripts.
-assembly_to_hgnc_to_transcripts: dict[Assembly, dict[str, list[typing.Any]]] = {}
+#: Map from HGNC ID to the accessions of its transcripts of all assemblies.
+hgnc_to_transcripts: dict[str, list[str]] = {}
+#: Map from Assembly to map from hgnc_id to the accessions of its transcripts.
+assembly_to_hgnc_to_transcripts: dict[Assembly, dict[str, list[str]]] = {}
+#: Index of the gene symbols, aliases and HGNC IDs.
+gene_index = GeneIndex()
+#: The assemblies that are being served, none or some while loading in the background.
+served_assemblies: frozenset[Assembly] = frozenset(Assembly)
+
+
+#: The drivers of the loaded data versions by version, as long as they are referenced, e.g.,
+#: by requests in flight.  Forked worker processes inherit them.
+live_drivers: weakref.WeakValueDictionary[str, Driver] = weakref.WeakValueDictionary()
+
+
+def _init_worker():  # pragma: no cover
+    """Initialize a worker process, loads the data unless inherited from the parent."""
+    global driver
+    if driver is None:
+        driver = Driver(cdot_dir=settings.DATA_DIR)
+        driver.load()
+        live_drivers[driver.data_version] = driver
+
+
+#: Dispatches the projection work to the worker pool.
+dispatcher = Dispatcher(
+    mode=ExecutionMode(settings.EXECUTION_MODE),
+    max_workers=settings.EXECUTION_WORKERS,
+    max_pending=settings.EXECUTION_MAX_PENDING,
+    initializer=_init_worker,
+)
+
+
+@dataclasses.dataclass(frozen=True)
+class LoadedData:
+    """The driver and the transcript indexes of one data version."""
+
+    #: The loaded driver.
+    driver: Driver
+    #: Map from HGNC ID to the accessions of its transcripts of all assemblies.
+    hgnc_to_transcripts: dict[str, list[str]]
+    #: Map from Assembly to map from hgnc_id to the accessions of its transcripts.
+    assembly_to_hgnc_to_transcripts: dict[Assembly, dict[str, list[str]]]
+    #: Index of the gene symbols, aliases and HGNC IDs.
+    gene_index: GeneIndex = dataclasses.field(default_factory=GeneIndex)
+    #: The assemblies that have been loaded.
+    assemblies: frozenset[Assembly] = frozenset(Assembly)
+
+
+#: Shares identical transcript records between the loaded data versions.
+transcript_pool = TranscriptPool()
+
+
+def _share(transcript: Mapping[str, typing.Any]) -> Mapping[str, typing.Any]:
+    """Return the record of ``transcript`` to keep in the indexes.
+
+    The record is compact if ``COMPACT_TRANSCRIPTS`` is set, and shared if several data
+    versions may be loaded.
+    """
+    if settings.COMPACT_TRANSCRIPTS and not isinstance(transcript, CompactTranscript):
+        transcript = CompactTranscript(transcript)
+    return transcript_pool.intern(transcript) if settings.MAX_DATA_VERSIONS > 1 else transcript
+
+
+class LoadState(enum.Enum):
+    """State of loading the data of an assembly."""
+
+    #: Not being loaded yet.
+    PENDING = "pending"
+    #: The data files are being loaded.
+    LOADING = "loading"
+    #: The transcript indexes are being built.
+    INDEXING = "indexing"
+    #: The data is being served.
+    READY = "ready"
+    #: Loading the data failed.
+    FAILED = "failed"
+
+
+#: The order of loading the assemblies one after another, newest first.
+ASSEMBLY_LOAD_ORDER = (Assembly.GRCH38, Assembly.GRCH37)
+
+
+def _index_assembly(driver: Driver, assembly: Assembly) -> dict[str, list[str]]:
+    """Build the transcript indexes of ``assembly``, return the map from HGNC ID to the
+    accessions of its transcripts.
+
+    If several data versions may be loaded, decoded transcripts that are identical in other
+    versions are shared with them.  Snapshots decode the transcripts on access, so they are
+    only decoded when requested.
+    """
+    data_provider = driver.data_providers[assembly]
+    if settings.MAX_DATA_VERSIONS > 1 and isinstance(data_provider, DecodedJSONDataProvider):
+        data_provider.transcripts = {
+            tx_ac: _share(transcript) for tx_ac, transcript in data_provider.transcripts.items()
+        }
+    hgnc_to_transcripts = load_or_build_hgnc_index(driver, assembly)
+    build_region_index(driver, assembly)
+    return hgnc_to_transcripts
+
+
+def build_data(
+    data_version: str | None = None,
+    on_progress: typing.Callable[[Assembly, LoadState], None] | None = None,
+    on_assembly_loaded: typing.Callable[[LoadedData], None] | None = None,
+) -> LoadedData:
+    """Load the driver of ``data_version`` and build the transcript indexes.
+
+    The progress of each assembly is reported to ``on_progress``.  With
+    ``on_assembly_loaded``, the assemblies are loaded one after another in
+    ``ASSEMBLY_LOAD_ORDER``, and the data of the ones loaded so far is passed to it after
+    each.
+    """
+    new_driver = Driver(cdot_dir=settings.DATA_DIR, data_version=data_version)
+    live_drivers[new_driver.data_version] = new_driver
+    steps = [[assembly] for assembly in ASSEMBLY_LOAD_ORDER]
+    if on_assembly_loaded is None:
+        steps = [list(Assembly)]
+    new_assembly_to_hgnc_to_transcripts: dict[Assembly, dict[str, list[str]]] = {}
+    for assemblies in steps:
+        for assembly in assemblies:
+            if on_progress is not None:
+                on_progress(assembly, LoadState.LOADING)
+        new_driver.load(assemblies)
+        _logger.info("driver loaded")
+        for assembly in assemblies:
+            if on_progress is not None:
+                on_progress(assembly, LoadState.INDEXING)
+            new_assembly_to_hgnc_to_transcripts[assembly] = _index_assembly(new_driver, assembly)
+        _logger.info("map built")
+        new_hgnc_to_transcripts: dict[str, list[str]] = {}
+        for assembly in Assembly:
+            for hgnc_id, transcripts in new_assembly_to_hgnc_to_transcripts.get(
+                assembly, {}
+            ).items():
+                new_hgnc_to_transcripts.setdefault(hgnc_id, []).extend(transcripts)
+        data = LoadedData(
+            driver=new_driver,
+            hgnc_to_transcripts=new_hgnc_to_transcripts,
+            assembly_to_hgnc_to_transcripts=dict(new_assembly_to_hgnc_to_transcripts),
+            gene_index=build_gene_index(new_driver, new_hgnc_to_transcripts),
+            assemblies=frozenset(new_assembly_to_hgnc_to_transcripts),
+        )
+        if on_assembly_loaded is not None:
+            on_assembly_loaded(data)
+    return data
+
+
+def swap_data(data: LoadedData):
+    """Serve ``data`` from now on.
+
+    Requests read the global references once, so requests that are in flight finish on the
+    data they started with.
+    """
+    global driver, hgnc_to_transcripts, assembly_to_hgnc_to_transcripts, gene_index
+    global served_assemblies
+    driver = data.driver
+    hgnc_to_transcripts = data.hgnc_to_transcripts
+    assembly_to_hgnc_to_transcripts = data.assembly_to_hgnc_to_transcripts
+    gene_index = data.gene_index
+    served_assemblies = data.assemblies
+
+
+#: Whether the data has been loaded, e.g., by the master process of ``python -m dotty serve``.
+data_loaded = False
+
+#: Whether this is a worker process of ``python -m dotty serve``, where the master reloads.
+forked_worker = False
+
+
+def load_data():
+    """Load the driver and build the transcript indexes."""
+    global data_loaded
+    swap_data(build_data())
+    data_loaded = True
+
+
+#: The state of loading each assembly in the background, until it is served.
+load_states: dict[Assembly, LoadState] = {}
+#: Error of loading the data in the background, if it failed.
+load_error: str | None = None
+#: The task loading the data in the background, referenced until done.
+load_tasks: set[asyncio.Task[None]] = set()
+
+
+def _set_load_state(assembly: Assembly, state: LoadState):
+    """Record the state of loading ``assembly`` in the background."""
+    load_states[assembly] = state
 
-#: Contig names per assembly.
-contig_names: dict[Assembly, set[str]] = {
-    assembly: set(
-        sr["refseq_ac"] for sr in bioutils.assemblies.get_assembly(assembly.value)["sequences"]
+
+def _load_state(assembly: Assembly) -> LoadState:
+    """Return the state of loading ``assembly``."""
+    if assembly in served_assemblies:
+        return LoadState.READY
+    return load_states.get(assembly, LoadState.PENDING)
+
+
+async def _load_data_in_background():
+    """Load the data in a thread and serve it once loaded.
+
+    With ``SERVE_ASSEMBLIES_EARLY``, each assembly is served as soon as it has been loaded.
+    In ``process`` execution mode, the worker processes are forked once all data has been
+    loaded, so they inherit it.
+    """
+    global data_loaded, load_error
+    loop = asyncio.get_running_loop()
+
+    def on_assembly_loaded(data: LoadedData):
+        # Swap on the event loop, as for reloads.
+        loop.call_soon_threadsafe(swap_data, data)
+
+    serve_early = settings.SERVE_ASSEMBLIES_EARLY and dispatcher.mode != ExecutionMode.PROCESS
+    try:
+        data = await asyncio.to_thread(
+            build_data, None, _set_load_state, on_assembly_loaded if serve_early else None
+        )
+    except Exception as e:
+        _logger.exception("Loading the data failed")
+        load_error = f"Loading the data failed: {e}"
+        for assembly in Assembly:
+            if _load_state(assembly) != LoadState.READY:
+                load_states[assembly] = LoadState.FAILED
+        return
+    swap_data(data)
+    data_loaded = True
+    if dispatcher.mode == ExecutionMode.PROCESS:
+        dispatcher.start()
+    _logger.info("Now serving data version %s", data.driver.data_version)
+
+
+def start_loading():
+    """Start loading the data in the background, nothing is served until loaded."""
+    global served_assemblies
+    served_assemblies = frozenset()
+    load_task = asyncio.create_task(_load_data_in_background())
+    load_tasks.add(load_task)
+    load_task.add_done_callback(load_tasks.discard)
+
+
+def _load_version(data_version: str) -> LoadedData:
+    """Load another data version than the served one into ``data_registry``.
+
+    :raises DataVersionError: if the version is not available
+    """
+    if settings.MAX_DATA_VERSIONS < 2:
+        raise DataVersionError(f"Only data version {driver.data_version} is served")
+    if dispatcher.mode == ExecutionMode.PROCESS or forked_worker:
+        # Each worker process would load the version on its own.
+        raise DataVersionError(
+            f"Only data version {driver.data_version} is served with worker processes, "
+            "other versions need a single process in thread execution mode"
+        )
+    if not re.fullmatch(r"[\w.-]+", data_version) or missing_data_files(
+        settings.DATA_DIR, data_version
+    ):
+        raise DataVersionError(f"Unknown data version {data_version}")
+    _logger.info("Loading data version %s on request", data_version)
+    return build_data(data_version)
+
+
+def _drop_version_responses(data_version: str):
+    """Drop the cached ``find-transcripts`` responses of the removed ``data_version``."""
+    # Copied first, as the responses are added on the event loop while versions are
+    # evicted by the loading threads.
+    for key in list(transcript_responses):
+        if key[2] == data_version:
+            transcript_responses.pop(key, None)
+
+
+#: The data versions besides the served one, loaded on request.
+data_registry: DataRegistry[LoadedData] = DataRegistry(
+    _load_version,
+    max_versions=max(1, settings.MAX_DATA_VERSIONS - 1),
+    memory_budget=settings.DATA_MEMORY_BUDGET * 1024 * 1024,
+    on_remove=_drop_version_responses,
+)
+
+
+def _served_data() -> LoadedData:
+    """Return the data being served by default.
+
+    :raises DataNotLoadedError: if the data is still being loaded
+    """
+    if not served_assemblies:
+        raise DataNotLoadedError("The data is still being loaded")
+    return LoadedData(
+        driver=driver,
+        hgnc_to_transcripts=hgnc_to_transcripts,
+        assembly_to_hgnc_to_transcripts=assembly_to_hgnc_to_transcripts,
+        gene_index=gene_index,
+        assemblies=served_assemblies,
     )
-    for assembly in Assembly
-}
+
+
+def _check_assembly(data: LoadedData, assembly: Assembly | None) -> LoadedData:
+    """Return ``data`` if it has ``assembly``.
+
+    :raises DataNotLoadedError: if the data of ``assembly`` is still being loaded
+    """
+    if assembly is not None and assembly not in data.assemblies:
+        raise DataNotLoadedError(f"The data of {assembly.value} is still being loaded")
+    return data
+
+
+def get_data(data_version: str | None = None, assembly: Assembly | None = None) -> LoadedData:
+    """Return the data of ``data_version``, the served data by default, loading it if needed.
+
+    :raises DataVersionError: if the version is not available
+    :raises DataNotLoadedError: if the served data of ``assembly`` is still being loaded
+    """
+    data = _served_data()
+    if data_version is None or data_version == data.driver.data_version:
+        return _check_assembly(data, assembly)
+    return data_registry.get(data_version)
+
+
+#: The driver to use in dispatched work: the driver itself, or its data version in ``process``
+#: execution mode, where the worker processes hold it in ``live_drivers``.
+DriverHandle = Driver | str
+
+
+def _driver_handle(data: LoadedData) -> DriverHandle:
+    """Return the handle of the driver of ``data`` to pass to dispatched work.
+
+    In ``process`` execution mode, the caller keeps a reference to ``data`` until the work
+    is done, so worker processes forked meanwhile inherit the driver.
+    """
+    if dispatcher.mode == ExecutionMode.PROCESS:
+        return data.driver.data_version
+    return data.driver
+
+
+def _resolve_driver(handle: DriverHandle) -> Driver:
+    """Return the driver of ``handle`` in the worker.
+
+    :raises DataVersionError: if the data version is not loaded in this worker process
+    """
+    if not isinstance(handle, str):
+        return handle
+    current_driver = live_drivers.get(handle)
+    if current_driver is None:
+        raise DataVersionError(f"Data version {handle} is not loaded in this worker")
+    return current_driver
+
+
+async def _get_data(data_version: str | None, assembly: Assembly | None = None) -> LoadedData:
+    """Return the data of ``data_version`` as ``get_data()``, loading it in a thread."""
+    data = _served_data()
+    if data_version is None or data_version == data.driver.data_version:
+        return _check_assembly(data, assembly)
+    loaded = data_registry.peek(data_version)
+    if loaded is None:
+        loaded = await asyncio.to_thread(get_data, data_version)
+    return loaded
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):  # pragma: no cover
-    global driver
     _ = app
-    driver = Driver(cdot_dir=settings.DATA_DIR)
-    driver.load()
-    _logger.info("driver loaded")
-    for assembly in Assembly:
-        for transcript in driver.data_providers[assembly].transcripts.keys():
-            if (
-                assembly.value
-                not in driver.data_providers[assembly]
-                ._get_transcript(transcript)["genome_builds"]
-                .keys()  # genome build is not in the transcript data
-                or "hgnc" not in driver.data_providers[assembly]._get_transcript(transcript)
-                or "cds_start"
-                not in driver.data_providers[assembly]
-                ._get_transcript(transcript)["genome_builds"][assembly.value]
-                .keys()
-                or "cds_end"
-                not in driver.data_providers[assembly]
-                ._get_transcript(transcript)["genome_builds"][assembly.value]
-                .keys()
-                or "exons"
-                not in driver.data_providers[assembly]
-                ._get_transcript(transcript)["genome_builds"][assembly.value]
-                .keys()
-            ):
-                _logger.debug(
-                    f"Skipping transcript {transcript} as it does not have all required data"
-                )
-                continue
-            hgnc_id = f"HGNC:{driver.data_providers[assembly]._get_transcript(transcript)['hgnc']}"
-            hgnc_to_transcripts.setdefault(hgnc_id, []).append(
-                driver.data_providers[assembly]._get_transcript(transcript)
-            )
-        assembly_to_hgnc_to_transcripts[assembly] = hgnc_to_transcripts
-    _logger.info("map built")
+    if data_loaded or not settings.BACKGROUND_LOADING:
+        if not data_loaded:
+            load_data()
+        # Start the workers after loading so forked worker processes inherit the data.
+        dispatcher.start()
+    else:
+        if dispatcher.mode != ExecutionMode.PROCESS:
+            dispatcher.start()
+        start_loading()
     yield
+    dispatcher.shutdown()
 
 
 app = FastAPI(
     title="dotty",
     lifespan=lifespan,
 )
+app.add_middleware(MetricsMiddleware)
+
+
+@app.exception_handler(UnsupportedVariantError)
+async def unsupported_variant_handler(request: Request, exc: UnsupportedVariantError):
+    """Reply with HTTP 400 for unsupported variants."""
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+
+@app.exception_handler(DataVersionError)
+async def data_version_handler(request: Request, exc: DataVersionError):
+    """Reply with HTTP 404 for data versions that are not available."""
+    return JSONResponse(status_code=404, content={"detail": str(exc)})
+
+
+#: Seconds after which to retry requests for data that is still being loaded.
+LOADING_RETRY_AFTER = 10
+
+
+@app.exception_handler(DataNotLoadedError)
+async def data_not_loaded_handler(request: Request, exc: DataNotLoadedError):
+    """Reply with HTTP 503 while the requested data is being loaded."""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(LOADING_RETRY_AFTER)},
+    )
+
+
+@app.exception_handler(DispatcherSaturatedError)
+async def dispatcher_saturated_handler(request: Request, exc: DispatcherSaturatedError):
+    """Reply with HTTP 429 when the workers are saturated."""
+    return JSONResponse(
+        status_code=429, content={"detail": "Too many requests"}, headers={"Retry-After": "1"}
+    )
 
 
 class Spdi(pydantic.BaseModel):
@@ -149,7 +538,7 @@ class TanscriptAlignment(pydantic.BaseModel):
     exons: list[ExonAlignment]
 
     @staticmethod
-    def _from_dict(assembly, dct: dict[str, typing.Any]) -> "TanscriptAlignment":
+    def _from_dict(assembly, dct: Mapping[str, typing.Any]) -> "TanscriptAlignment":
         """Create a ``TanscriptAlignment`` from a dictionary."""
         return TanscriptAlignment(
             assembly=assembly,
@@ -173,7 +562,7 @@ class Transcript(pydantic.BaseModel):
     alignments: list[TanscriptAlignment]
 
     @staticmethod
-    def _from_dict(assembly: str, dct: dict[str, typing.Any]) -> "Transcript":
+    def _from_dict(assembly: str, dct: Mapping[str, typing.Any]) -> "Transcript":
         """Create a ``Transcript`` from a dictionary."""
         return Transcript(
             id=dct["id"],
@@ -194,27 +583,88 @@ class TranscriptResult(pydantic.BaseModel):
     transcripts: list[Transcript]
 
 
-@app.get("/api/v1/to-spdi", response_model=SpdiResult)
-async def to_spdi(q: str, assembly: Assembly = Assembly.GRCH38) -> SpdiResult:
-    """Resolve the given HGVS variant to SPDI representation."""
+class Gene(pydantic.BaseModel):
+    """Gene model."""
+
+    #: Gene HGNC ID.
+    hgnc_id: str
+    #: Gene HGNC symbol.
+    hgnc_symbol: str
+    #: Alias symbols.
+    aliases: list[str]
+    #: Description, if known.
+    description: str | None = None
+    #: The symbol, alias or HGNC ID that matched the query.
+    matched: str
+
+    @staticmethod
+    def _from_info(info: GeneInfo, matched: str) -> "Gene":
+        """Create a ``Gene`` from the ``GeneInfo`` of the gene index."""
+        return Gene(
+            hgnc_id=info.hgnc_id,
+            hgnc_symbol=info.symbol,
+            aliases=list(info.aliases),
+            description=info.description,
+            matched=matched,
+        )
+
+
+class GeneResult(pydantic.BaseModel):
+    """The result of the query for searching for genes."""
+
+    #: The matching genes.
+    genes: list[Gene]
+
+
+class SpdiQuery(pydantic.BaseModel):
+    """One query of a batch request."""
+
+    #: The HGVS variant description.
+    q: str
+    #: The assembly to project to.
+    assembly: Assembly = Assembly.GRCH38
+    #: The data version, the served one by default.
+    data_version: str | None = None
+
+
+class SpdiBatchResult(pydantic.BaseModel):
+    """The results of a batch request."""
+
+    #: One result for each query, in the same order.
+    results: list[SpdiResult]
+
+
+#: Cache of the ``to-spdi`` results, parse errors are cached as well.
+result_cache: ResultCache[tuple[str, Assembly, str, bool], SpdiResult] = ResultCache(
+    max_size=settings.RESULT_CACHE_SIZE, ttl=settings.RESULT_CACHE_TTL
+)
+#: The persistent cache of ``to-spdi`` results, if enabled.
+persistent_cache: PersistentCache | None = (
+    PersistentCache(
+        os.path.join(settings.DATA_DIR, settings.PERSISTENT_CACHE),
+        max_size=settings.PERSISTENT_CACHE_SIZE * 2**20,
+    )
+    if settings.PERSISTENT_CACHE
+    else None
+)
+#: Coalesces concurrent ``to-spdi`` requests with the same key of the result cache.
+spdi_flights: SingleFlight[tuple[str, Assembly, str, bool], SpdiResult] = SingleFlight()
+
+
+def _to_spdi(q: str, assembly: Assembly, handle: DriverHandle) -> SpdiResult:
+    """Resolve the HGVS variant ``q`` to SPDI representation with the driver of ``handle``."""
+    current_driver = _resolve_driver(handle)
     try:
-        parsed_var = driver.parser.parse(q)
+        vcf = project_to_vcf(current_driver, q, assembly)
     except hgvs.exceptions.HGVSParseError as e:
         return SpdiResult(success=False, value=None, message=f"Problem parsing HGVS: {e}")
+    return _spdi_result(*vcf)
 
-    if parsed_var.type == "c":
-        var_g = driver.assembly_mappers[assembly].c_to_g(parsed_var)
-    elif parsed_var.type == "n":
-        var_g = driver.assembly_mappers[assembly].n_to_g(parsed_var)
-    elif parsed_var.type == "g":
-        var_g = parsed_var
-        if var_g.ac in contig_names[Assembly.GRCH37]:
-            assembly = Assembly.GRCH37
-    else:  # pragma: no cover
-        raise HTTPException(status_code=400, detail="Invalid variant type")
-
-    contig, pos, reference, alternative, type_ = driver.babelfishes[assembly].hgvs_to_vcf(var_g)
 
+def _spdi_result(
+    assembly: Assembly, contig: str, pos: int, reference: str, alternative: str
+) -> SpdiResult:
+    """Return the successful result for a variant projected to VCF-style coordinates."""
     return SpdiResult(
         success=True,
         value=Spdi(
@@ -227,25 +677,973 @@ async def to_spdi(q: str, assembly: Assembly = Assembly.GRCH38) -> SpdiResult:
     )
 
 
+#: A query of a batch with the handle of the driver to resolve it with.
+BatchItem = tuple[str, Assembly, DriverHandle]
+
+
+def _to_spdi_batch_items(items: list[BatchItem]) -> list[tuple[SpdiResult, bool]]:
+    """Resolve the queries of a batch, reporting any error in the results.
+
+    Returns the results together with a flag whether they may be cached.  Substitutions are
+    projected together with the vectorized projection, the other queries one by one.
+    """
+    projected = _project_substitutions(items)
+    results = []
+    for (q, assembly, handle), vcf in zip(items, projected):
+        if vcf is not None:
+            results.append((_spdi_result(*vcf), True))
+            continue
+        try:
+            results.append((_to_spdi(q, assembly, handle), True))
+        except Exception as e:
+            results.append(
+                (
+                    SpdiResult(success=False, value=None, message=f"Problem resolving HGVS: {e}"),
+                    False,
+                )
+            )
+    return results
+
+
+def _project_substitutions(
+    items: list[BatchItem],
+) -> list[tuple[Assembly, str, int, str, str] | None]:
+    """Project the substitutions among ``items`` with the vectorized projection, by assembly
+    and driver; ``None`` for the queries to resolve one by one."""
+    groups: dict[tuple[Assembly, DriverHandle], list[int]] = {}
+    for i, (_, assembly, handle) in enumerate(items):
+        groups.setdefault((assembly, handle), []).append(i)
+    results: list[tuple[Assembly, str, int, str, str] | None] = [None] * len(items)
+    for (assembly, handle), indices in groups.items():
+        group_queries = [items[i][0] for i in indices]
+        try:
+            current_driver = _resolve_driver(handle)
+            projected = project_substitutions_to_vcf(current_driver, group_queries, assembly)
+        except Exception:
+            continue  # resolved one by one, reporting the errors
+        for i, vcf in zip(indices, projected):
+            results[i] = vcf
+    return results
+
+
+def _result_cache_key(
+    q: str, assembly: Assembly, data_version: str
+) -> tuple[str, Assembly, str, bool]:
+    """Return the key of ``result_cache`` for the query."""
+    return (q.strip(), assembly, data_version, settings.HAVE_SEQREPO)
+
+
+@app.get("/api/v1/to-spdi", response_model=SpdiResult)
+async def to_spdi(
+    q: str, assembly: Assembly = Assembly.GRCH38, data_version: str | None = None
+) -> SpdiResult:
+    """Resolve the given HGVS variant to SPDI representation.
+
+    The served data version is used unless another ``data_version`` is given.
+    """
+    data = await _get_data(data_version, assembly)
+    key = _result_cache_key(q, assembly, data.driver.data_version)
+    result = result_cache.get(key)
+    if result is None:
+        result = await spdi_flights.run(key, lambda: _resolve_spdi(key, data))
+    return result
+
+
+async def _resolve_spdi(key: tuple[str, Assembly, str, bool], data: LoadedData) -> SpdiResult:
+    """Resolve the variant of the result cache ``key`` with ``data``, from the persistent
+    cache if it is there, and cache the result."""
+    (result,) = await _read_persistent([key])
+    if result is None:
+        q, assembly, _, _ = key
+        result = await dispatcher.run(_to_spdi, q, assembly, _driver_handle(data))
+        await _write_persistent([(key, result)])
+    result_cache.put(key, result)
+    return result
+
+
+def _persistent_key(key: tuple[str, Assembly, str, bool]) -> PersistentKey:
+    """Return the key of the persistent cache for the result cache ``key``."""
+    q, assembly, data_version, normalize = key
+    return (q, assembly.value, data_version, normalize)
+
+
+async def _read_persistent(
+    keys: list[tuple[str, Assembly, str, bool]],
+) -> list[SpdiResult | None]:
+    """Return the results of the result cache ``keys`` from the persistent cache, ``None`` for
+    those that are not cached."""
+    if persistent_cache is None or not keys:
+        return [None] * len(keys)
+    payloads = await asyncio.to_thread(
+        persistent_cache.get_many, [_persistent_key(key) for key in keys]
+    )
+    return [
+        SpdiResult.model_validate_json(payload) if payload is not None else None
+        for payload in payloads
+    ]
+
+
+async def _write_persistent(items: list[tuple[tuple[str, Assembly, str, bool], SpdiResult]]):
+    """Store the results of the result cache keys of ``items`` in the persistent cache."""
+    if persistent_cache is None or not items:
+        return
+    await asyncio.to_thread(
+        persistent_cache.put_many,
+        [(_persistent_key(key), result.model_dump_json()) for key, result in items],
+    )
+
+
+async def _resolve_queries(queries: list[SpdiQuery], chunks: int) -> list[SpdiResult]:
+    """Resolve ``queries`` through the result cache and the dispatcher.
+
+    The queries that are not cached are split into at most ``chunks`` dispatcher calls.
+
+    :raises DataVersionError: if a data version of the queries is not available
+    :raises DataNotLoadedError: if the data of an assembly of the queries is being loaded
+    """
+    # The data of each requested version is kept until the queries have been resolved.
+    datas: dict[str | None, LoadedData] = {}
+    for data_version, assembly in {(query.data_version, query.assembly) for query in queries}:
+        datas[data_version] = await _get_data(data_version, assembly)
+    keys = [
+        _result_cache_key(query.q, query.assembly, datas[query.data_version].driver.data_version)
+        for query in queries
+    ]
+    results = [result_cache.get(key) for key in keys]
+    missing = [i for i, result in enumerate(results) if result is None]
+    persisted = await _read_persistent([keys[i] for i in missing])
+    for i, result in zip(missing, persisted):
+        if result is not None:
+            results[i] = result
+            result_cache.put(keys[i], result)
+    missing = [i for i in missing if results[i] is None]
+    handles = {version: _driver_handle(data) for version, data in datas.items()}
+    uncached: list[BatchItem] = [
+        (keys[i][0], queries[i].assembly, handles[queries[i].data_version]) for i in missing
+    ]
+    chunk_size = max(1, -(-len(uncached) // chunks))
+    chunk_results = await asyncio.gather(
+        *(
+            dispatcher.run(_to_spdi_batch_items, uncached[i : i + chunk_size])
+            for i in range(0, len(uncached), chunk_size)
+        )
+    )
+    resolved = []
+    for i, (result, cacheable) in zip(missing, (item for items in chunk_results for item in items)):
+        results[i] = result
+        if cacheable:
+            result_cache.put(keys[i], result)
+            resolved.append((keys[i], result))
+    await _write_persistent(resolved)
+    return typing.cast(list[SpdiResult], results)
+
+
+@app.post("/api/v1/to-spdi/batch", response_model=SpdiBatchResult)
+async def to_spdi_batch(queries: list[SpdiQuery]) -> SpdiBatchResult:
+    """Resolve the given HGVS variants to SPDI representation.
+
+    Errors are reported for each query, the request only fails if it is malformed or a data
+    version is not available.
+    """
+    if len(queries) > settings.MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413, detail=f"At most {settings.MAX_BATCH_SIZE} queries per batch"
+        )
+    # Split the queries into one chunk per worker.
+    results = await _resolve_queries(queries, chunks=dispatcher.max_workers)
+    return SpdiBatchResult(results=results)
+
+
+async def _iter_lines(stream: typing.AsyncIterator[bytes]) -> typing.AsyncIterator[str]:
+    """Yield the stripped, non-empty lines of the byte ``stream``.
+
+    :raises HTTPException: 413 if a line is longer than ``MAX_LINE_LENGTH`` bytes
+    """
+    # The parts of the current line, only the new data is searched for line ends.
+    parts: list[bytes] = []
+    length = 0
+    async for data in stream:
+        start = 0
+        while True:
+            end = data.find(b"\n", start)
+            part = data[start:] if end == -1 else data[start:end]
+            length += len(part)
+            if length > settings.MAX_LINE_LENGTH:
+                raise HTTPException(
+                    status_code=413, detail=f"Line longer than {settings.MAX_LINE_LENGTH} bytes"
+                )
+            if end == -1:
+                if part:
+                    parts.append(part)
+                break
+            line = b"".join([*parts, part]).strip()
+            parts, length = [], 0
+            if line:
+                yield line.decode("utf-8", errors="replace")
+            start = end + 1
+    line = b"".join(parts).strip()
+    if line:
+        yield line.decode("utf-8", errors="replace")
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """Streaming response whose body is sent while the request body is still being read.
+
+    ``StreamingResponse`` watches for client disconnects by consuming ``receive()``, which
+    would swallow the request body.  Here, disconnects surface when reading the request.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:  # pragma: no cover
+            await self.background()
+
+
+#: Seconds to wait before retrying a stream chunk when the dispatcher is saturated.
+STREAM_SATURATED_DELAY = 0.05
+
+
+async def _resolve_stream_chunk(queries: list[SpdiQuery]) -> bytes:
+    """Resolve the queries of a stream chunk to NDJSON lines.
+
+    The response has already started, so instead of failing when the dispatcher is
+    saturated, the chunk waits for capacity.
+    """
+    while True:
+        try:
+            results = await _resolve_queries(queries, chunks=1)
+            break
+        except DispatcherSaturatedError:
+            await asyncio.sleep(STREAM_SATURATED_DELAY)
+    return b"".join(result.model_dump_json().encode("utf-8") + b"\n" for result in results)
+
+
+@app.post(
+    "/api/v1/to-spdi/stream",
+    response_class=DuplexStreamingResponse,
+    responses={200: {"content": {"application/x-ndjson": {}}}},
+)
+async def to_spdi_stream(
+    request: Request, assembly: Assembly = Assembly.GRCH38, data_version: str | None = None
+):
+    """Resolve a newline-delimited stream of HGVS variants to SPDI representation.
+
+    Returns one ``SpdiResult`` JSON line for each non-empty input line, in the same order.
+    At most ``STREAM_MAX_IN_FLIGHT`` chunks of ``STREAM_CHUNK_SIZE`` variants are resolved
+    at a time; further input is only read once the oldest chunk has been sent.  A line longer
+    than ``MAX_LINE_LENGTH`` bytes ends the response with a failed result.
+    """
+    await _get_data(data_version, assembly)  # fail before the response starts
+
+    async def generate() -> typing.AsyncIterator[bytes]:
+        in_flight: collections.deque[asyncio.Task[bytes]] = collections.deque()
+        error: SpdiResult | None = None
+        try:
+            chunk: list[SpdiQuery] = []
+            try:
+                async for line in _iter_lines(request.stream()):
+                    chunk.append(SpdiQuery(q=line, assembly=assembly, data_version=data_version))
+                    if len(chunk) >= settings.STREAM_CHUNK_SIZE:
+                        in_flight.append(asyncio.create_task(_resolve_stream_chunk(chunk)))
+                        chunk = []
+                    if len(in_flight) >= settings.STREAM_MAX_IN_FLIGHT:
+                        yield await in_flight.popleft()
+            except HTTPException as e:
+                # The response has started, so the error is reported after the results.
+                error = SpdiResult(success=False, message=e.detail)
+            if chunk:
+                in_flight.append(asyncio.create_task(_resolve_stream_chunk(chunk)))
+            while in_flight:
+                yield await in_flight.popleft()
+            if error is not None:
+                yield error.model_dump_json().encode("utf-8") + b"\n"
+        finally:
+            for task in in_flight:
+                task.cancel()
+
+    return DuplexStreamingResponse(generate(), media_type="application/x-ndjson")
+
+
+class CacheStats(pydantic.BaseModel):
+    """Statistics of a cache."""
+
+    #: Number of entries.
+    size: int
+    #: Maximal number of entries.
+    max_size: int
+    #: Number of lookups that found an entry.
+    hits: int
+    #: Number of lookups that did not find an entry.
+    misses: int
+
+    @staticmethod
+    def _from_cache(cache: ResultCache) -> "CacheStats":
+        """Create ``CacheStats`` for the given cache."""
+        return CacheStats(
+            size=len(cache), max_size=cache.max_size, hits=cache.hits, misses=cache.misses
+        )
+
+
+class PersistentCacheStats(pydantic.BaseModel):
+    """Statistics of the persistent cache, the lookups are counted in this process."""
+
+    #: Number of entries.
+    size: int
+    #: Size of the entries in bytes.
+    size_bytes: int
+    #: Maximal size of the entries in bytes, ``0`` for no limit.
+    max_size_bytes: int
+    #: Number of lookups that found an entry.
+    hits: int
+    #: Number of lookups that did not find an entry.
+    misses: int
+
+    @staticmethod
+    def _from_cache(cache: PersistentCache) -> "PersistentCacheStats":
+        """Create ``PersistentCacheStats`` for the given cache."""
+        return PersistentCacheStats(
+            size=len(cache),
+            size_bytes=cache.size(),
+            max_size_bytes=cache.max_size,
+            hits=cache.hits,
+            misses=cache.misses,
+        )
+
+
+class Stats(pydantic.BaseModel):
+    """Statistics of the server."""
+
+    #: Statistics of the ``to-spdi`` result cache.
+    result_cache: CacheStats
+    #: Statistics of the reference sequence cache, if enabled.
+    seq_cache: CacheStats | None = None
+    #: Statistics of the persistent ``to-spdi`` result cache, if enabled.
+    persistent_cache: PersistentCacheStats | None = None
+
+
+@app.get("/api/v1/stats", response_model=Stats, response_model_exclude_none=True)
+async def stats() -> Stats:
+    """Return statistics of the server.
+
+    In ``process`` execution mode, the reference sequence cache of the main process is
+    reported only.
+    """
+    seq_cache = driver.seq_cache if isinstance(driver, Driver) else None
+    return Stats(
+        result_cache=CacheStats._from_cache(result_cache),
+        seq_cache=CacheStats._from_cache(seq_cache) if seq_cache is not None else None,
+        persistent_cache=(
+            await asyncio.to_thread(PersistentCacheStats._from_cache, persistent_cache)
+            if persistent_cache is not None
+            else None
+        ),
+    )
+
+
+def _caches() -> list[tuple[str, ResultCache]]:
+    """Return the result cache and the reference sequence cache, if enabled, by name."""
+    seq_cache = driver.seq_cache if isinstance(driver, Driver) else None
+    return [("result", result_cache)] + ([("sequence", seq_cache)] if seq_cache else [])
+
+
+def _cache_samples(value: typing.Callable[[ResultCache], float]) -> list[Sample]:
+    """Return the samples of ``value`` of the caches."""
+    return [((name,), value(cache)) for name, cache in _caches()]
+
+
+def _persistent_cache_samples(value: typing.Callable[[PersistentCache], float]) -> list[Sample]:
+    """Return the sample of ``value`` of the persistent cache, if enabled."""
+    return [(("persistent",), value(persistent_cache))] if persistent_cache is not None else []
+
+
+REGISTRY.register(
+    CallbackMetric(
+        "dotty_cache_hits_total",
+        "Number of cache lookups that found an entry",
+        "counter",
+        ("cache",),
+        lambda: _cache_samples(lambda cache: cache.hits)
+        + _persistent_cache_samples(lambda cache: cache.hits),
+    )
+)
+REGISTRY.register(
+    CallbackMetric(
+        "dotty_cache_misses_total",
+        "Number of cache lookups that did not find an entry",
+        "counter",
+        ("cache",),
+        lambda: _cache_samples(lambda cache: cache.misses)
+        + _persistent_cache_samples(lambda cache: cache.misses),
+    )
+)
+REGISTRY.register(
+    CallbackMetric(
+        "dotty_cache_entries",
+        "Number of cached entries",
+        "gauge",
+        ("cache",),
+        lambda: _cache_samples(len),
+    )
+)
+REGISTRY.register(
+    CallbackMetric(
+        "dotty_cache_evictions_total",
+        "Number of entries evicted from the persistent cache",
+        "counter",
+        ("cache",),
+        lambda: _persistent_cache_samples(lambda cache: cache.evictions),
+    )
+)
+REGISTRY.register(
+    CallbackMetric(
+        "dotty_requests_coalesced_total",
+        "Number of requests that waited for the result of an identical request in flight",
+        "counter",
+        ("endpoint",),
+        lambda: [
+            (("to-spdi",), spdi_flights.coalesced),
+            (("find-transcripts",), transcript_flights.coalesced),
+        ],
+    )
+)
+REGISTRY.register(
+    CallbackMetric(
+        "dotty_dispatcher_pending",
+        "Number of calls pending in the dispatcher",
+        "gauge",
+        (),
+        lambda: [((), dispatcher.pending)],
+    )
+)
+REGISTRY.register(
+    CallbackMetric(
+        "dotty_data_version_memory_bytes",
+        "Estimated memory of the data versions loaded on request",
+        "gauge",
+        ("data_version",),
+        lambda: [((version,), memory) for version, memory in data_registry.versions()],
+    )
+)
+REGISTRY.register(
+    CallbackMetric(
+        "dotty_data_version_evictions_total",
+        "Number of data versions loaded on request that have been evicted",
+        "counter",
+        (),
+        lambda: [((), data_registry.evictions)],
+    )
+)
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics() -> PlainTextResponse:
+    """Return the metrics of this process in the Prometheus text format.
+
+    In ``process`` execution mode, the stages that run in the worker processes are not
+    reported; with ``python -m dotty serve``, each request is answered by one worker.
+    """
+    return PlainTextResponse(
+        REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+class Liveness(pydantic.BaseModel):
+    """Liveness of the server."""
+
+    #: ``ok``, or ``failed`` if loading the data failed.
+    status: str
+    #: Error of loading the data, if it failed.
+    message: str | None = None
+
+
+@app.get("/health/live", response_model=Liveness, responses={503: {"model": Liveness}})
+async def health_live(response: Response) -> Liveness:
+    """Return whether the server is alive, answered right away while the data is loaded.
+
+    Fails with 503 if loading the data failed, so the server can be restarted.
+    """
+    if load_error is not None:
+        response.status_code = 503
+        return Liveness(status="failed", message=load_error)
+    return Liveness(status="ok")
+
+
+class Readiness(pydantic.BaseModel):
+    """Readiness of the server and the progress of loading the data."""
+
+    #: Whether data is being served.
+    ready: bool
+    #: Version of the data being served or loaded.
+    data_version: str
+    #: The state of loading each assembly.
+    assemblies: dict[Assembly, LoadState]
+    #: Error of loading the data, if it failed.
+    message: str | None = None
+
+
+@app.get("/health/ready", response_model=Readiness, responses={503: {"model": Readiness}})
+async def health_ready(response: Response) -> Readiness:
+    """Return the progress of loading each assembly, with 503 until data is served.
+
+    With ``SERVE_ASSEMBLIES_EARLY``, the server is ready once the first assembly is served.
+    """
+    ready = bool(served_assemblies)
+    if not ready:
+        response.status_code = 503
+    return Readiness(
+        ready=ready,
+        data_version=driver.data_version if isinstance(driver, Driver) else settings.DATA_VERSION,
+        assemblies={assembly: _load_state(assembly) for assembly in Assembly},
+        message=load_error,
+    )
+
+
+def _accepts_gzip(accept_encoding: str) -> bool:
+    """Return whether the ``Accept-Encoding`` header value allows gzip, honoring q-values."""
+    qualities = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.strip().lower()] = quality
+    return qualities.get("gzip", qualities.get("x-gzip", qualities.get("*", 0.0))) > 0
+
+
+@dataclasses.dataclass(frozen=True)
+class SerializedResponse:
+    """A JSON response body that has been serialized ahead of time."""
+
+    #: The JSON body.
+    body: bytes
+    #: The gzip-compressed JSON body.
+    gzip_body: bytes
+    #: The entity tag of the body.
+    etag: str
+
+    @staticmethod
+    def _from_model(model: pydantic.BaseModel) -> "SerializedResponse":
+        """Serialize the given model."""
+        body = model.model_dump_json().encode("utf-8")
+        return SerializedResponse(
+            body=body,
+            gzip_body=gzip.compress(body, mtime=0),
+            etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+        )
+
+    def to_response(self, request: Request) -> Response:
+        """Return the response for ``request``, honoring ETag and gzip encoding."""
+        headers = {"ETag": self.etag, "Vary": "Accept-Encoding"}
+        if_none_match = request.headers.get("if-none-match", "")
+        if if_none_match == "*" or self.etag in (
+            tag.strip().removeprefix("W/") for tag in if_none_match.split(",")
+        ):
+            return Response(status_code=304, headers=headers)
+        if _accepts_gzip(request.headers.get("accept-encoding", "")):
+            headers["Content-Encoding"] = "gzip"
+            return Response(self.gzip_body, media_type="application/json", headers=headers)
+        return Response(self.body, media_type="application/json", headers=headers)
+
+
+#: Serialized ``find-transcripts`` responses by HGNC ID, assembly and requested data version,
+#: ``None`` for the served one; filled lazily.
+transcript_responses: dict[tuple[str, Assembly, str | None], SerializedResponse] = {}
+#: Coalesces concurrent ``find-transcripts`` requests with the same key of
+#: ``transcript_responses``.
+transcript_flights: SingleFlight[tuple[str, Assembly, str | None], SerializedResponse] = (
+    SingleFlight()
+)
+
+
+@app.get("/api/v1/find-genes", response_model=GeneResult)
+async def find_genes(
+    q: typing.Annotated[str, Query(min_length=1)],
+    prefix: bool = False,
+    limit: typing.Annotated[int, Query(ge=1, le=100)] = 10,
+    data_version: str | None = None,
+) -> GeneResult:
+    """Find genes by symbol, alias or HGNC ID, or with ``prefix``, by their start, e.g., for
+    autocompletion.
+
+    Matching is case-insensitive.  The genes are sorted by the matching name, symbols come
+    before aliases of the same name.
+    """
+    gene_index = (await _get_data(data_version)).gene_index
+    return GeneResult(
+        genes=[
+            Gene._from_info(info, matched)
+            for info, matched in gene_index.search(q, prefix=prefix, limit=limit)
+        ]
+    )
+
+
 @app.get("/api/v1/find-transcripts", response_model=TranscriptResult)
-async def find_transcripts(hgnc_id: str, assembly: Assembly = Assembly.GRCH38) -> TranscriptResult:
-    """Find transcripts for the given HGNC ID."""
+async def find_transcripts(
+    request: Request,
+    hgnc_id: str | None = None,
+    assembly: Assembly = Assembly.GRCH38,
+    data_version: str | None = None,
+    gene: str | None = None,
+) -> Response:
+    """Find transcripts for the given HGNC ID, or for the gene with the symbol, alias or HGNC
+    ID ``gene``."""
+    if (hgnc_id is None) == (gene is None):
+        raise HTTPException(status_code=400, detail="Either hgnc_id or gene is required")
+    if hgnc_id is None:
+        data = await _get_data(data_version, assembly)
+        hgnc_id = data.gene_index.lookup(typing.cast(str, gene))
+        if hgnc_id is None:
+            raise HTTPException(status_code=404, detail=f"Unknown gene {gene}")
+    key = (hgnc_id, assembly, data_version)
+    response = transcript_responses.get(key)
+    if response is None:
+        response = await transcript_flights.run(key, lambda: _transcripts_response(key))
+    return response.to_response(request)
+
+
+async def _transcripts_response(key: tuple[str, Assembly, str | None]) -> SerializedResponse:
+    """Build the ``find-transcripts`` response of the ``transcript_responses`` ``key`` in a
+    thread and cache it."""
+    hgnc_id, assembly, data_version = key
+    data = await _get_data(data_version, assembly)
+    response = await asyncio.to_thread(_build_transcripts_response, data, hgnc_id, assembly)
+    # Not cached if the data has been replaced or removed meanwhile.
+    if data.driver is driver or data_registry.peek(data.driver.data_version) is data:
+        transcript_responses[key] = response
+    return response
+
+
+def _build_transcripts_response(
+    data: LoadedData, hgnc_id: str, assembly: Assembly
+) -> SerializedResponse:
+    """Return the serialized ``find-transcripts`` response of ``hgnc_id`` in ``data``."""
     result = []
-    transctipts = assembly_to_hgnc_to_transcripts[assembly].get(hgnc_id, [])
-    if not transctipts:
+    tx_acs = data.assembly_to_hgnc_to_transcripts[assembly].get(hgnc_id, [])
+    if not tx_acs:
         raise HTTPException(status_code=404, detail="No transcripts found")
-    else:
-        for t in transctipts:
-            if (
-                assembly.value not in t["genome_builds"]
-                or "cds_start" not in t["genome_builds"][assembly.value]
-                or "cds_end" not in t["genome_builds"][assembly.value]
-                or "exons" not in t["genome_builds"][assembly.value]
-            ):
-                continue
-
+    data_provider = data.driver.data_providers[assembly]
+    for tx_ac in tx_acs:
+        t = data_provider.transcripts[tx_ac]
+        if is_valid_transcript(t, assembly):
             result.append(Transcript._from_dict(assembly.value, t))
-        return TranscriptResult(transcripts=result)
+    return SerializedResponse._from_model(TranscriptResult(transcripts=result))
+
+
+@app.get("/api/v1/find-transcripts-by-region", response_model=TranscriptResult)
+async def find_transcripts_by_region(
+    contig: str,
+    start: typing.Annotated[int, Query(ge=1)],
+    end: typing.Annotated[int, Query(ge=1)],
+    assembly: Assembly = Assembly.GRCH38,
+    exonic: bool = False,
+    data_version: str | None = None,
+) -> TranscriptResult:
+    """Find transcripts overlapping the 1-based, inclusive region ``contig:start-end``.
+
+    The contig may be given by name, e.g., ``chr13`` or ``13``, or by accession.  With
+    ``exonic``, only transcripts with an exon overlapping the region are returned.
+    """
+    contig_ac = contig_accessions[assembly].get(contig)
+    if contig_ac is None:
+        raise HTTPException(status_code=400, detail=f"Unknown contig {contig} on {assembly.value}")
+    if end < start:
+        raise HTTPException(status_code=400, detail="The end must not be before the start")
+    data_provider = (await _get_data(data_version, assembly)).driver.data_providers[assembly]
+    result = []
+    for tx_ac in find_transcripts_in_region(data_provider, contig_ac, start - 1, end, exonic):
+        transcript = data_provider.transcripts[tx_ac]
+        if is_valid_transcript(transcript, assembly):
+            result.append(Transcript._from_dict(assembly.value, transcript))
+    return TranscriptResult(transcripts=result)
+
+
+class VcfQuery(pydantic.BaseModel):
+    """A VCF-style variant to project to the overlapping transcripts."""
+
+    #: The assembly of the variant.
+    assembly: Assembly = Assembly.GRCH38
+    #: Contig name, e.g., ``chr17`` or ``17``, or accession.
+    contig: str
+    #: 1-based position.
+    pos: int = pydantic.Field(ge=1)
+    #: Reference allele.
+    ref: str = pydantic.Field(pattern=r"^[ACGTNacgtn]+$")
+    #: Alternate allele, ``.`` for none.
+    alt: str = pydantic.Field(pattern=r"^([ACGTNacgtn]+|\.)$")
+    #: The data version, the served one by default.
+    data_version: str | None = None
+
+
+class TranscriptHgvs(pydantic.BaseModel):
+    """Projection of a variant to one transcript."""
+
+    #: Transcript ID.
+    transcript: str
+    #: Gene HGNC ID, if any.
+    hgnc_id: str | None = None
+    #: Gene HGNC symbol.
+    hgnc_symbol: str | None = None
+    #: The ``c.`` or ``n.`` HGVS description, ``None`` if projection failed.
+    hgvs: str | None = None
+    #: Any error message.
+    message: str | None = None
+
+
+class HgvsResult(pydantic.BaseModel):
+    """The result of a reverse projection query."""
+
+    #: The indicator if the query was successful.
+    success: bool
+    #: The projections to all overlapping transcripts.
+    value: list[TranscriptHgvs] = []
+    #: Any error message.
+    message: str | None = None
+
+
+class HgvsBatchResult(pydantic.BaseModel):
+    """The results of a batch of reverse projection queries."""
+
+    #: One result for each query, in the same order.
+    results: list[HgvsResult]
+
+
+def _to_hgvs(query: VcfQuery, handle: DriverHandle) -> HgvsResult:
+    """Project the VCF-style variant to all transcripts overlapping it with the driver of
+    ``handle``."""
+    contig_ac = contig_accessions[query.assembly].get(query.contig)
+    if contig_ac is None:
+        return HgvsResult(
+            success=False, message=f"Unknown contig {query.contig} on {query.assembly.value}"
+        )
+    current_driver = _resolve_driver(handle)
+    var_g = current_driver.babelfishes[query.assembly].vcf_to_g_hgvs(
+        contig_ac, query.pos, query.ref, query.alt
+    )
+    data_provider = current_driver.data_providers[query.assembly]
+    assembly_mapper = current_driver.assembly_mappers[query.assembly]
+    start, end = var_g.posedit.pos.start.base - 1, var_g.posedit.pos.end.base
+    value = []
+    for tx_ac in find_transcripts_in_region(data_provider, contig_ac, start, end):
+        transcript = data_provider.transcripts[tx_ac]
+        projection = TranscriptHgvs(
+            transcript=tx_ac,
+            hgnc_id=f"HGNC:{transcript['hgnc']}" if "hgnc" in transcript else None,
+            hgnc_symbol=transcript.get("gene_name"),
+        )
+        try:
+            if transcript.get("start_codon") is None:
+                projection.hgvs = str(assembly_mapper.g_to_n(var_g, tx_ac))
+            else:
+                projection.hgvs = str(assembly_mapper.g_to_c(var_g, tx_ac))
+        except hgvs.exceptions.HGVSError as e:
+            projection.message = f"Problem projecting variant: {e}"
+        value.append(projection)
+    return HgvsResult(success=True, value=value)
+
+
+def _to_hgvs_batch_items(items: list[tuple[VcfQuery, DriverHandle]]) -> list[HgvsResult]:
+    """Project the queries of a batch with the drivers of their handles, reporting any error
+    in the results."""
+    results = []
+    for query, handle in items:
+        try:
+            results.append(_to_hgvs(query, handle))
+        except Exception as e:
+            results.append(HgvsResult(success=False, message=f"Problem projecting variant: {e}"))
+    return results
+
+
+@app.get("/api/v1/to-hgvs", response_model=HgvsResult)
+async def to_hgvs(query: typing.Annotated[VcfQuery, Query()]) -> HgvsResult:
+    """Project the given VCF-style variant to ``c.``/``n.`` HGVS on all overlapping
+    transcripts."""
+    data = await _get_data(query.data_version, query.assembly)  # load in a thread
+    return await dispatcher.run(_to_hgvs, query, _driver_handle(data))
+
+
+@app.post("/api/v1/to-hgvs/batch", response_model=HgvsBatchResult)
+async def to_hgvs_batch(queries: list[VcfQuery]) -> HgvsBatchResult:
+    """Project the given VCF-style variants to ``c.``/``n.`` HGVS on all overlapping
+    transcripts.
+
+    Errors are reported for each query, the request only fails if it is malformed or a data
+    version is not available.
+    """
+    if len(queries) > settings.MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413, detail=f"At most {settings.MAX_BATCH_SIZE} queries per batch"
+        )
+    # The data of each requested version is kept until the queries have been projected.
+    datas: dict[str | None, LoadedData] = {}
+    for data_version, assembly in {(query.data_version, query.assembly) for query in queries}:
+        datas[data_version] = await _get_data(data_version, assembly)  # load in a thread
+    handles = {version: _driver_handle(data) for version, data in datas.items()}
+    items = [(query, handles[query.data_version]) for query in queries]
+    # Split the queries into one chunk per worker.
+    chunk_size = max(1, -(-len(items) // dispatcher.max_workers))
+    chunk_results = await asyncio.gather(
+        *(
+            dispatcher.run(_to_hgvs_batch_items, items[i : i + chunk_size])
+            for i in range(0, len(items), chunk_size)
+        )
+    )
+    return HgvsBatchResult(results=[result for results in chunk_results for result in results])
+
+
+class ReloadStatus(pydantic.BaseModel):
+    """Status of reloading the data."""
+
+    #: Version of the data being served.
+    data_version: str
+    #: Version of the data being loaded, if any.
+    loading_version: str | None = None
+    #: Error of the last failed reload, if any.
+    message: str | None = None
+
+
+#: Version of the data being loaded by ``reload_data()``, if any.
+reload_version: str | None = None
+#: Error of the last failed reload, if any.
+reload_error: str | None = None
+#: The running reload tasks, referenced until done.
+reload_tasks: set[asyncio.Task[None]] = set()
+
+
+def _reload_status() -> ReloadStatus:
+    """Return the current ``ReloadStatus``."""
+    return ReloadStatus(
+        data_version=driver.data_version, loading_version=reload_version, message=reload_error
+    )
+
+
+async def _reload_data(data_version: str):
+    """Load ``data_version`` in a thread while the current data keeps being served, then
+    swap it in.
+
+    The caches are cleared and, in ``process`` execution mode, new worker processes are
+    forked with the new data; calls in flight finish in the old worker processes.  A version
+    that has been loaded on request is taken over from ``data_registry``.
+    """
+    global reload_version, reload_error
+    try:
+        data = data_registry.pop(data_version)
+        if data is None:
+            data = await asyncio.to_thread(build_data, data_version)
+    except Exception as e:
+        _logger.exception("Reloading data version %s failed", data_version)
+        reload_error = f"Loading data version {data_version} failed: {e}"
+        return
+    finally:
+        reload_version = None
+    # Swap on the event loop, between the synchronous steps of the requests, so the cached
+    # responses are all of the served data.
+    swap_data(data)
+    result_cache.clear()
+    transcript_responses.clear()
+    if dispatcher.mode == ExecutionMode.PROCESS:
+        dispatcher.restart()
+    _logger.info("Now serving data version %s", data_version)
+
+
+def start_reload(data_version: str):
+    """Start reloading the data as ``data_version`` in the background."""
+    global reload_version, reload_error
+    reload_version, reload_error = data_version, None
+    reload_task = asyncio.create_task(_reload_data(data_version))
+    reload_tasks.add(reload_task)
+    reload_task.add_done_callback(reload_tasks.discard)
+
+
+def _check_admin_token(authorization: typing.Annotated[str | None, Header()] = None):
+    """Check the bearer token of admin requests against ``settings.ADMIN_TOKEN``."""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled")
+    if not authorization or not secrets.compare_digest(
+        authorization.encode("utf-8"), f"Bearer {settings.ADMIN_TOKEN}".encode("utf-8")
+    ):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+@app.get(
+    "/api/v1/admin/reload",
+    response_model=ReloadStatus,
+    dependencies=[Depends(_check_admin_token)],
+)
+async def reload_status() -> ReloadStatus:
+    """Return the served data version and the status of any reload."""
+    return _reload_status()
+
+
+@app.post(
+    "/api/v1/admin/reload",
+    response_model=ReloadStatus,
+    status_code=202,
+    dependencies=[Depends(_check_admin_token)],
+)
+async def reload(data_version: str) -> ReloadStatus:
+    """Start loading ``data_version`` in the background and serve it once loaded.
+
+    With ``python -m dotty serve``, send ``SIGHUP`` to the master process instead, which
+    reloads all workers.
+    """
+    if forked_worker:
+        raise HTTPException(status_code=409, detail="Send SIGHUP to the master process")
+    if reload_version is not None:
+        raise HTTPException(status_code=409, detail=f"Already loading {reload_version}")
+    missing = missing_data_files(settings.DATA_DIR, data_version)
+    if missing:
+        raise HTTPException(
+            status_code=404, detail=f"Missing data files: {', '.join(map(str, missing))}"
+        )
+    start_reload(data_version)
+    return _reload_status()
+
+
+class WarmUpResult(pydantic.BaseModel):
+    """The result of warming up the caches."""
+
+    #: Number of variants resolved or found in the caches.
+    variants: int
+    #: Number of variants that could not be resolved.
+    failed: int
+
+
+@app.post(
+    "/api/v1/admin/warm-cache",
+    response_model=WarmUpResult,
+    dependencies=[Depends(_check_admin_token)],
+)
+async def warm_cache(
+    request: Request, assembly: Assembly = Assembly.GRCH38, data_version: str | None = None
+) -> WarmUpResult:
+    """Resolve a newline-delimited list of known HGVS variants into the caches.
+
+    The variants that are not cached yet are resolved in batches of ``MAX_BATCH_SIZE``.  With
+    the persistent cache, the results are available to all workers and after restarts.
+    """
+    await _get_data(data_version, assembly)
+    variants = failed = 0
+    chunk: list[SpdiQuery] = []
+
+    async def resolve(queries: list[SpdiQuery]) -> int:
+        results = await _resolve_queries(queries, chunks=dispatcher.max_workers)
+        return sum(not result.success for result in results)
+
+    async for line in _iter_lines(request.stream()):
+        chunk.append(SpdiQuery(q=line, assembly=assembly, data_version=data_version))
+        if len(chunk) >= settings.MAX_BATCH_SIZE:
+            failed += await resolve(chunk)
+            variants += len(chunk)
+            chunk = []
+    if chunk:
+        failed += await resolve(chunk)
+        variants += len(chunk)
+    return WarmUpResult(variants=variants, failed=failed)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,271 @@
+"""Metrics in the Prometheus text format.
+
+Recording a value takes a lock and a bisection, so the metrics can stay enabled in
+production.  The metrics are kept per process: in ``process`` execution mode, the stages
+that run in the worker processes are not recorded, and with ``python -m dotty serve``,
+each worker reports its own metrics.
+"""
+
+import bisect
+import math
+import threading
+import time
+import typing
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+#: Default buckets of histograms of durations in seconds.
+DURATION_BUCKETS = (
+    0.0001,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+#: Labels of a sample and its value.
+Sample = tuple[tuple[str, ...], float]
+
+#: Type of the registered metrics.
+M = typing.TypeVar("M", bound="Metric")
+
+
+def _escape(value: str) -> str:
+    """Escape a label value."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: typing.Sequence[str], values: typing.Sequence[str]) -> str:
+    """Format the labels of a sample."""
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    """Format the value of a sample."""
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    """Base class of the metrics."""
+
+    #: The Prometheus metric type.
+    type_: str = "untyped"
+
+    def __init__(self, name: str, help_: str, labelnames: typing.Sequence[str] = ()):
+        #: Name of the metric.
+        self.name = name
+        #: Description of the metric.
+        self.help = help_
+        #: Names of the labels.
+        self.labelnames = tuple(labelnames)
+
+    def _render_samples(self) -> typing.Iterator[str]:
+        raise NotImplementedError  # pragma: no cover
+
+    def render(self) -> str:
+        """Render the metric in the Prometheus text format."""
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type_}"]
+        lines.extend(self._render_samples())
+        return "\n".join(lines) + "\n"
+
+
+class Histogram(Metric):
+    """Histogram of observed values, per combination of label values."""
+
+    type_ = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_: str,
+        labelnames: typing.Sequence[str] = (),
+        buckets: typing.Sequence[float] = DURATION_BUCKETS,
+    ):
+        super().__init__(name, help_, labelnames)
+        #: Upper bounds of the buckets, without ``+Inf``.
+        self.buckets = tuple(sorted(buckets))
+        #: Count per bucket (not cumulative), sum and count per label values.
+        self._series: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+        #: Protects the series.
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues: str):
+        """Record ``value`` with the given label values."""
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][idx] += 1
+            series[1][0] += value
+
+    def _render_samples(self) -> typing.Iterator[str]:
+        with self._lock:
+            series = [
+                (labels, list(counts), sum_[0]) for labels, (counts, sum_) in self._series.items()
+            ]
+        names = self.labelnames + ("le",)
+        for labelvalues, counts, sum_ in sorted(series):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                labels = _format_labels(names, labelvalues + (_format_value(bound),))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, labelvalues)
+            yield f"{self.name}_sum{labels} {_format_value(sum_)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class Gauge(Metric):
+    """Value that is set, per combination of label values."""
+
+    type_ = "gauge"
+
+    def __init__(self, name: str, help_: str, labelnames: typing.Sequence[str] = ()):
+        super().__init__(name, help_, labelnames)
+        #: The values per label values.
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def set(self, value: float, *labelvalues: str):
+        """Set the value for the given label values."""
+        self._values[labelvalues] = value
+
+    def samples(self) -> list[Sample]:
+        """Return the values with their label values."""
+        return sorted(self._values.items())
+
+    def _render_samples(self) -> typing.Iterator[str]:
+        for labelvalues, value in self.samples():
+            yield f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}"
+
+
+class CallbackMetric(Metric):
+    """Metric whose samples are collected from a callback on rendering, e.g., counters that
+    are kept elsewhere anyway."""
+
+    def __init__(
+        self,
+        name: str,
+        help_: str,
+        type_: str,
+        labelnames: typing.Sequence[str],
+        callback: typing.Callable[[], typing.Iterable[Sample]],
+    ):
+        super().__init__(name, help_, labelnames)
+        self.type_ = type_
+        #: Returns the samples.
+        self.callback = callback
+
+    def _render_samples(self) -> typing.Iterator[str]:
+        for labelvalues, value in self.callback():
+            yield f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}"
+
+
+class Registry:
+    """Collection of metrics."""
+
+    def __init__(self):
+        #: The metrics by name.
+        self.metrics: dict[str, Metric] = {}
+
+    def register(self, metric: M) -> M:
+        """Register ``metric``, replacing any metric of the same name."""
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text format."""
+        return "".join(metric.render() for metric in self.metrics.values())
+
+
+#: The metrics of this process.
+REGISTRY = Registry()
+
+#: Duration of the stages of resolving a variant.
+STAGE_DURATION = REGISTRY.register(
+    Histogram(
+        "dotty_stage_duration_seconds",
+        "Duration of the stages of resolving a variant",
+        ("stage", "assembly", "variant_type"),
+    )
+)
+
+#: Duration of reads of the reference sequence that missed the cache.
+SEQ_FETCH_DURATION = REGISTRY.register(
+    Histogram(
+        "dotty_seq_fetch_duration_seconds",
+        "Duration of reference sequence reads that missed the cache",
+        ("namespace",),
+    )
+)
+
+#: Duration of the HTTP requests.
+REQUEST_DURATION = REGISTRY.register(
+    Histogram(
+        "dotty_request_duration_seconds",
+        "Duration of the HTTP requests until the response has been sent",
+        ("endpoint", "method", "status"),
+    )
+)
+
+#: Duration of the stages of loading the data.
+LOAD_DURATION = REGISTRY.register(
+    Gauge(
+        "dotty_load_stage_duration_seconds",
+        "Duration of the stages of loading the data on the last load",
+        ("stage",),
+    )
+)
+
+
+class MetricsMiddleware:
+    """ASGI middleware that records the duration of the HTTP requests in
+    ``REQUEST_DURATION``.
+
+    The requests are labeled with the path template of the matched route, so the label
+    values are bounded; requests that match no route are labeled ``unmatched``.  Streamed
+    responses are timed until their last chunk has been sent.
+    """
+
+    def __init__(self, app: ASGIApp):
+        #: The wrapped application.
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start_time = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router stores the matched route in the scope.
+            route = scope.get("route")
+            REQUEST_DURATION.observe(
+                time.perf_counter() - start_time,
+                getattr(route, "path", "unmatched"),
+                scope["method"],
+                str(status),
+            )
@@ -0,0 +1,112 @@
+"""Fast path for parsing the common, simple HGVS variant descriptions.
+
+Parsing with the grammar of ``hgvs.parser.Parser`` takes most of the time of projecting a
+variant.  Most queries are substitutions, deletions, duplications, insertions or delins on
+``c.``, ``n.`` or ``g.`` coordinates, e.g., ``NM_000059.3:c.274G>A``, which are parsed with
+regular expressions here.  The result is the same ``SequenceVariant`` as built by the
+grammar; everything else, including invalid descriptions, is left to the grammar.
+"""
+
+import re
+import typing
+
+import hgvs.parser
+from hgvs.edit import Dup, Edit, NARefAlt
+from hgvs.enums import Datum
+from hgvs.location import BaseOffsetInterval, BaseOffsetPosition, Interval, SimplePosition
+from hgvs.posedit import PosEdit
+from hgvs.sequencevariant import SequenceVariant
+
+#: IUPAC nucleotide codes, as accepted by the grammar.
+_DNA = "[ACGTRYMKWSBDHVNacgtrymkwsbdhvn]"
+
+#: A position of any of the supported types, validated when converted.
+_POS = r"(?:\*?[0-9]+|-?[0-9]+)(?:[-+][0-9]+)?"
+
+#: The simple variants, the alternatives of the edit are in the order of the grammar.
+_VARIANT_RE = re.compile(
+    r"(?P<ac>[A-Za-z][A-Za-z0-9]+(?:_[A-Za-z0-9]+)?(?:\.[0-9]+)?)"
+    r"(?:\((?P<gene>[A-Za-z][A-Za-z0-9]+)\))?"
+    rf":(?P<type>[cgn])\.(?P<start>{_POS})(?:_(?P<end>{_POS}))?"
+    rf"(?:(?P<ident>{_DNA}*)="
+    rf"|(?P<ref>{_DNA})>(?P<alt>{_DNA})"
+    rf"|del(?P<del>{_DNA}*)(?:ins(?P<delins>{_DNA}+))?"
+    rf"|ins(?P<ins>{_DNA}+)"
+    rf"|dup(?P<dup>{_DNA}*))"
+)
+
+#: The parts of a position: ``*`` for positions after the CDS end, base and offset.
+_POS_RE = re.compile(r"(\*)?(-?[0-9]+)([-+][0-9]+)?")
+
+
+def _simple_position(pos: str) -> SimplePosition | None:
+    """Return the ``g.`` position ``pos``, ``None`` if not supported."""
+    return SimplePosition(int(pos)) if pos.isdecimal() else None
+
+
+def _base_offset_position(type_: str, pos: str) -> BaseOffsetPosition | None:
+    """Return the ``c.`` or ``n.`` position ``pos``, ``None`` if not supported."""
+    match = typing.cast(re.Match, _POS_RE.fullmatch(pos))
+    cds_end, base, offset = match.groups()
+    if cds_end and (type_ == "n" or base.startswith("-")):
+        return None
+    return BaseOffsetPosition(
+        int(base),
+        int(offset) if offset else 0,
+        datum=Datum.CDS_END if cds_end else Datum.CDS_START if type_ == "c" else Datum.SEQ_START,
+    )
+
+
+def _edit(match: re.Match) -> Edit:
+    """Return the edit of the matched variant."""
+    if match["ident"] is not None:
+        return NARefAlt(ref=match["ident"], alt=match["ident"])
+    if match["ref"] is not None:
+        return NARefAlt(ref=match["ref"], alt=match["alt"])
+    if match["del"] is not None:
+        return NARefAlt(ref=match["del"], alt=match["delins"])
+    if match["ins"] is not None:
+        return NARefAlt(ref=None, alt=match["ins"])
+    return Dup(ref=match["dup"])
+
+
+def parse_simple(s: str) -> SequenceVariant | None:
+    """Parse ``s`` if it is a simple variant, return ``None`` otherwise."""
+    match = _VARIANT_RE.fullmatch(s)
+    if match is None:
+        return None
+    type_, start, end = match["type"], match["start"], match["end"] or match["start"]
+    pos: Interval | BaseOffsetInterval
+    if type_ == "g":
+        g_start, g_end = _simple_position(start), _simple_position(end)
+        if g_start is None or g_end is None:
+            return None
+        pos = Interval(g_start, g_end)
+    else:
+        bo_start, bo_end = _base_offset_position(type_, start), _base_offset_position(type_, end)
+        if bo_start is None or bo_end is None:
+            return None
+        pos = BaseOffsetInterval(bo_start, bo_end)
+    return SequenceVariant(
+        ac=match["ac"], gene=match["gene"], type=type_, posedit=PosEdit(pos=pos, edit=_edit(match))
+    )
+
+
+class FastParser:
+    """``hgvs.parser.Parser`` with a fast path for simple variants in ``parse()``."""
+
+    def __init__(self, parser: hgvs.parser.Parser):
+        #: The parser for everything but simple variants.
+        self.parser = parser
+
+    def parse(self, s: str) -> SequenceVariant:
+        """Parse the HGVS variant ``s``.
+
+        :raises hgvs.exceptions.HGVSParseError: if ``s`` cannot be parsed
+        """
+        variant = parse_simple(s)
+        return variant if variant is not None else self.parser.parse(s)
+
+    def __getattr__(self, name: str) -> typing.Any:
+        # The other rules of the grammar, e.g., ``parse_c_interval()``.
+        return getattr(self.parser, name)
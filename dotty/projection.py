@@ -0,0 +1,192 @@
+"""Vectorized projection of ``c.`` and ``n.`` positions to the genome with NumPy.
+
+``AssemblyMapper.c_to_g()`` looks up the transcript, walks its alignment and allocates the
+hgvs objects for each variant.  Here, the alignment of each transcript is kept as arrays of
+the aligned segments, built once from the cdot exons and their gaps, and the positions of
+many variants are mapped in one call.  The results are those of ``AlignmentMapper`` with
+strict bounds; positions it would reject or place into an alignment gap are reported as not
+mapped so they can be left to hgvs.
+"""
+
+import dataclasses
+import functools
+import typing
+
+import hgvs.exceptions
+import numpy as np
+from cdot.hgvs.dataproviders.json_data_provider import AbstractJSONDataProvider
+from hgvs.assemblymapper import AssemblyMapper
+from hgvs.enums import Datum
+from hgvs.location import BaseOffsetInterval
+from hgvs.sequencevariant import SequenceVariant
+from hgvs.utils import build_tx_cigar
+from hgvs.utils.cigarmapper import CIGARMapper
+
+#: A projected interval: contig accession, strand of the transcript, 1-based start and end.
+Projection = tuple[str, int, int, int]
+
+
+@dataclasses.dataclass(frozen=True)
+class ExonArrays:
+    """The alignment of a transcript to the genome as arrays of its segments.
+
+    The segments are those of the CIGAR string that hgvs builds from the exons, in genomic
+    order, so the transcript positions are counted from the genomic start on both strands.
+    """
+
+    #: Accession of the contig.
+    contig: str
+    #: ``1`` or ``-1``.
+    strand: int
+    #: Interbase genomic start of the alignment.
+    gc_offset: int
+    #: Interbase start of the CDS on the transcript, ``None`` if non-coding.
+    cds_start_i: int | None
+    #: Interbase end of the CDS on the transcript, ``None`` if non-coding.
+    cds_end_i: int | None
+    #: Length of the transcript.
+    tx_len: int
+    #: Start of each segment on the genome, relative to ``gc_offset``.
+    ref_starts: np.ndarray
+    #: Start of each segment on the transcript.
+    tgt_starts: np.ndarray
+    #: Whether the bases of each segment are aligned, the others are gaps and introns.
+    aligned: np.ndarray
+
+    @staticmethod
+    def from_exons(
+        contig: str, tx_exons: list[dict[str, typing.Any]], tx_info: dict[str, typing.Any]
+    ) -> "ExonArrays | None":
+        """Build the arrays from the exons and transcript info of the data provider.
+
+        Returns ``None`` if hgvs cannot map the transcript, i.e., the exons are not adjacent.
+        """
+        ordered = sorted(tx_exons, key=lambda exon: exon["ord"])
+        if any(a["tx_end_i"] != b["tx_start_i"] for a, b in zip(ordered, ordered[1:])):
+            return None
+        strand = tx_exons[0]["alt_strand"]
+        mapper = CIGARMapper(typing.cast(str, build_tx_cigar(tx_exons, strand)))
+        return ExonArrays(
+            contig=contig,
+            strand=strand,
+            gc_offset=tx_exons[0]["alt_start_i"],
+            cds_start_i=tx_info["cds_start_i"],
+            cds_end_i=tx_info["cds_end_i"],
+            tx_len=mapper.tgt_len,
+            ref_starts=np.array(mapper.ref_pos[:-1], dtype=np.int64),
+            tgt_starts=np.array(mapper.tgt_pos[:-1], dtype=np.int64),
+            aligned=np.array([op in "=MX" for op in mapper.cigar_op], dtype=bool),
+        )
+
+
+def project_positions(
+    transcripts: typing.Sequence[ExonArrays],
+    tx_index: np.ndarray,
+    bases: np.ndarray,
+    offsets: np.ndarray,
+    datums: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Map positions on ``transcripts`` to the genome.
+
+    The position ``i`` is on ``transcripts[tx_index[i]]`` and given by its base, offset and
+    the value of its ``Datum`` as in ``BaseOffsetPosition``.  Returns the 1-based genomic
+    positions and whether each position could be mapped.
+    """
+    coding = np.array([tx.cds_start_i is not None for tx in transcripts])[tx_index]
+    cds_start = np.array([tx.cds_start_i or 0 for tx in transcripts], dtype=np.int64)[tx_index]
+    cds_end = np.array([tx.cds_end_i or 0 for tx in transcripts], dtype=np.int64)[tx_index]
+    tx_len = np.array([tx.tx_len for tx in transcripts], dtype=np.int64)
+    strand = np.array([tx.strand for tx in transcripts], dtype=np.int64)[tx_index]
+    gc_offset = np.array([tx.gc_offset for tx in transcripts], dtype=np.int64)[tx_index]
+    # The segments of all transcripts are concatenated, with the transcript positions shifted
+    # by the length of the preceding transcripts so they increase over all segments.
+    shift = np.concatenate(([0], np.cumsum(tx_len)[:-1]))
+    tgt_starts = np.concatenate([tx.tgt_starts for tx in transcripts])
+    shifted_starts = tgt_starts + np.repeat(shift, [len(tx.tgt_starts) for tx in transcripts])
+    ref_starts = np.concatenate([tx.ref_starts for tx in transcripts])
+    aligned = np.concatenate([tx.aligned for tx in transcripts])
+    shift, tx_len = shift[tx_index], tx_len[tx_index]
+
+    # c. to n. as in ``AlignmentMapper.c_to_n()``, there is neither c.0 nor n.0.
+    n = np.where(
+        datums == Datum.CDS_END.value,
+        bases + cds_end,
+        np.where(datums == Datum.CDS_START.value, bases + cds_start + (bases < 0), bases),
+    )
+    mapped = (n >= 1) & (n <= tx_len) & (coding | (datums == Datum.SEQ_START.value))
+    # n. to g. as in ``AlignmentMapper.n_to_g()``, in genomic orientation.
+    pos = np.where(strand == -1, tx_len - n, n - 1)
+    key = np.where(mapped, shift + pos, 0)
+    segment = np.searchsorted(shifted_starts, key, side="right") - 1
+    mapped &= aligned[segment]
+    g = ref_starts[segment] + key - shifted_starts[segment] + gc_offset + 1 + strand * offsets
+    mapped &= g >= 1
+    return g, mapped
+
+
+class Projector:
+    """Projects ``c.`` and ``n.`` variants on the transcripts of an assembly to the genome,
+    with the exon arrays of the transcripts kept in an LRU cache."""
+
+    def __init__(
+        self, hdp: AbstractJSONDataProvider, assembly_mapper: AssemblyMapper, cache_size: int
+    ):
+        #: The data provider of the assembly.
+        self.hdp = hdp
+        #: The assembly mapper, selects the contig of each transcript.
+        self.assembly_mapper = assembly_mapper
+        #: Returns the exon arrays of a transcript, ``None`` for transcripts left to hgvs.
+        self.exon_arrays = functools.lru_cache(maxsize=cache_size)(self._load_exon_arrays)
+
+    def _load_exon_arrays(self, tx_ac: str) -> ExonArrays | None:
+        """Build the exon arrays of the transcript ``tx_ac``."""
+        try:
+            alt_ac = self.assembly_mapper._alt_ac_for_tx_ac(tx_ac)
+            aln_method = self.assembly_mapper.alt_aln_method
+            tx_exons = self.hdp.get_tx_exons(tx_ac, alt_ac, aln_method)
+            tx_info = self.hdp.get_tx_info(tx_ac, alt_ac, aln_method)
+        except hgvs.exceptions.HGVSError:
+            return None
+        if not tx_exons or not tx_info:
+            return None
+        return ExonArrays.from_exons(alt_ac, tx_exons, tx_info)
+
+    def project(self, variants: typing.Sequence[SequenceVariant]) -> list[Projection | None]:
+        """Project the intervals of the ``c.`` or ``n.`` ``variants`` to the genome.
+
+        Returns ``None`` for the variants that are not mapped, e.g., because of unknown
+        transcripts, positions out of bounds or in alignment gaps.
+        """
+        index: dict[str, int] = {}
+        transcripts: list[ExonArrays] = []
+        selected: list[tuple[int, BaseOffsetInterval]] = []
+        for i, variant in enumerate(variants):
+            tx = self.exon_arrays(variant.ac)
+            if tx is None:
+                continue
+            if variant.ac not in index:
+                index[variant.ac] = len(transcripts)
+                transcripts.append(tx)
+            selected.append((i, variant.posedit.pos))
+        results: list[Projection | None] = [None] * len(variants)
+        if not selected:
+            return results
+
+        # The starts and ends of all intervals are mapped in one call.
+        positions = [pos for _, interval in selected for pos in (interval.start, interval.end)]
+        tx_index = np.repeat([index[variants[i].ac] for i, _ in selected], 2)
+        g, mapped = project_positions(
+            transcripts,
+            tx_index,
+            np.array([pos.base for pos in positions], dtype=np.int64),
+            np.array([pos.offset for pos in positions], dtype=np.int64),
+            np.array([pos.datum.value for pos in positions], dtype=np.int64),
+        )
+        for j, (i, _) in enumerate(selected):
+            if mapped[2 * j] and mapped[2 * j + 1]:
+                tx = transcripts[tx_index[2 * j]]
+                start, end = int(g[2 * j]), int(g[2 * j + 1])
+                if tx.strand == -1:
+                    start, end = end, start
+                results[i] = (tx.contig, tx.strand, start, end)
+        return results
@@ -0,0 +1,183 @@
+"""Registry of the loaded data versions."""
+
+import collections
+import gc
+import hashlib
+import json
+import os
+import threading
+import typing
+import weakref
+from collections.abc import Mapping
+
+from dotty.store import CompactTranscript
+
+#: Type of the loaded data.
+T = typing.TypeVar("T")
+
+
+class DataVersionError(Exception):
+    """Raised if a data version is unknown or cannot be loaded at the moment."""
+
+
+class SharedTranscript(dict):
+    """A transcript record that may be shared between data versions."""
+
+    __slots__ = ("__weakref__",)
+
+
+class TranscriptPool:
+    """Shares identical transcript records between data versions.
+
+    The records are identified by a digest of their JSON representation.  The pool only
+    references them weakly, so records are dropped with the last data version using them.
+    Compact records are shared as they are, the decoded JSON as ``SharedTranscript``.
+    """
+
+    def __init__(self):
+        #: The shared records by digest.
+        self._records: weakref.WeakValueDictionary[bytes, Mapping[str, typing.Any]] = (
+            weakref.WeakValueDictionary()
+        )
+        #: Protects the records.
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def intern(self, transcript: Mapping[str, typing.Any]) -> Mapping[str, typing.Any]:
+        """Return the shared record equal to ``transcript``, adding it if there is none.
+
+        Records that are shared already are returned as they are.
+        """
+        if isinstance(transcript, SharedTranscript):
+            return transcript
+        data = json.dumps(transcript, sort_keys=True, separators=(",", ":"), default=dict).encode(
+            "utf-8"
+        )
+        key = hashlib.blake2b(data, digest_size=16).digest()
+        with self._lock:
+            shared = self._records.get(key)
+            if shared is None:
+                if isinstance(transcript, CompactTranscript):
+                    shared = transcript
+                else:
+                    shared = SharedTranscript(transcript)
+                self._records[key] = shared
+            return shared
+
+
+def _rss() -> int:
+    """Return the resident set size of this process in bytes, 0 if unknown."""
+    try:
+        with open("/proc/self/statm", "rt") as inputf:
+            return int(inputf.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:  # pragma: no cover
+        return 0
+
+
+class DataRegistry(typing.Generic[T]):
+    """Data versions, loaded on first use.
+
+    The least recently used versions are evicted when there are more than ``max_versions``,
+    or when they take more than ``memory_budget`` bytes.  The memory of a version is
+    estimated by the growth of the process while loading it.  Evicted data stays valid for
+    whoever still references it.
+    """
+
+    def __init__(
+        self,
+        load: typing.Callable[[str], T],
+        max_versions: int,
+        memory_budget: int = 0,
+        on_remove: typing.Callable[[str], None] | None = None,
+    ):
+        #: Loads a data version.
+        self.load = load
+        #: Called with each version that is evicted or removed, e.g., to drop derived caches.
+        self.on_remove = on_remove
+        #: Maximal number of loaded versions.
+        self.max_versions = max_versions
+        #: Memory in bytes for the loaded versions, 0 for no limit.
+        self.memory_budget = memory_budget
+        #: Number of evicted versions.
+        self.evictions = 0
+        #: The loaded data and its estimated memory by version, least recently used first.
+        self._entries: collections.OrderedDict[str, tuple[T, int]] = collections.OrderedDict()
+        #: Protects the entries.
+        self._lock = threading.Lock()
+        #: Serializes loading, so the memory estimates are not mixed up.
+        self._load_lock = threading.Lock()
+
+    def versions(self) -> list[tuple[str, int]]:
+        """Return the loaded versions with their estimated memory."""
+        with self._lock:
+            return [(version, memory) for version, (_, memory) in self._entries.items()]
+
+    def peek(self, version: str) -> T | None:
+        """Return the data of ``version`` if it is loaded."""
+        with self._lock:
+            entry = self._entries.get(version)
+            if entry is None:
+                return None
+            self._entries.move_to_end(version)
+            return entry[0]
+
+    def get(self, version: str) -> T:
+        """Return the data of ``version``, loading it if needed.
+
+        Versions are loaded one at a time, concurrent calls for the same version wait for
+        the first one.  Exceptions of ``load`` are propagated.
+        """
+        data = self.peek(version)
+        if data is not None:
+            return data
+        with self._load_lock:
+            data = self.peek(version)  # loaded by another thread meanwhile
+            if data is not None:
+                return data
+            start_rss = _rss()
+            data = self.load(version)
+            gc.collect()
+            with self._lock:
+                self._entries[version] = (data, max(0, _rss() - start_rss))
+                evicted = self._evict(keep=version)
+            self._removed(evicted)
+            return data
+
+    def pop(self, version: str) -> T | None:
+        """Remove ``version`` and return its data, if loaded."""
+        with self._lock:
+            entry = self._entries.pop(version, None)
+        if entry is None:
+            return None
+        self._removed([version])
+        return entry[0]
+
+    def clear(self):
+        """Remove all versions."""
+        with self._lock:
+            versions = list(self._entries)
+            self._entries.clear()
+        self._removed(versions)
+
+    def _evict(self, keep: str) -> list[str]:
+        """Evict versions until within the limits, except ``keep``, and return them."""
+        evicted: list[str] = []
+        while len(self._entries) > 1:
+            memory = sum(memory for _, memory in self._entries.values())
+            if len(self._entries) <= self.max_versions and (
+                not self.memory_budget or memory <= self.memory_budget
+            ):
+                break
+            version = next(version for version in self._entries if version != keep)
+            del self._entries[version]
+            self.evictions += 1
+            evicted.append(version)
+        return evicted
+
+    def _removed(self, versions: list[str]):
+        """Report the removed ``versions`` to ``on_remove``, outside of the lock."""
+        if self.on_remove is not None:
+            for version in versions:
+                self.on_remove(version)
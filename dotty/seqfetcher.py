@@ -0,0 +1,339 @@
+"""Sequence fetchers for the data providers."""
+
+import bisect
+import functools
+import mmap
+import pathlib
+import re
+import struct
+import time
+import typing
+
+from bioutils.sequences import reverse_complement
+from hgvs.exceptions import HGVSDataNotAvailableError
+
+from dotty.cache import ResultCache
+from dotty.metrics import SEQ_FETCH_DURATION
+
+#: Key of the cached blocks: namespace, accession and block number.
+BlockKey = tuple[str, str, int]
+
+
+class SeqFetcherProtocol(typing.Protocol):
+    """Interface of the hgvs sequence fetchers."""
+
+    def fetch_seq(self, ac: str, start_i: int | None = None, end_i: int | None = None) -> str:
+        """Return the interbase range ``[start_i, end_i)`` of sequence ``ac``."""
+        ...
+
+
+class CachingSeqFetcher:
+    """Caches fixed-size, aligned blocks of the sequences fetched by another fetcher.
+
+    Variants are usually clustered, and normalization fetches context around each of them,
+    so most fetches hit a few blocks.  On a miss, the missing blocks and ``prefetch``
+    blocks on each side are fetched in one call to the wrapped fetcher.  Fetches of whole
+    sequences are passed through.
+
+    The cache may be shared by several fetchers, their blocks are kept apart by
+    ``namespace``.
+    """
+
+    def __init__(
+        self,
+        fetcher: SeqFetcherProtocol,
+        cache: ResultCache[BlockKey, str],
+        block_size: int,
+        prefetch: int = 1,
+        namespace: str = "",
+    ):
+        #: The wrapped fetcher.
+        self.fetcher = fetcher
+        #: The cached blocks.
+        self.cache = cache
+        #: Size of the blocks.
+        self.block_size = block_size
+        #: Number of neighbouring blocks to fetch on each side on a miss.
+        self.prefetch = prefetch
+        #: Namespace of the blocks of this fetcher in the cache.
+        self.namespace = namespace
+
+    def set_data_provider(self, data_provider: typing.Any):
+        """Pass the data provider on to the wrapped fetcher, if it needs one."""
+        if hasattr(self.fetcher, "set_data_provider"):
+            self.fetcher.set_data_provider(data_provider)
+
+    def _fetch_blocks(self, ac: str, first: int, last: int) -> list[str]:
+        """Fetch the blocks ``first`` to ``last`` with prefetching and cache them."""
+        first_fetched = max(0, first - self.prefetch)
+        last_fetched = last + self.prefetch
+        start_time = time.perf_counter()
+        seq = self.fetcher.fetch_seq(
+            ac, first_fetched * self.block_size, (last_fetched + 1) * self.block_size
+        )
+        SEQ_FETCH_DURATION.observe(time.perf_counter() - start_time, self.namespace)
+        blocks = []
+        for block_no in range(first_fetched, last_fetched + 1):
+            offset = (block_no - first_fetched) * self.block_size
+            block = seq[offset : offset + self.block_size]
+            self.cache.put((self.namespace, ac, block_no), block)
+            if first <= block_no <= last:
+                blocks.append(block)
+        return blocks
+
+    def fetch_seq(self, ac: str, start_i: int | None = None, end_i: int | None = None) -> str:
+        """Return the interbase range ``[start_i, end_i)`` of sequence ``ac``."""
+        if start_i is None or end_i is None:
+            return self.fetcher.fetch_seq(ac, start_i, end_i)
+        if end_i <= start_i:
+            return ""
+        first, last = start_i // self.block_size, (end_i - 1) // self.block_size
+        blocks: list[str] = []
+        for block_no in range(first, last + 1):
+            block = self.cache.get((self.namespace, ac, block_no))
+            if block is None:
+                blocks += self._fetch_blocks(ac, block_no, last)
+                break
+            blocks.append(block)
+            if len(block) < self.block_size:  # end of sequence
+                break
+        offset = start_i - first * self.block_size
+        return "".join(blocks)[offset : offset + end_i - start_i]
+
+
+class GenomeFile(typing.Protocol):
+    """Interface of genome files, as implemented by ``pysam.FastaFile``."""
+
+    @property
+    def references(self) -> typing.Sequence[str]:
+        """The names of the contigs."""
+        ...
+
+    def fetch(
+        self, reference: str | None = None, start: int | None = None, end: int | None = None
+    ) -> str:
+        """Return the interbase range ``[start, end)`` of contig ``reference``."""
+        ...
+
+
+def _clamp(start: int | None, end: int | None, length: int) -> tuple[int, int]:
+    """Clamp the interbase range ``[start, end)`` to a sequence of ``length``."""
+    start = min(max(0, start or 0), length)
+    end = length if end is None else min(max(start, end), length)
+    return start, end
+
+
+class FaidxFile:
+    """Uncompressed FASTA file with ``.fai`` index, read via mmap."""
+
+    def __init__(self, path: str):
+        #: Path to the FASTA file.
+        self.path = path
+        #: Length, offset, bases per line and bytes per line of the contigs.
+        self._index: dict[str, tuple[int, int, int, int]] = {}
+        with open(f"{path}.fai", "rt") as inputf:
+            for line in inputf:
+                name, length, offset, line_bases, line_width = line.split("\t")[:5]
+                self._index[name] = (int(length), int(offset), int(line_bases), int(line_width))
+        with open(path, "rb") as inputf:
+            #: The mapped file.
+            self._mmap = mmap.mmap(inputf.fileno(), 0, access=mmap.ACCESS_READ)
+
+    @property
+    def references(self) -> list[str]:
+        """The names of the contigs."""
+        return list(self._index)
+
+    def fetch(
+        self, reference: str | None = None, start: int | None = None, end: int | None = None
+    ) -> str:
+        """Return the interbase range ``[start, end)`` of contig ``reference``."""
+        length, offset, line_bases, line_width = self._index[typing.cast(str, reference)]
+        start, end = _clamp(start, end, length)
+        if start == end:
+            return ""
+        first = offset + start // line_bases * line_width + start % line_bases
+        last = offset + (end - 1) // line_bases * line_width + (end - 1) % line_bases + 1
+        return self._mmap[first:last].replace(b"\n", b"").replace(b"\r", b"").decode("ascii")
+
+
+#: Four bases for each byte of packed 2bit sequence.
+_TWOBIT_BASES = [
+    "".join("TCAG"[(byte >> shift) & 3] for shift in (6, 4, 2, 0)).encode("ascii")
+    for byte in range(256)
+]
+
+
+class TwoBitFile:
+    """UCSC 2bit file, read via mmap.  Soft-masking is not reported."""
+
+    #: Signature at the start of the file.
+    SIGNATURE = 0x1A412743
+
+    def __init__(self, path: str):
+        #: Path to the 2bit file.
+        self.path = path
+        with open(path, "rb") as inputf:
+            #: The mapped file.
+            self._mmap = mmap.mmap(inputf.fileno(), 0, access=mmap.ACCESS_READ)
+        #: Byte order of the file.
+        self._order = "<" if struct.unpack_from("<I", self._mmap)[0] == self.SIGNATURE else ">"
+        signature, version, count, _ = struct.unpack_from(f"{self._order}IIII", self._mmap)
+        if signature != self.SIGNATURE or version not in (0, 1):
+            raise ValueError(f"{path} is not a 2bit file")
+        #: Offsets of the records of the contigs.
+        self._offsets: dict[str, int] = {}
+        offset_fmt = f"{self._order}{'Q' if version else 'I'}"
+        pos = 16
+        for _ in range(count):
+            name_size = self._mmap[pos]
+            name = self._mmap[pos + 1 : pos + 1 + name_size].decode("ascii")
+            pos += 1 + name_size
+            (self._offsets[name],) = struct.unpack_from(offset_fmt, self._mmap, pos)
+            pos += struct.calcsize(offset_fmt)
+        #: Length, starts and ends of N blocks and offset of the packed sequence by contig.
+        self._records: dict[str, tuple[int, list[int], list[int], int]] = {}
+
+    @property
+    def references(self) -> list[str]:
+        """The names of the contigs."""
+        return list(self._offsets)
+
+    def _record(self, reference: str) -> tuple[int, list[int], list[int], int]:
+        """Return the parsed header of the record of ``reference``."""
+        if reference not in self._records:
+            pos = self._offsets[reference]
+            length, n_count = struct.unpack_from(f"{self._order}II", self._mmap, pos)
+            pos += 8
+            n_starts = list(struct.unpack_from(f"{self._order}{n_count}I", self._mmap, pos))
+            pos += 4 * n_count
+            n_sizes = struct.unpack_from(f"{self._order}{n_count}I", self._mmap, pos)
+            pos += 4 * n_count
+            (mask_count,) = struct.unpack_from(f"{self._order}I", self._mmap, pos)
+            pos += 4 + 8 * mask_count + 4
+            n_ends = [start + size for start, size in zip(n_starts, n_sizes)]
+            self._records[reference] = (length, n_starts, n_ends, pos)
+        return self._records[reference]
+
+    def fetch(
+        self, reference: str | None = None, start: int | None = None, end: int | None = None
+    ) -> str:
+        """Return the interbase range ``[start, end)`` of contig ``reference``."""
+        length, n_starts, n_ends, offset = self._record(typing.cast(str, reference))
+        start, end = _clamp(start, end, length)
+        if start == end:
+            return ""
+        packed = self._mmap[offset + start // 4 : offset + (end - 1) // 4 + 1]
+        seq = bytearray(b"".join(_TWOBIT_BASES[byte] for byte in packed))
+        del seq[: start % 4]
+        del seq[end - start :]
+        # N blocks are sorted and do not overlap.
+        for i in range(max(0, bisect.bisect_right(n_starts, start) - 1), len(n_starts)):
+            if n_starts[i] >= end:
+                break
+            n_start, n_end = max(n_starts[i], start), min(n_ends[i], end)
+            if n_start < n_end:
+                seq[n_start - start : n_end - start] = b"N" * (n_end - n_start)
+        return seq.decode("ascii")
+
+
+def open_genome(path: str) -> GenomeFile:
+    """Open the genome file at ``path``.
+
+    Supported are 2bit files (``.2bit``), FASTA files with ``.fai`` index, and bgzipped
+    FASTA files (``.gz`` or ``.bgz``) with ``.fai`` and ``.gzi`` index.  The latter are read
+    with ``pysam``.
+    """
+    if path.endswith(".2bit"):
+        return TwoBitFile(path)
+    elif path.endswith((".gz", ".bgz")):
+        import pysam
+
+        return pysam.FastaFile(path)
+    else:
+        return FaidxFile(path)
+
+
+#: Operations of the cigar strings of the exons, as used by hgvs.
+_CIGAR_OP = re.compile(r"(\d+)([=DIX])")
+
+
+class GenomeSeqFetcher:
+    """Fetches contig sequences from a genome file and builds transcript sequences from the
+    exons, as cdot's ``FastaSeqFetcher`` does for pysam FASTA files.
+
+    The exons are read from the data provider set with ``set_data_provider()``.  The built
+    transcript sequences are kept here, for ``TRANSCRIPT_CACHE_SIZE`` transcripts, as
+    ``CachingSeqFetcher`` only keeps the blocks read from them.
+
+    :param accessions: map from the contig names in the genome file to accessions
+    :param genome: the opened genome file, opened from ``path`` if not given
+    """
+
+    #: Number of built transcript sequences to keep.
+    TRANSCRIPT_CACHE_SIZE = 256
+
+    def __init__(self, path: str, accessions: dict[str, str], genome: GenomeFile | None = None):
+        #: The genome file.
+        self.genome = genome or open_genome(path)
+        #: The names of the contigs in the genome file by accession.
+        self.contigs = {
+            accessions[name]: name for name in self.genome.references if name in accessions
+        }
+        if not self.contigs:
+            raise ValueError(f"No known contig in {path}")
+        #: Description of the source, as of the hgvs sequence fetchers.
+        self.source = f"Genome file {pathlib.Path(path).name}"
+        #: The data provider with the exons of the transcripts.
+        self.hdp: typing.Any = None
+        self._transcript_seq = functools.lru_cache(maxsize=self.TRANSCRIPT_CACHE_SIZE)(
+            self._build_transcript_seq
+        )
+
+    def set_data_provider(self, hdp: typing.Any):
+        """Set the data provider to read the exons of the transcripts from."""
+        self.hdp = hdp
+        self._transcript_seq.cache_clear()
+
+    def fetch_seq(self, ac: str, start_i: int | None = None, end_i: int | None = None) -> str:
+        """Return the interbase range ``[start_i, end_i)`` of contig or transcript ``ac``.
+
+        :raises HGVSDataNotAvailableError: if the sequence is not in the genome file
+        """
+        reference = self.contigs.get(ac)
+        if reference is not None:
+            return self.genome.fetch(reference, start_i, end_i).upper()
+        if self.hdp is not None:
+            for tx_mo in self.hdp.get_tx_mapping_options(ac):
+                if tx_mo["alt_ac"] in self.contigs:
+                    seq = self._transcript_seq(ac, tx_mo["alt_ac"], tx_mo["alt_aln_method"])
+                    return seq[start_i:end_i]
+        raise HGVSDataNotAvailableError(f"Failed to fetch {ac} from {self.source}")
+
+    def _build_transcript_seq(self, ac: str, alt_ac: str, alt_aln_method: str) -> str:
+        """Build the sequence of transcript ``ac`` from its exons on contig ``alt_ac``.
+
+        Bases missing in the genome, and the transcript before the first exon, are ``N``.
+        """
+        exons = sorted(self.hdp.get_tx_exons(ac, alt_ac, alt_aln_method), key=lambda e: e["ord"])
+        seqs = ["N" * exons[0]["tx_start_i"]]
+        for exon in exons:
+            genomic = self.fetch_seq(alt_ac, exon["alt_start_i"], exon["alt_end_i"])
+            exon_seqs = []
+            pos = 0
+            for length_str, op in _CIGAR_OP.findall(exon["cigar"]):
+                length = int(length_str)
+                if op == "D":  # missing in the genome
+                    exon_seqs.append("N" * length)
+                elif op == "I":  # missing in the transcript
+                    pos += length
+                else:
+                    exon_seqs.append(genomic[pos : pos + length])
+                    pos += length
+            exon_seq = "".join(exon_seqs)
+            seqs.append(reverse_complement(exon_seq) if exon["alt_strand"] == -1 else exon_seq)
+        seq = "".join(seqs)
+        expected = exons[0]["tx_start_i"] + sum(e["tx_end_i"] - e["tx_start_i"] for e in exons)
+        if len(seq) != expected:
+            raise ValueError(f"Building {ac} from {alt_ac} gave {len(seq)} bases, not {expected}")
+        return seq
@@ -0,0 +1,141 @@
+"""Multi-process server, run as ``python -m dotty serve``.
+
+With ``uvicorn --workers N``, each worker loads the data on startup.  Here, the master
+process loads the data and builds the indexes once, binds the listening socket and then
+forks the workers.  The workers share the loaded data copy-on-write; ``gc.freeze()`` keeps
+the garbage collector from touching, and thereby copying, the pages of the loaded objects.
+On ``SIGHUP``, the master reloads the data and replaces the workers without downtime.
+"""
+
+import gc
+import logging
+import os
+import signal
+import socket
+import time
+import typing
+
+import uvicorn
+
+from dotty import main as dotty_main
+from dotty.config import Settings
+
+#: Logger used in this module.
+_logger = logging.getLogger(__name__)
+
+#: Seconds to wait before replacing a worker that died.
+RESTART_DELAY = 1.0
+
+#: Signals handled by the master process.
+_MASTER_SIGNALS = {signal.SIGCHLD, signal.SIGHUP, signal.SIGINT, signal.SIGTERM}
+
+
+def _bind(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    """Create the listening socket shared by the workers."""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(config: uvicorn.Config, sock: socket.socket) -> typing.NoReturn:
+    """Run a uvicorn server on ``sock`` in the forked worker process."""
+    signal.pthread_sigmask(signal.SIG_UNBLOCK, _MASTER_SIGNALS)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    dotty_main.forked_worker = True
+    status = 0
+    try:
+        uvicorn.Server(config).run(sockets=[sock])
+    except BaseException:
+        _logger.exception("Worker %d failed", os.getpid())
+        status = 1
+    finally:
+        os._exit(status)
+
+
+def _reload_data() -> bool:
+    """Load the data version configured in the environment or ``.env`` file and swap it in.
+
+    Returns whether the data was reloaded.
+    """
+    data_version = Settings().DATA_VERSION
+    _logger.info("Reloading data version %s", data_version)
+    try:
+        data = dotty_main.build_data(data_version)
+    except Exception:
+        _logger.exception("Reloading data version %s failed", data_version)
+        return False
+    # Let the garbage collector free the old data, then freeze the new data.
+    gc.unfreeze()
+    dotty_main.swap_data(data)
+    del data
+    gc.collect()
+    gc.freeze()
+    return True
+
+
+def serve(host: str, port: int, workers: int, log_level: str = "info") -> int:
+    """Load the data, then fork ``workers`` processes that serve the app on ``host:port``.
+
+    Workers that die are replaced until the master receives ``SIGINT`` or ``SIGTERM``, which
+    it forwards to the workers.  On ``SIGHUP``, the master loads the ``DATA_VERSION`` from
+    the environment or ``.env`` file while the workers keep serving, then forks new workers
+    and stops the old ones once they have finished their requests.
+    """
+    dotty_main.load_data()
+    sock = _bind(host, port)
+    config = uvicorn.Config(dotty_main.app, log_level=log_level)
+    gc.collect()
+    gc.freeze()
+
+    pids: set[int] = set()
+    # Old workers that were stopped after a reload, not to be replaced.
+    retiring: set[int] = set()
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:  # pragma: no cover
+            _run_worker(config, sock)
+        pids.add(pid)
+
+    # Handle the signals synchronously in the loop below.
+    signal.pthread_sigmask(signal.SIG_BLOCK, _MASTER_SIGNALS)
+    _logger.info("Serving on %s:%d with %d workers", host, port, workers)
+    for _ in range(workers):
+        spawn()
+    status = 0
+    while pids:
+        signum = signal.sigwaitinfo(_MASTER_SIGNALS).si_signo
+        if signum in (signal.SIGINT, signal.SIGTERM) and not stopping:
+            stopping = True
+            for pid in pids:
+                os.kill(pid, signum)
+        elif signum == signal.SIGHUP and not stopping and _reload_data():
+            retiring.update(pids)
+            for _ in range(workers):
+                spawn()
+            for pid in retiring & pids:
+                os.kill(pid, signal.SIGTERM)
+        # Reap all workers that exited.
+        while pids:
+            pid, wait_status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                break
+            pids.discard(pid)
+            exit_code = os.waitstatus_to_exitcode(wait_status)
+            if pid in retiring:
+                retiring.discard(pid)
+            elif not stopping:
+                _logger.warning("Worker %d exited with status %d, restarting", pid, exit_code)
+                time.sleep(RESTART_DELAY)
+                spawn()
+            elif exit_code not in (0, -signal.SIGINT, -signal.SIGTERM):
+                status = 1
+    signal.pthread_sigmask(signal.SIG_UNBLOCK, _MASTER_SIGNALS)
+    sock.close()
+    return status
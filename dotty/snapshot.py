@@ -0,0 +1,387 @@
+"""Compact, memory-mappable snapshot of the cdot transcript data.
+
+The cdot ``.json.gz`` files have to be decompressed and parsed completely on each start,
+which takes minutes and gigabytes of memory for the full releases.  This module compiles
+the JSON files of one assembly into a single binary file that is opened with ``mmap``.
+Transcripts are only decoded when accessed, and the pages are shared between all
+processes that map the same file via the OS page cache.
+
+File layout (all integers are little endian)::
+
+    magic (8 bytes) | format version (u32) | header length (u32) | header (JSON)
+    section* (8 byte aligned, offsets listed in the header)
+
+The ``transcripts`` and ``genes`` sections are tables sorted by key that are looked up by
+binary search.  A table consists of its size ``n`` (u64), ``n + 1`` key offsets (u32),
+``n + 1`` record offsets (u64), the concatenated UTF-8 keys and the record blob.  A
+transcript record is a JSON document for everything except the exons, followed by the
+exons of each genome build as ``int32`` array.  The ``spans`` section has one fixed-size
+entry per transcript alignment so region lookups do not need to decode transcripts.
+"""
+
+import functools
+import gzip
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import typing
+from collections.abc import Iterator, Mapping
+
+from cdot.hgvs.dataproviders.json_data_provider import LocalDataProvider
+from intervaltree import IntervalTree
+
+#: Logger used in this module.
+_logger = logging.getLogger(__name__)
+
+#: Magic bytes at the start of each snapshot file.
+MAGIC = b"DOTTYSNP"
+#: Version of the snapshot file format, bumped on incompatible changes.
+FORMAT_VERSION = 1
+
+#: Preamble: magic, format version, header length.
+_PREAMBLE = struct.Struct("<8sII")
+#: Length prefix of the JSON part of a transcript record and the exon count.
+_U32 = struct.Struct("<I")
+#: Size of a table.
+_U64 = struct.Struct("<Q")
+#: One entry of the ``spans`` section: transcript index, contig index, start, end.
+_SPAN = struct.Struct("<IIii")
+#: Number of integers stored per exon (genomic start/end, exon number, cDNA start/end).
+_EXON_INTS = 5
+
+
+class SnapshotError(Exception):
+    """Raised when a snapshot file cannot be read."""
+
+
+def load_cdot_json(path: str) -> dict[str, typing.Any]:
+    """Load a cdot ``.json`` or ``.json.gz`` file."""
+    open_func = gzip.open if path.endswith(".gz") else open
+    with open_func(path, "rb") as inputf:
+        return json.loads(inputf.read())
+
+
+def _pad(length: int) -> bytes:
+    """Return the padding to align ``length`` to 8 bytes."""
+    return b"\0" * (-length % 8)
+
+
+def _encode_transcript(transcript: dict[str, typing.Any]) -> bytes:
+    """Encode one transcript record.
+
+    The exons of each genome build are stored as ``int32`` array, their gap strings are
+    kept in the JSON part.
+    """
+    meta = dict(transcript)
+    genome_builds = {}
+    gaps = {}
+    arrays = []
+    for build_name, build_data in transcript["genome_builds"].items():
+        build_meta = dict(build_data)
+        exons = build_meta.pop("exons")
+        genome_builds[build_name] = build_meta
+        gaps[build_name] = [exon[5] if len(exon) > 5 else None for exon in exons]
+        ints = [value for exon in exons for value in exon[:_EXON_INTS]]
+        arrays.append(_U32.pack(len(exons)) + struct.pack(f"<{len(ints)}i", *ints))
+    meta["genome_builds"] = genome_builds
+    meta_json = json.dumps({"t": meta, "g": gaps}, separators=(",", ":")).encode("utf-8")
+    return b"".join([_U32.pack(len(meta_json)), meta_json, *arrays])
+
+
+def _decode_transcript(buf: memoryview) -> dict[str, typing.Any]:
+    """Decode the transcript record in ``buf``."""
+    (meta_len,) = _U32.unpack_from(buf, 0)
+    offset = _U32.size
+    meta = json.loads(bytes(buf[offset : offset + meta_len]))
+    offset += meta_len
+    transcript = meta["t"]
+    for build_name, build_data in transcript["genome_builds"].items():
+        (n_exons,) = _U32.unpack_from(buf, offset)
+        offset += _U32.size
+        ints = struct.unpack_from(f"<{n_exons * _EXON_INTS}i", buf, offset)
+        offset += n_exons * _EXON_INTS * 4
+        build_data["exons"] = [
+            [*ints[i * _EXON_INTS : (i + 1) * _EXON_INTS], gap]
+            for i, gap in enumerate(meta["g"][build_name])
+        ]
+    return transcript
+
+
+def _encode_table(records: dict[str, bytes]) -> bytes:
+    """Encode ``records`` as table sorted by key."""
+    keys = sorted(records)
+    encoded_keys = [key.encode("utf-8") for key in keys]
+    key_offsets = [0]
+    for encoded_key in encoded_keys:
+        key_offsets.append(key_offsets[-1] + len(encoded_key))
+    record_offsets = [0]
+    for key in keys:
+        record_offsets.append(record_offsets[-1] + len(records[key]))
+    n = len(keys)
+    key_offsets_blob = struct.pack(f"<{n + 1}I", *key_offsets)
+    return b"".join(
+        [
+            _U64.pack(n),
+            key_offsets_blob,
+            _pad(len(key_offsets_blob)),
+            struct.pack(f"<{n + 1}Q", *record_offsets),
+            b"".join(encoded_keys),
+            _pad(key_offsets[-1]),
+            b"".join(records[key] for key in keys),
+        ]
+    )
+
+
+class _Table:
+    """Read-only view on a table in the mapped snapshot file."""
+
+    def __init__(self, buf: memoryview, offset: int):
+        (n,) = _U64.unpack_from(buf, offset)
+        #: Number of records in the table.
+        self.size = n
+        offset += _U64.size
+        key_offsets_len = 4 * (n + 1)
+        #: Offsets of the keys relative to ``self._keys``.
+        self._key_offsets = _cast(buf[offset : offset + key_offsets_len], "I")
+        offset += key_offsets_len + len(_pad(key_offsets_len))
+        #: Offsets of the records relative to ``self._records``.
+        self._record_offsets = _cast(buf[offset : offset + 8 * (n + 1)], "Q")
+        offset += 8 * (n + 1)
+        keys_len = self._key_offsets[n]
+        #: The concatenated keys.
+        self._keys = buf[offset : offset + keys_len]
+        offset += keys_len + len(_pad(keys_len))
+        #: The concatenated records.
+        self._records = buf[offset : offset + self._record_offsets[n]]
+
+    def key(self, idx: int) -> str:
+        """Return the key at index ``idx``."""
+        return str(self._keys[self._key_offsets[idx] : self._key_offsets[idx + 1]], "utf-8")
+
+    def record(self, idx: int) -> memoryview:
+        """Return the record at index ``idx``."""
+        return self._records[self._record_offsets[idx] : self._record_offsets[idx + 1]]
+
+    def bisect_left(self, key: str) -> int:
+        """Return the index of the first key that is not smaller than ``key``."""
+        needle = key.encode("utf-8")
+        lo, hi = 0, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if bytes(self._keys[self._key_offsets[mid] : self._key_offsets[mid + 1]]) < needle:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def find(self, key: str) -> int | None:
+        """Return the index of ``key`` or ``None`` if it is not in the table."""
+        idx = self.bisect_left(key)
+        if idx < self.size and self.key(idx) == key:
+            return idx
+        return None
+
+
+def _cast(view: memoryview, fmt: typing.Literal["I", "Q"]) -> typing.Any:
+    """Cast ``view`` to an array of little-endian integers with format ``fmt``."""
+    if sys.byteorder == "little":
+        return view.cast(fmt)
+    else:  # pragma: no cover
+        return struct.unpack(f"<{len(view) // struct.calcsize(fmt)}{fmt}", view)
+
+
+def compile_snapshot(input_paths: typing.Iterable[str], output_path: str):
+    """Compile the cdot JSON files at ``input_paths`` into a snapshot at ``output_path``.
+
+    The files are merged in the same way as ``JSONDataProvider`` does, i.e., later files
+    override transcripts and genes of earlier ones.  The output file is written to a
+    temporary file first and then moved into place atomically.
+    """
+    cdot_versions: list[str] = []
+    genome_builds: set[str] = set()
+    transcripts: dict[str, typing.Any] = {}
+    genes: dict[str, typing.Any] = {}
+    for path in input_paths:
+        _logger.info("Reading %s ...", path)
+        data = load_cdot_json(path)
+        cdot_versions.append(data["cdot_version"])
+        genome_builds.update(data["genome_builds"])
+        transcripts.update(data["transcripts"])
+        for gene in (data.get("genes") or {}).values():
+            if gene_symbol := gene.get("gene_symbol"):
+                genes[gene_symbol] = gene
+
+    tx_ids = sorted(transcripts)
+    tx_by_gene: dict[str, list[str]] = {}
+    contigs: dict[str, int] = {}
+    spans = []
+    for tx_idx, tx_id in enumerate(tx_ids):
+        transcript = transcripts[tx_id]
+        if gene_name := transcript.get("gene_name"):
+            tx_by_gene.setdefault(gene_name, []).append(tx_id)
+        for build_data in transcript["genome_builds"].values():
+            contig_idx = contigs.setdefault(build_data["contig"], len(contigs))
+            exons = build_data["exons"]
+            spans.append(_SPAN.pack(tx_idx, contig_idx, exons[0][0], exons[-1][1]))
+
+    gene_records = {
+        gene_name: json.dumps(
+            {"gene": genes.get(gene_name), "transcripts": tx_by_gene.get(gene_name, [])},
+            separators=(",", ":"),
+        ).encode("utf-8")
+        for gene_name in set(genes) | set(tx_by_gene)
+    }
+    sections = {
+        "transcripts": _encode_table(
+            {tx_id: _encode_transcript(transcripts[tx_id]) for tx_id in tx_ids}
+        ),
+        "genes": _encode_table(gene_records),
+        "spans": b"".join(spans),
+    }
+
+    header: dict[str, typing.Any] = {
+        # Like ``JSONDataProvider``, use the version of the last file.
+        "cdot_version": cdot_versions[-1],
+        "genome_builds": sorted(genome_builds),
+        "contigs": list(contigs),
+        "sections": {},
+    }
+    # The section offsets depend on the header length, so fix the header's size by
+    # reserving enough space for the offsets first.
+    header["sections"] = {name: [0, len(blob)] for name, blob in sections.items()}
+    header_len = len(json.dumps(header).encode("utf-8")) + 32 * len(sections)
+    header_len += -(_PREAMBLE.size + header_len) % 8
+    offset = _PREAMBLE.size + header_len
+    for name, blob in sections.items():
+        header["sections"][name] = [offset, len(blob)]
+        offset += len(blob) + len(_pad(len(blob)))
+    header_blob = json.dumps(header).encode("utf-8").ljust(header_len, b" ")
+
+    tmp_path = f"{output_path}.tmp"
+    with open(tmp_path, "wb") as outputf:
+        outputf.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, header_len))
+        outputf.write(header_blob)
+        for blob in sections.values():
+            outputf.write(blob)
+            outputf.write(_pad(len(blob)))
+    os.replace(tmp_path, output_path)
+    _logger.info("Wrote %d transcripts to %s", len(tx_ids), output_path)
+
+
+class SnapshotTranscripts(Mapping):
+    """Read-only mapping from transcript ID to the lazily decoded transcript."""
+
+    def __init__(self, provider: "SnapshotDataProvider"):
+        self._provider = provider
+
+    def __getitem__(self, tx_ac: str) -> dict[str, typing.Any]:
+        transcript = self._provider._get_transcript(tx_ac)
+        if transcript is None:
+            raise KeyError(tx_ac)
+        return transcript
+
+    def __contains__(self, tx_ac: object) -> bool:
+        return isinstance(tx_ac, str) and self._provider._transcripts.find(tx_ac) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        table = self._provider._transcripts
+        return (table.key(idx) for idx in range(table.size))
+
+    def __len__(self) -> int:
+        return self._provider._transcripts.size
+
+
+class SnapshotDataProvider(LocalDataProvider):
+    """Data provider that reads a snapshot written by ``compile_snapshot()``.
+
+    Offers the same interface as cdot's ``JSONDataProvider``, including the
+    ``transcripts`` mapping.
+    """
+
+    #: Number of decoded transcripts to keep in memory.
+    TRANSCRIPT_CACHE_SIZE = 10_000
+
+    def __init__(self, path: str, mode=None, cache=None, seqfetcher=None):
+        #: Path to the snapshot file.
+        self.path = path
+        with open(path, "rb") as inputf:
+            self._mmap = mmap.mmap(inputf.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = memoryview(self._mmap)
+        if len(buf) < _PREAMBLE.size:
+            raise SnapshotError(f"File {path} is too short to be a snapshot")
+        magic, format_version, header_len = _PREAMBLE.unpack_from(buf, 0)
+        if magic != MAGIC:
+            raise SnapshotError(f"File {path} is not a dotty snapshot")
+        if format_version != FORMAT_VERSION:
+            raise SnapshotError(
+                f"Snapshot {path} has format version {format_version}, "
+                f"expected {FORMAT_VERSION}; please run compile-data again"
+            )
+        header = json.loads(bytes(buf[_PREAMBLE.size : _PREAMBLE.size + header_len]))
+        sections = header["sections"]
+        self._transcripts = _Table(buf, sections["transcripts"][0])
+        self._genes = _Table(buf, sections["genes"][0])
+        spans_offset, spans_len = sections["spans"]
+        self._spans = buf[spans_offset : spans_offset + spans_len]
+        self._contigs: list[str] = header["contigs"]
+        self._interval_trees: dict[str, IntervalTree] = {}
+        self._decode_transcript = functools.lru_cache(maxsize=self.TRANSCRIPT_CACHE_SIZE)(
+            self._decode_transcript_uncached
+        )
+        #: Lazily decoding mapping from transcript ID to transcript.
+        self.transcripts = SnapshotTranscripts(self)
+        #: Version of the cdot data.
+        self.cdot_data_version = tuple(int(v) for v in header["cdot_version"].split("."))
+        self._validate_schema_compatability(header["cdot_version"])
+        super().__init__(
+            assemblies=header["genome_builds"], mode=mode, cache=cache, seqfetcher=seqfetcher
+        )
+
+    def _decode_transcript_uncached(self, idx: int) -> dict[str, typing.Any]:
+        return _decode_transcript(self._transcripts.record(idx))
+
+    def _get_transcript(self, tx_ac):
+        idx = self._transcripts.find(tx_ac)
+        if idx is None:
+            return None
+        return self._decode_transcript(idx)
+
+    def _get_gene_record(self, gene: str) -> dict[str, typing.Any] | None:
+        idx = self._genes.find(gene)
+        if idx is None:
+            return None
+        return json.loads(bytes(self._genes.record(idx)))
+
+    def _get_gene(self, gene):
+        record = self._get_gene_record(gene)
+        return record["gene"] if record else None
+
+    def _get_transcript_ids_for_gene(self, gene):
+        record = self._get_gene_record(gene)
+        return record["transcripts"] if record else []
+
+    def iter_spans(self) -> Iterator[tuple[str, str, int, int]]:
+        """Yield ``(tx_ac, contig, start, end)`` for each transcript alignment."""
+        for tx_idx, contig_idx, start, end in _SPAN.iter_unpack(self._spans):
+            yield self._transcripts.key(tx_idx), self._contigs[contig_idx], start, end
+
+    def _get_contig_interval_tree(self, alt_ac):
+        if not self._interval_trees:
+            trees: dict[str, IntervalTree] = {contig: IntervalTree() for contig in self._contigs}
+            for tx_ac, contig, start, end in self.iter_spans():
+                trees[contig][start:end] = tx_ac
+            self._interval_trees = trees
+        return self._interval_trees.get(alt_ac, IntervalTree())
+
+    def get_pro_ac_for_tx_ac(self, tx_ac):
+        if self.cdot_data_version < (0, 2, 8):
+            raise NotImplementedError("ProteinID not in your snapshot's cdot data version")
+        return super().get_pro_ac_for_tx_ac(tx_ac)
+
+    def get_gene_info(self, gene):
+        if self.cdot_data_version < (0, 2, 10):
+            raise NotImplementedError("Gene Info not in your snapshot's cdot data version")
+        return super().get_gene_info(gene)
@@ -0,0 +1,213 @@
+"""Compact in-memory representation of the cdot transcript records.
+
+The decoded cdot JSON holds each transcript as nested dicts, with a list of six values per
+exon, which takes kilobytes per transcript.  Here, the records are ``__slots__`` objects with
+interned strings, the exons of each genome build are packed into an ``int32`` array, and the
+gap strings of the exons are kept once.  The records are read-only ``Mapping`` views with the
+keys and values of the cdot records, so they are used by ``JSONDataProvider``, the indexes
+and ``Transcript._from_dict()`` in place of the dicts; lists are decoded on access, and the
+exons and alignments of the recently used records are kept decoded.
+"""
+
+import array
+import functools
+import sys
+import typing
+from collections.abc import Iterator, Mapping
+
+#: Number of integers stored per exon (genomic start/end, exon number, cDNA start/end).
+_EXON_INTS = 5
+
+#: Shared tuples of strings, e.g., of the biotypes, by value.
+_tuples: dict[tuple, tuple] = {}
+
+#: Marks unset slots.
+_UNSET = object()
+
+#: Number of decoded values kept, e.g., the exons of the recently used transcripts.
+DECODED_CACHE_SIZE = 4096
+
+
+def _shared_tuple(values: typing.Iterable[typing.Any]) -> tuple:
+    """Return the shared tuple of ``values``, with strings interned."""
+    value = tuple(sys.intern(v) if isinstance(v, str) else v for v in values)
+    return _tuples.setdefault(value, value)
+
+
+def _intern(value: typing.Any) -> typing.Any:
+    """Return the interned string ``value``, other values as they are."""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class _Ref:
+    """Reference to a record, compared by identity, as key of ``_decoded()``."""
+
+    __slots__ = ("record",)
+
+    def __init__(self, record: "_CompactRecord"):
+        self.record = record
+
+    def __hash__(self) -> int:
+        return id(self.record)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, _Ref) and other.record is self.record
+
+
+@functools.lru_cache(maxsize=DECODED_CACHE_SIZE)
+def _decoded(ref: _Ref, key: str) -> typing.Any:
+    """Return the decoded value of ``key`` of the record, kept while it is recently used.
+
+    The cache holds the record, so the identity of a cached record is not reused.
+    """
+    return ref.record._decode(key, getattr(ref.record, key))
+
+
+class _CompactRecord(Mapping):
+    """A record with the keys in ``_FIELDS`` stored in slots of the same name.
+
+    Slots of missing keys are left unset, other keys are kept in ``_extra``.  The decoded
+    values of the keys in ``_MEMOIZED`` are shared between accesses and must not be modified.
+    """
+
+    __slots__ = ("_extra",)
+
+    #: The keys stored in slots.
+    _FIELDS: typing.ClassVar[tuple[str, ...]] = ()
+
+    #: The keys whose decoded values are kept by ``_decoded()``.
+    _MEMOIZED: typing.ClassVar[frozenset[str]] = frozenset()
+
+    def __init__(self, record: Mapping[str, typing.Any]):
+        extra = {}
+        for key, value in record.items():
+            if key in self._FIELDS:
+                setattr(self, key, self._encode(key, value))
+            else:
+                extra[sys.intern(key)] = value
+        self._extra = extra or None
+
+    def _encode(self, key: str, value: typing.Any) -> typing.Any:
+        """Return the compact form of the ``value`` of ``key``."""
+        return _intern(value)
+
+    def _decode(self, key: str, value: typing.Any) -> typing.Any:
+        """Return the value of ``key`` from its compact form ``value``."""
+        return value
+
+    def __getitem__(self, key: str) -> typing.Any:
+        if key in self._FIELDS:
+            value = getattr(self, key, _UNSET)
+            if value is not _UNSET:
+                if key in self._MEMOIZED:
+                    return _decoded(_Ref(self), key)
+                return self._decode(key, value)
+        elif self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        # Without decoding, as ``Mapping.__contains__()`` would.
+        if key in self._FIELDS:
+            return hasattr(self, typing.cast(str, key))
+        return self._extra is not None and key in self._extra
+
+    def __iter__(self) -> Iterator[str]:
+        for key in self._FIELDS:
+            if hasattr(self, key):
+                yield key
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({dict(self)!r})"
+
+
+class CompactAlignment(_CompactRecord):
+    """The alignment of a transcript to one genome build, a value of ``genome_builds``."""
+
+    __slots__ = ("contig", "strand", "cds_start", "cds_end", "exons", "_gaps")
+
+    _FIELDS = ("contig", "strand", "cds_start", "cds_end", "exons")
+
+    _MEMOIZED = frozenset(["exons"])
+
+    def _encode(self, key: str, value: typing.Any) -> typing.Any:
+        if key == "exons":
+            # The gaps are only kept if any exon has one.
+            gaps = tuple(
+                _intern(exon[_EXON_INTS]) if len(exon) > _EXON_INTS else None for exon in value
+            )
+            if any(gaps):
+                self._gaps = gaps
+            return array.array("i", [v for exon in value for v in exon[:_EXON_INTS]])
+        return super()._encode(key, value)
+
+    def _decode(self, key: str, value: typing.Any) -> typing.Any:
+        if key == "exons":
+            gaps = getattr(self, "_gaps", None) or (None,) * (len(value) // _EXON_INTS)
+            return [
+                [*value[i * _EXON_INTS : (i + 1) * _EXON_INTS], gap] for i, gap in enumerate(gaps)
+            ]
+        return value
+
+
+class CompactTranscript(_CompactRecord):
+    """A transcript record of the cdot data."""
+
+    __slots__ = (
+        "id",
+        "gene_name",
+        "gene_version",
+        "hgnc",
+        "biotype",
+        "protein",
+        "start_codon",
+        "stop_codon",
+        "genome_builds",
+        "__weakref__",
+    )
+
+    _FIELDS = (
+        "id",
+        "gene_name",
+        "gene_version",
+        "hgnc",
+        "biotype",
+        "protein",
+        "start_codon",
+        "stop_codon",
+        "genome_builds",
+    )
+
+    _MEMOIZED = frozenset(["genome_builds"])
+
+    def _encode(self, key: str, value: typing.Any) -> typing.Any:
+        if key == "genome_builds":
+            return tuple(
+                (sys.intern(name), CompactAlignment(build_data))
+                for name, build_data in value.items()
+            )
+        if key == "biotype" and isinstance(value, list):
+            return _shared_tuple(value)
+        return super()._encode(key, value)
+
+    def _decode(self, key: str, value: typing.Any) -> typing.Any:
+        if key == "genome_builds":
+            return dict(value)
+        if key == "biotype" and isinstance(value, tuple):
+            return list(value)
+        return value
+
+
+def compact_transcripts(
+    transcripts: dict[str, dict[str, typing.Any]],
+) -> dict[str, CompactTranscript]:
+    """Return the compact records of the cdot ``transcripts``, by accession."""
+    return {
+        sys.intern(tx_ac): CompactTranscript(transcript)
+        for tx_ac, transcript in transcripts.items()
+    }
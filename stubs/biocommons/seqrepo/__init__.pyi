@@ -0,0 +1,4 @@
+class SeqRepo:
+    def __init__(self, root_dir: str, writeable: bool = False) -> None: ...
+    def commit(self) -> None: ...
+    def fetch(self, alias: str, start: int | None = None, end: int | None = None) -> str: ...
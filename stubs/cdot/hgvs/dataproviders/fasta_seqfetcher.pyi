@@ -0,0 +1,20 @@
+import re
+import typing
+
+from hgvs.dataproviders.interface import Interface
+
+class ChainedSeqFetcher:
+    def __init__(self, *args: typing.Any) -> None: ...
+    def set_data_provider(self, hdp: Interface) -> None: ...
+    def fetch_seq(self, ac: str, start_i: int | None = None, end_i: int | None = None) -> str: ...
+
+class FastaSeqFetcher:
+    cache: bool
+    transcript_cache: dict[str, str]
+    hdp: Interface | None
+    source: str
+    contig_fastas: dict[str, typing.Any]
+    cigar_pattern: re.Pattern[str]
+    def __init__(self, *args: str, cache: bool = True) -> None: ...
+    def set_data_provider(self, hdp: Interface) -> None: ...
+    def fetch_seq(self, ac: str, start_i: int | None = None, end_i: int | None = None) -> str: ...
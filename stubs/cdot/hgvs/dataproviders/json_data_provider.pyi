@@ -1,13 +1,42 @@
 import typing
 
 from hgvs.dataproviders.interface import Interface
+from intervaltree import IntervalTree
 
 class AbstractJSONDataProvider(Interface):
-    pass
+    def __init__(
+        self,
+        assemblies: typing.Iterable[str] | None = None,
+        mode: typing.Any = None,
+        cache: typing.Any = None,
+        seqfetcher: typing.Any = None,
+    ) -> None: ...
+    def _validate_schema_compatability(self, json_schema_version: str) -> None: ...
+    def get_pro_ac_for_tx_ac(self, tx_ac: str) -> str | None: ...
+    def get_gene_info(self, gene: str) -> dict[str, typing.Any] | None: ...
+    def _get_gene(self, gene: str) -> dict[str, typing.Any] | None: ...
+    def get_tx_exons(
+        self, tx_ac: str, alt_ac: str, alt_aln_method: str
+    ) -> list[dict[str, typing.Any]] | None: ...
+    def get_tx_info(
+        self, tx_ac: str, alt_ac: str, alt_aln_method: str
+    ) -> dict[str, typing.Any]: ...
+    def get_tx_for_gene(self, gene: str) -> list[dict[str, typing.Any]]: ...
+    def get_tx_for_region(
+        self, alt_ac: str, alt_aln_method: str, start_i: int, end_i: int
+    ) -> list[dict[str, typing.Any]]: ...
 
 class LocalDataProvider(AbstractJSONDataProvider):
-    pass
+    transcripts: typing.Mapping[str, typing.Any]
+    def _get_transcript(self, tx_id: str) -> dict[str, typing.Any]: ...
+    def _get_contig_interval_tree(self, alt_ac: str) -> IntervalTree: ...
 
 class JSONDataProvider(LocalDataProvider):
     transcripts: dict[str, typing.Any]
-    def _get_transcript(self, tx_id: str) -> dict[str, typing.Any]: ...
+    def __init__(
+        self,
+        file_or_filename_list: list[typing.Any],
+        mode: typing.Any = None,
+        cache: typing.Any = None,
+        seqfetcher: typing.Any = None,
+    ) -> None: ...
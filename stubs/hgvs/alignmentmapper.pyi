@@ -0,0 +1,8 @@
+from hgvs.location import BaseOffsetInterval, Interval
+
+class AlignmentMapper:
+    alt_ac: str
+    strand: int
+    tgt_len: int
+    def c_to_g(self, c_interval: BaseOffsetInterval) -> Interval: ...
+    def n_to_g(self, n_interval: BaseOffsetInterval) -> Interval: ...
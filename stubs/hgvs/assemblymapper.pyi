@@ -1,10 +1,31 @@
+import typing
+
+from hgvs.alignmentmapper import AlignmentMapper
 from hgvs.sequencevariant import SequenceVariant
 from hgvs.variantmapper import VariantMapper
 
 class AssemblyMapper(VariantMapper):
+    alt_aln_method: str
+    def __init__(
+        self,
+        hdp: typing.Any,
+        assembly_name: str = "GRCh38",
+        alt_aln_method: str = "splign",
+        normalize: bool = True,
+        prevalidation_level: str | None = "EXTRINSIC",
+        in_par_assume: str = "X",
+        replace_reference: bool = True,
+        add_gene_symbol: bool = False,
+        *args: typing.Any,
+        **kwargs: typing.Any,
+    ) -> None: ...
     def g_to_c(self, var_g: SequenceVariant, tx_ac: str) -> SequenceVariant: ...
     def g_to_n(self, var_g: SequenceVariant, tx_ac: str) -> SequenceVariant: ...
     def g_to_t(self, var_g: SequenceVariant, tx_ac: str) -> SequenceVariant: ...
     def c_to_g(self, var_c: SequenceVariant) -> SequenceVariant: ...
     def n_to_g(self, var_n: SequenceVariant) -> SequenceVariant: ...
     def t_to_g(self, var_t: SequenceVariant) -> SequenceVariant: ...
+    def _alt_ac_for_tx_ac(self, tx_ac: str) -> str: ...
+    def _fetch_AlignmentMapper(
+        self, tx_ac: str, alt_ac: str | None = None, alt_aln_method: str | None = None
+    ) -> AlignmentMapper: ...
@@ -1,2 +1,2 @@
 class SeqFetcher(object):
-    def fetch_seq(self, seq: str, start: int, end: int) -> str: ...
+    def fetch_seq(self, ac: str, start_i: int | None = None, end_i: int | None = None) -> str: ...
@@ -0,0 +1,12 @@
+class Edit: ...
+
+class NARefAlt(Edit):
+    ref: str | None
+    alt: str | None
+    def __init__(self, ref: str | None = None, alt: str | None = None) -> None: ...
+    @property
+    def type(self) -> str: ...
+
+class Dup(Edit):
+    ref: str | None
+    def __init__(self, ref: str | None = None) -> None: ...
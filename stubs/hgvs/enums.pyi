@@ -0,0 +1,6 @@
+import enum
+
+class Datum(enum.Enum):
+    SEQ_START = 1
+    CDS_START = 2
+    CDS_END = 3
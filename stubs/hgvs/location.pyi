@@ -0,0 +1,24 @@
+from hgvs.enums import Datum
+
+class SimplePosition:
+    base: int
+    def __init__(self, base: int, uncertain: bool = False) -> None: ...
+
+class Interval:
+    start: SimplePosition
+    end: SimplePosition
+    uncertain: bool
+    def __init__(self, start: SimplePosition, end: SimplePosition) -> None: ...
+
+class BaseOffsetPosition:
+    base: int
+    offset: int
+    datum: Datum
+    def __init__(
+        self, base: int, offset: int = 0, datum: Datum = ..., uncertain: bool = False
+    ) -> None: ...
+
+class BaseOffsetInterval:
+    start: BaseOffsetPosition
+    end: BaseOffsetPosition
+    def __init__(self, start: BaseOffsetPosition, end: BaseOffsetPosition) -> None: ...
@@ -1,6 +1,9 @@
 import typing
 
 class PosEdit:
-    pos: int
+    pos: typing.Any
     edit: typing.Any
     uncertain: bool
+    def __init__(
+        self, pos: typing.Any = None, edit: typing.Any = None, uncertain: bool = False
+    ) -> None: ...
@@ -4,3 +4,5 @@ class SequenceVariant:
     type: str
     ac: str
     posedit: PosEdit
+    gene: str | None
+    def __init__(self, ac: str, type: str, posedit: PosEdit, gene: str | None = None) -> None: ...
@@ -0,0 +1,3 @@
+import typing
+
+def build_tx_cigar(exons: list[dict[str, typing.Any]], strand: int) -> str | None: ...
@@ -0,0 +1,10 @@
+class CIGARMapper:
+    cigar: str
+    ref_pos: list[int]
+    tgt_pos: list[int]
+    cigar_op: list[str]
+    def __init__(self, cigar: str) -> None: ...
+    @property
+    def ref_len(self) -> int: ...
+    @property
+    def tgt_len(self) -> int: ...
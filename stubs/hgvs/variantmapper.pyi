@@ -1,2 +1,2 @@
 class VariantMapper:
-    pass
+    replace_reference: bool
@@ -0,0 +1,11 @@
+import typing
+
+class Interval(typing.NamedTuple):
+    begin: int
+    end: int
+    data: typing.Any
+
+class IntervalTree:
+    def __init__(self) -> None: ...
+    def __getitem__(self, index: typing.Any) -> set[Interval]: ...
+    def __setitem__(self, index: slice, value: typing.Any) -> None: ...
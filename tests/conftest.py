@@ -1,12 +1,21 @@
+import gzip
+import json
+import pathlib
+import shutil
+import typing
+
 import pytest
 from _pytest.monkeypatch import MonkeyPatch
+from biocommons.seqrepo import SeqRepo
 from cdot.hgvs.dataproviders.json_data_provider import AbstractJSONDataProvider
 from fastapi.testclient import TestClient
 from hgvs.dataproviders.seqfetcher import SeqFetcher
 
+from dotty import main as dotty_main
 from dotty.config import settings
-from dotty.core import Driver
+from dotty.core import Assembly, Driver
 from dotty.main import app
+from dotty.seqfetcher import CachingSeqFetcher
 
 
 @pytest.fixture
@@ -14,6 +23,17 @@ def test_client() -> TestClient:
     return TestClient(app)
 
 
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Clear the caches of the app so results of mocked drivers do not leak between tests."""
+    dotty_main.result_cache.clear()
+    dotty_main.result_cache.reset()
+    dotty_main.transcript_responses.clear()
+    dotty_main.data_registry.clear()
+    dotty_main.spdi_flights.reset()
+    dotty_main.transcript_flights.reset()
+
+
 @pytest.fixture(scope="session")
 def dotty_driver():
     driver = Driver("tests/data")
@@ -31,3 +51,161 @@ def mock_seqrepo_fetching(monkeypatch: MonkeyPatch) -> None:
     """Mock out the sequence fetching as we do not want to have any data in tests/data/seqrepo."""
     monkeypatch.setattr(AbstractJSONDataProvider, "get_seq", lambda *args: "NN")
     monkeypatch.setattr(SeqFetcher, "fetch_seq", lambda *args: "NN")
+    monkeypatch.setattr(CachingSeqFetcher, "fetch_seq", lambda *args: "NN")
+
+
+def _synthetic_transcripts(assembly: str) -> dict[str, typing.Any]:
+    """Synthetic cdot transcripts of two genes on chr17 of ``assembly``."""
+    contig, shift = {"GRCh37": ("NC_000017.10", 0), "GRCh38": ("NC_000017.11", 100_000)}[assembly]
+    return {
+        "refseq": {
+            "NM_000001.1": {
+                "id": "NM_000001.1",
+                "gene_name": "GENE1",
+                "gene_version": "1001",
+                "hgnc": "1001",
+                "biotype": ["protein_coding"],
+                "protein": "NP_000001.1",
+                "start_codon": 50,
+                "stop_codon": 350,
+                "genome_builds": {
+                    assembly: {
+                        "contig": contig,
+                        "strand": "+",
+                        "cds_start": shift + 1050,
+                        "cds_end": shift + 3050,
+                        "exons": [
+                            [shift + 1000, shift + 1100, 0, 1, 100, None],
+                            [shift + 2000, shift + 2200, 1, 101, 300, None],
+                            [shift + 3000, shift + 3100, 2, 301, 400, None],
+                        ],
+                    }
+                },
+            },
+            "NR_000002.1": {
+                "id": "NR_000002.1",
+                "gene_name": "GENE1",
+                "gene_version": "1001",
+                "hgnc": "1001",
+                "biotype": ["non_coding"],
+                "genome_builds": {
+                    assembly: {
+                        "contig": contig,
+                        "strand": "+",
+                        "exons": [
+                            [shift + 1000, shift + 1100, 0, 1, 100, None],
+                            [shift + 3000, shift + 3102, 1, 101, 200, "M50 D2 M50"],
+                        ],
+                    }
+                },
+            },
+        },
+        "ensembl": {
+            "ENST00000000003.1": {
+                "id": "ENST00000000003.1",
+                "gene_name": "GENE2",
+                "gene_version": "ENSG00000000003",
+                "hgnc": "1002",
+                "biotype": ["protein_coding"],
+                "protein": "ENSP00000000003.1",
+                "start_codon": 10,
+                "stop_codon": 190,
+                "genome_builds": {
+                    assembly: {
+                        "contig": contig,
+                        "strand": "-",
+                        "cds_start": shift + 5010,
+                        "cds_end": shift + 6190,
+                        "exons": [
+                            [shift + 5000, shift + 5100, 1, 101, 200, None],
+                            [shift + 6100, shift + 6200, 0, 1, 100, None],
+                        ],
+                    }
+                },
+            },
+        },
+    }
+
+
+#: Synthetic cdot genes, by source.
+_SYNTHETIC_GENES = {
+    "refseq": {
+        "1001": {
+            "gene_symbol": "GENE1",
+            "hgnc": "1001",
+            "aliases": "GN1, GENEONE",
+            "description": "synthetic gene 1",
+            "map_location": "17q21",
+            "summary": "",
+            "biotype": ["protein_coding"],
+        }
+    },
+    "ensembl": {
+        "ENSG00000000003": {
+            "gene_symbol": "GENE2",
+            "hgnc": "1002",
+            "aliases": "",
+            "description": "synthetic gene 2",
+            "map_location": "17q21",
+            "summary": "",
+            "biotype": ["protein_coding"],
+        }
+    },
+}
+
+
+def write_synthetic_data(data_dir: pathlib.Path):
+    """Write synthetic cdot files and an empty seqrepo to ``data_dir``."""
+    for assembly in Assembly:
+        transcripts = _synthetic_transcripts(assembly.value)
+        for source in ("ensembl", "refseq"):
+            path = (
+                data_dir / f"cdot-{settings.DATA_VERSION}.{source}.{assembly.value.lower()}.json.gz"
+            )
+            with gzip.open(path, "wt") as outputf:
+                json.dump(
+                    {
+                        "cdot_version": settings.DATA_VERSION,
+                        "genome_builds": [assembly.value],
+                        "transcripts": transcripts[source],
+                        "genes": _SYNTHETIC_GENES[source],
+                    },
+                    outputf,
+                )
+    SeqRepo(str(data_dir / "seqrepo"), writeable=True).commit()
+
+
+@pytest.fixture(scope="session")
+def synthetic_data_dir(tmp_path_factory: pytest.TempPathFactory) -> pathlib.Path:
+    """Directory with synthetic cdot data of two genes, see ``write_synthetic_data()``."""
+    data_dir = tmp_path_factory.mktemp("data")
+    write_synthetic_data(data_dir)
+    return data_dir
+
+
+@pytest.fixture(scope="session")
+def synthetic_driver(synthetic_data_dir: pathlib.Path) -> Driver:
+    """Driver on the synthetic data, loaded without normalization."""
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(settings, "HAVE_SEQREPO", False)
+        driver = Driver(str(synthetic_data_dir))
+        driver.load()
+    return driver
+
+
+@pytest.fixture
+def two_versions_data_dir(synthetic_data_dir: pathlib.Path, tmp_path: pathlib.Path) -> pathlib.Path:
+    """Copy of the synthetic data as ``DATA_VERSION`` and as version ``0.2.99``, where the
+    RefSeq transcripts of GENE1 are missing."""
+    data_dir = tmp_path / "data"
+    shutil.copytree(synthetic_data_dir, data_dir)
+    for path in data_dir.glob(f"cdot-{settings.DATA_VERSION}.*.json.gz"):
+        with gzip.open(path, "rt") as inputf:
+            data = json.load(inputf)
+        data["transcripts"] = {
+            tx_ac: tx for tx_ac, tx in data["transcripts"].items() if tx["gene_name"] != "GENE1"
+        }
+        new_name = path.name.replace(settings.DATA_VERSION, "0.2.99")
+        with gzip.open(data_dir / new_name, "wt") as outputf:
+            json.dump(data, outputf)
+    return data_dir
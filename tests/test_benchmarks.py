@@ -0,0 +1,21 @@
+import pathlib
+
+from benchmarks import run, synthetic
+
+
+def test_benchmark(tmp_path: pathlib.Path):
+    synthetic.generate(tmp_path, genes=20, variants=50)
+    results = run.run(tmp_path, requests=20)
+    assert results["params"]["genes"] == 20
+    assert results["to_spdi"]["requests"] == 20
+    assert results["to_spdi"]["errors"] == 0
+    assert results["find_transcripts"]["errors"] == 0
+    assert results["find_genes"]["errors"] == 0
+    assert results["parse"]["speedup"] > 1
+
+    assert run.compare(results, results, tolerance=0.2) == []
+    slower = {**results, "to_spdi": {**results["to_spdi"], "throughput": 1e-6, "errors": 1}}
+    assert run.compare(results, slower, tolerance=0.2) == [
+        "to_spdi.errors: 0 -> 1",
+        f"to_spdi.throughput: {results['to_spdi']['throughput']:.4g} -> 1e-06 (+100% worse)",
+    ]
@@ -0,0 +1,122 @@
+import asyncio
+import pathlib
+import time
+
+from dotty.cache import PersistentCache, ResultCache, SingleFlight
+
+
+def test_result_cache_lru():
+    cache: ResultCache[str, int] = ResultCache(max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+    assert (cache.hits, cache.misses) == (3, 1)
+
+    cache.clear()
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (3, 1)
+    cache.reset()
+    assert (cache.hits, cache.misses) == (0, 0)
+
+
+def test_result_cache_ttl():
+    cache: ResultCache[str, int] = ResultCache(max_size=2, ttl=0.01)
+    cache.put("a", 1)
+    assert cache.get("a") == 1
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_result_cache_disabled():
+    cache: ResultCache[str, int] = ResultCache(max_size=0)
+    cache.put("a", 1)
+    assert cache.get("a") is None
+
+
+def test_single_flight():
+    async def main() -> None:
+        flights: SingleFlight[str, int] = SingleFlight()
+        started = []
+        release = asyncio.Event()
+
+        async def compute(value: int) -> int:
+            started.append(value)
+            await release.wait()
+            return value
+
+        calls = [asyncio.ensure_future(flights.run("a", lambda: compute(1))) for _ in range(3)]
+        calls.append(asyncio.ensure_future(flights.run("b", lambda: compute(2))))
+        await asyncio.sleep(0)
+        assert len(flights) == 2
+        release.set()
+        assert await asyncio.gather(*calls) == [1, 1, 1, 2]
+        assert started == [1, 2]
+        assert (flights.calls, flights.coalesced) == (2, 2)
+        assert len(flights) == 0
+
+        # Finished computations are not reused.
+        assert await flights.run("a", lambda: compute(3)) == 3
+        assert flights.calls == 3
+
+    asyncio.run(main())
+
+
+def test_single_flight_error_and_cancel():
+    async def main() -> None:
+        flights: SingleFlight[str, int] = SingleFlight()
+        release = asyncio.Event()
+
+        async def fail() -> int:
+            await release.wait()
+            raise ValueError("failed")
+
+        calls = [asyncio.ensure_future(flights.run("a", fail)) for _ in range(3)]
+        await asyncio.sleep(0)
+        # Cancelling the call that started the computation does not cancel the others.
+        calls[0].cancel()
+        release.set()
+        results = await asyncio.gather(*calls, return_exceptions=True)
+        assert isinstance(results[0], asyncio.CancelledError)
+        assert all(isinstance(result, ValueError) for result in results[1:])
+        assert flights.coalesced == 2
+
+    asyncio.run(main())
+
+
+def test_persistent_cache(tmp_path: pathlib.Path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = PersistentCache(path)
+    keys = [("NM_000001.1:c.1A>G", "GRCh38", "0.2.21", normalize) for normalize in (True, False)]
+    assert cache.get_many(keys) == [None, None]
+    cache.put_many([(keys[0], "a")])
+    cache.put_many([(keys[0], "b")])
+    assert cache.get_many(keys) == ["b", None]
+    assert (cache.hits, cache.misses) == (1, 3)
+    assert len(cache) == 1
+
+    # Another process or a restart sees the entries.
+    assert PersistentCache(path).get_many(keys) == ["b", None]
+
+
+def test_persistent_cache_eviction(tmp_path: pathlib.Path):
+    cache = PersistentCache(str(tmp_path / "cache.sqlite"), max_size=100_000)
+    for i in range(10):
+        cache.put_many(((f"q{i}.{j}", "GRCh38", "0.2.21", True), "x" * 100) for j in range(200))
+    assert cache.size() <= 100_000
+    assert cache.evictions == 2000 - len(cache)
+    keys = [(f"q{i}.0", "GRCh38", "0.2.21", True) for i in (0, 9)]
+    assert cache.get_many(keys) == [None, "x" * 100]
+
+
+def test_persistent_cache_error(tmp_path: pathlib.Path):
+    """Errors of the database are reported as misses."""
+    cache = PersistentCache(str(tmp_path / "missing" / "cache.sqlite"))
+    cache.put_many([(("q", "GRCh38", "0.2.21", True), "a")])
+    assert cache.get_many([("q", "GRCh38", "0.2.21", True)]) == [None]
+    assert cache.misses == 1
@@ -0,0 +1,70 @@
+import io
+import pathlib
+
+import pytest
+
+from dotty.__main__ import main
+from dotty.convert import convert
+from dotty.core import Assembly, Driver
+
+#: Input with a header, an empty line, a variant in the second column and an invalid one.
+INPUT = """#id\tvariant
+a\tNM_000001.1:c.1A>G
+
+b\tNM_000001.1:c.100A>G
+c\tBRCA1
+"""
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_convert(mock_seqrepo_fetching: None, synthetic_driver: Driver, workers: int):
+    outputf = io.StringIO()
+    count = convert(
+        synthetic_driver,
+        io.StringIO(INPUT),
+        outputf,
+        assembly=Assembly.GRCH37,
+        column=1,
+        workers=workers,
+        chunk_size=1,
+    )
+    assert count == 3
+    lines = outputf.getvalue().splitlines()
+    assert lines[0] == "#variant\tassembly\tchrom\tpos\tref\talt\tmessage"
+    assert lines[1] == "NM_000001.1:c.1A>G\tGRCh37\t17\t1051\tA\tG\t"
+    assert lines[2] == "NM_000001.1:c.100A>G\tGRCh37\t17\t2050\tA\tG\t"
+    assert lines[3].startswith("BRCA1\tGRCh37\t\t\t\t\tHGVSParseError: ")
+
+
+def test_convert_missing_column(mock_seqrepo_fetching: None, synthetic_driver: Driver):
+    """Lines without the variant column are reported as errors."""
+    outputf = io.StringIO()
+    count = convert(
+        synthetic_driver,
+        io.StringIO("a\tNM_000001.1:c.1A>G\nonly_one_column\nb\t\n"),
+        outputf,
+        assembly=Assembly.GRCH37,
+        column=1,
+    )
+    assert count == 3
+    lines = outputf.getvalue().splitlines()
+    assert lines[1] == "NM_000001.1:c.1A>G\tGRCh37\t17\t1051\tA\tG\t"
+    assert lines[2:] == ["\tGRCh37\t\t\t\t\tNo variant in column 2"] * 2
+
+
+def test_convert_cli(
+    settings_no_seqrepo: None,
+    mock_seqrepo_fetching: None,
+    synthetic_data_dir: pathlib.Path,
+    tmp_path: pathlib.Path,
+):
+    (tmp_path / "input.txt").write_text("NM_000001.1:c.1A>G\n")
+    args = ["convert", str(tmp_path / "input.txt"), str(tmp_path / "output.tsv")]
+    args += ["--data-dir", str(synthetic_data_dir), "--workers", "1"]
+    assert main(args) == 0
+    assert (
+        (tmp_path / "output.tsv")
+        .read_text()
+        .splitlines()[1]
+        .startswith("NM_000001.1:c.1A>G\tGRCh38\t17\t101051\t")
+    )
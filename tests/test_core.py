@@ -1,6 +1,10 @@
+import pathlib
+
 import pytest
+from _pytest.monkeypatch import MonkeyPatch
 from hgvs.exceptions import HGVSDataNotAvailableError
 
+from dotty.config import settings
 from dotty.core import Assembly, Driver
 
 
@@ -62,3 +66,39 @@ def test_driver_t_to_g_with_var_n(
         "GRCh38": "NC_000017.11:g.43045682T>C",
     }
     assert result == expected
+
+
+@pytest.mark.parametrize("load_workers", [1, 2])
+def test_driver_load_workers(
+    settings_no_seqrepo: None,
+    mock_seqrepo_fetching: None,
+    synthetic_data_dir: pathlib.Path,
+    monkeypatch: MonkeyPatch,
+    load_workers: int,
+):
+    monkeypatch.setattr(settings, "LOAD_WORKERS", load_workers)
+    driver = Driver(str(synthetic_data_dir))
+    driver.load()
+    assert {
+        assembly: sorted(data_provider.transcripts)
+        for assembly, data_provider in driver.data_providers.items()
+    } == {assembly: ["ENST00000000003.1", "NM_000001.1", "NR_000002.1"] for assembly in Assembly}
+    var_c = driver.parser.parse("NM_000001.1:c.1A>G")
+    assert str(driver.assembly_mappers[Assembly.GRCH38].c_to_g(var_c)) == "NC_000017.11:g.101051A>G"
+
+
+@pytest.mark.parametrize(
+    "pos,ref,alt,expected",
+    [
+        (100, "A", "G", "NC_000017.11:g.100A>G"),
+        (100, "AC", "A", "NC_000017.11:g.101del"),
+        (100, "A", "AGT", "NC_000017.11:g.100_101insGT"),
+        (100, "ACG", "ATT", "NC_000017.11:g.101_102delinsTT"),
+        (100, "A", ".", "NC_000017.11:g.100="),
+    ],
+)
+def test_babelfish_vcf_to_g_hgvs(
+    synthetic_driver: Driver, pos: int, ref: str, alt: str, expected: str
+):
+    babelfish = synthetic_driver.babelfishes[Assembly.GRCH38]
+    assert str(babelfish.vcf_to_g_hgvs("NC_000017.11", pos, ref, alt)) == expected
@@ -0,0 +1,75 @@
+import asyncio
+import os
+import threading
+
+import pytest
+
+from dotty.executor import Dispatcher, DispatcherSaturatedError, ExecutionMode
+
+
+def _square(x: int) -> int:
+    return x * x
+
+
+@pytest.mark.parametrize("mode", list(ExecutionMode))
+def test_dispatcher_run(mode: ExecutionMode):
+    dispatcher = Dispatcher(mode=mode, max_workers=2, max_pending=2)
+    dispatcher.start()
+    try:
+
+        async def run_all() -> list[int]:
+            return await asyncio.gather(*(dispatcher.run(_square, i) for i in range(4)))
+
+        assert asyncio.run(run_all()) == [0, 1, 4, 9]
+        assert dispatcher.pending == 0
+    finally:
+        dispatcher.shutdown()
+
+
+def test_dispatcher_process_mode_forks():
+    dispatcher = Dispatcher(mode=ExecutionMode.PROCESS, max_workers=1, max_pending=0)
+    try:
+        assert asyncio.run(dispatcher.run(os.getpid)) != os.getpid()
+    finally:
+        dispatcher.shutdown()
+
+
+_value = 1
+
+
+def _get_value() -> int:
+    return _value
+
+
+def test_dispatcher_restart():
+    global _value
+    dispatcher = Dispatcher(mode=ExecutionMode.PROCESS, max_workers=1, max_pending=0)
+    dispatcher.start()
+    try:
+        assert asyncio.run(dispatcher.run(_get_value)) == 1
+        # New worker processes are forked with the changed global.
+        _value = 2
+        dispatcher.restart()
+        assert asyncio.run(dispatcher.run(_get_value)) == 2
+    finally:
+        _value = 1
+        dispatcher.shutdown()
+
+
+def test_dispatcher_saturated():
+    dispatcher = Dispatcher(mode=ExecutionMode.THREAD, max_workers=1, max_pending=1)
+    release = threading.Event()
+
+    async def run_all():
+        blocked = [asyncio.ensure_future(dispatcher.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        assert dispatcher.pending == 2
+        with pytest.raises(DispatcherSaturatedError):
+            await dispatcher.run(_square, 2)
+        release.set()
+        await asyncio.gather(*blocked)
+
+    try:
+        asyncio.run(run_all())
+    finally:
+        dispatcher.shutdown()
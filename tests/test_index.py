@@ -0,0 +1,100 @@
+import os
+import pathlib
+
+from dotty.core import Assembly, Driver
+from dotty.index import (
+    GeneIndex,
+    GeneInfo,
+    build_gene_index,
+    build_hgnc_index,
+    build_region_index,
+    find_transcripts_in_region,
+    hgnc_index_file_name,
+    load_hgnc_index,
+    load_or_build_hgnc_index,
+)
+
+
+def test_build_hgnc_index(synthetic_driver: Driver):
+    assert {assembly: build_hgnc_index(synthetic_driver, assembly) for assembly in Assembly} == {
+        assembly: {"HGNC:1001": ["NM_000001.1"], "HGNC:1002": ["ENST00000000003.1"]}
+        for assembly in Assembly
+    }
+
+
+def test_load_or_build_hgnc_index(synthetic_driver: Driver, tmp_path: pathlib.Path):
+    driver = Driver(str(tmp_path), synthetic_driver.data_version)
+    driver.data_providers = synthetic_driver.data_providers
+    driver.data_paths = {assembly: [] for assembly in Assembly}
+    path = tmp_path / hgnc_index_file_name(driver.data_version, Assembly.GRCH38)
+
+    index = load_or_build_hgnc_index(driver, Assembly.GRCH38)
+    assert load_hgnc_index(path, driver.data_version) == index
+    assert load_hgnc_index(path, "0.0.0") is None
+
+    # The saved index is used as long as it is newer than the data files.
+    path.write_text('{"format": 1, "data_version": "%s", "index": {}}' % driver.data_version)
+    assert load_or_build_hgnc_index(driver, Assembly.GRCH38) == {}
+    (tmp_path / "data.json").write_text("{}")
+    driver.data_paths[Assembly.GRCH38] = [tmp_path / "data.json"]
+    os.utime(path, (0, 0))
+    assert load_or_build_hgnc_index(driver, Assembly.GRCH38) == index
+
+
+def test_find_transcripts_in_region(synthetic_driver: Driver):
+    build_region_index(synthetic_driver, Assembly.GRCH38)
+    data_provider = synthetic_driver.data_providers[Assembly.GRCH38]
+    contig = "NC_000017.11"
+    assert find_transcripts_in_region(data_provider, contig, 0, 200_000) == [
+        "NM_000001.1",
+        "NR_000002.1",
+        "ENST00000000003.1",
+    ]
+    assert find_transcripts_in_region(data_provider, contig, 102_500, 102_600) == [
+        "NM_000001.1",
+        "NR_000002.1",
+    ]
+    assert find_transcripts_in_region(data_provider, contig, 102_100, 102_200, exonic=True) == [
+        "NM_000001.1"
+    ]
+    assert find_transcripts_in_region(data_provider, contig, 106_200, 107_000) == []
+    assert find_transcripts_in_region(data_provider, "NC_000013.11", 0, 200_000) == []
+
+
+def test_build_gene_index(synthetic_driver: Driver):
+    index = build_gene_index(synthetic_driver, build_hgnc_index(synthetic_driver, Assembly.GRCH38))
+    assert index.genes == {
+        "HGNC:1001": GeneInfo("HGNC:1001", "GENE1", ("GN1", "GENEONE"), "synthetic gene 1"),
+        "HGNC:1002": GeneInfo("HGNC:1002", "GENE2", (), "synthetic gene 2"),
+    }
+
+
+def test_gene_index_search():
+    index = GeneIndex(
+        [
+            GeneInfo("HGNC:1100", "BRCA1", ("RNF53", "BRCC1")),
+            GeneInfo("HGNC:1101", "BRCA2", ("FANCD1", "BRCC2")),
+            GeneInfo("HGNC:20473", "BRCC3", ("BRCA1",)),
+        ]
+    )
+    # Symbols come before aliases of the same name.
+    assert index.search("brca1") == [
+        (index.genes["HGNC:1100"], "BRCA1"),
+        (index.genes["HGNC:20473"], "BRCA1"),
+    ]
+    assert index.lookup("fancd1") == "HGNC:1101"
+    assert index.lookup("HGNC:1100") == "HGNC:1100"
+    assert index.lookup("BRC") is None
+    assert [(info.symbol, name) for info, name in index.search("BRC", prefix=True)] == [
+        ("BRCA1", "BRCA1"),
+        ("BRCC3", "BRCA1"),
+        ("BRCA2", "BRCA2"),
+    ]
+    assert [info.symbol for info, _ in index.search("brcc", prefix=True, limit=2)] == [
+        "BRCA1",
+        "BRCA2",
+    ]
+    assert index.search("HGNC:110", prefix=True, limit=1) == [
+        (index.genes["HGNC:1100"], "HGNC:1100")
+    ]
+    assert index.search("XYZ", prefix=True) == []
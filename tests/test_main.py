@@ -1,14 +1,24 @@
+import asyncio
 import json
+import pathlib
+import threading
+import time
 import typing
 from unittest.mock import Mock
 
 import hgvs.exceptions
+import pytest
 from _pytest.monkeypatch import MonkeyPatch
+from fastapi import HTTPException
 from fastapi.testclient import TestClient
 from pytest_snapshot.plugin import Snapshot
 
 from dotty import main as dotty_main
-from dotty.core import Assembly
+from dotty.cache import PersistentCache
+from dotty.config import settings
+from dotty.core import Assembly, Driver
+from dotty.executor import Dispatcher, ExecutionMode
+from dotty.index import GeneIndex, GeneInfo
 
 
 def _setup_mock_driver(var_type: str, parsed_var_ac: str) -> Mock:
@@ -41,35 +51,37 @@ def _setup_mock_driver(var_type: str, parsed_var_ac: str) -> Mock:
     mock_driver.parser = Mock()
     mock_driver.parser.parse = Mock()
     mock_driver.parser.parse.return_value = parsed_var
+    mock_driver.projectors = {}
 
     return mock_driver
 
 
-def _setup_mock_transcript_data() -> typing.Dict[Assembly, typing.Any]:
-    hgnc_to_transcripts_grch37: dict[str, list[typing.Any]] = {}
-    assembly_to_hgnc_to_transcripts_grch37: dict[Assembly, dict[str, list[typing.Any]]] = {}
-
-    transcript_info_grch37 = json.load(open("tests/data/cdot-0.2.21.refseq.grch37.json", "r"))
-    for transcript in transcript_info_grch37["transcripts"].values():
-        hgnc_id = f"HGNC:{transcript['hgnc']}"
-        hgnc_to_transcripts_grch37.setdefault(hgnc_id, []).append(transcript)
-    assembly_to_hgnc_to_transcripts_grch37[Assembly.GRCH37] = hgnc_to_transcripts_grch37
-
-    hgnc_to_transcripts_grch38: dict[str, list[typing.Any]] = {}
-    assembly_to_hgnc_to_transcripts_grch38: dict[Assembly, dict[str, list[typing.Any]]] = {}
-
-    transcript_info_grch38 = json.load(open("tests/data/cdot-0.2.21.refseq.grch38.json", "r"))
-    for transcript in transcript_info_grch38["transcripts"].values():
-        hgnc_id = f"HGNC:{transcript['hgnc']}"
-        hgnc_to_transcripts_grch38.setdefault(hgnc_id, []).append(transcript)
-    assembly_to_hgnc_to_transcripts_grch38[Assembly.GRCH38] = hgnc_to_transcripts_grch38
+def _setup_mock_transcripts(
+    mock_driver: Mock, assembly_to_transcripts: dict[Assembly, list[dict[str, typing.Any]]]
+) -> dict[Assembly, dict[str, list[str]]]:
+    """Set the data providers of ``mock_driver`` to hold the transcripts, return the map from
+    assembly to HGNC ID to transcript accessions."""
+    mock_driver.data_providers = {}
+    assembly_to_hgnc_to_transcripts: dict[Assembly, dict[str, list[str]]] = {}
+    for assembly, transcripts in assembly_to_transcripts.items():
+        mock_driver.data_providers[assembly] = Mock(transcripts={t["id"]: t for t in transcripts})
+        hgnc_to_transcripts = assembly_to_hgnc_to_transcripts.setdefault(assembly, {})
+        for transcript in transcripts:
+            hgnc_id = f"HGNC:{transcript['hgnc']}"
+            hgnc_to_transcripts.setdefault(hgnc_id, []).append(transcript["id"])
+    return assembly_to_hgnc_to_transcripts
 
-    assembly_to_hgnc_to_transcripts = {
-        **assembly_to_hgnc_to_transcripts_grch37,
-        **assembly_to_hgnc_to_transcripts_grch38,
-    }
 
-    return assembly_to_hgnc_to_transcripts
+def _setup_mock_transcript_data(mock_driver: Mock) -> dict[Assembly, dict[str, list[str]]]:
+    assembly_to_transcripts = {}
+    for assembly in Assembly:
+        with open(f"tests/data/cdot-0.2.21.refseq.{assembly.value.lower()}.json", "r") as inputf:
+            transcript_info = json.load(inputf)
+        assembly_to_transcripts[assembly] = [
+            {"id": tx_ac, **transcript}
+            for tx_ac, transcript in transcript_info["transcripts"].items()
+        ]
+    return _setup_mock_transcripts(mock_driver, assembly_to_transcripts)
 
 
 def test_lifespan(monkeypatch: MonkeyPatch):
@@ -173,9 +185,10 @@ def test_to_spdi_invalid(test_client: TestClient, monkeypatch: MonkeyPatch):
 def test_find_transcripts_grch37(
     test_client: TestClient, monkeypatch: MonkeyPatch, snapshot: Snapshot
 ):
-    monkeypatch.setattr(dotty_main, "driver", _setup_mock_driver("g", "NC_000017.11"))
+    mock_driver = _setup_mock_driver("g", "NC_000017.11")
+    monkeypatch.setattr(dotty_main, "driver", mock_driver)
     monkeypatch.setattr(
-        dotty_main, "assembly_to_hgnc_to_transcripts", _setup_mock_transcript_data()
+        dotty_main, "assembly_to_hgnc_to_transcripts", _setup_mock_transcript_data(mock_driver)
     )
     response = test_client.get("/api/v1/find-transcripts?hgnc_id=HGNC:1100&assembly=GRCh37")
     assert response.status_code == 200
@@ -186,11 +199,738 @@ def test_find_transcripts_grch37(
 def test_find_transcripts_grch38(
     test_client: TestClient, monkeypatch: MonkeyPatch, snapshot: Snapshot
 ):
-    monkeypatch.setattr(dotty_main, "driver", _setup_mock_driver("g", "NC_000017.11"))
+    mock_driver = _setup_mock_driver("g", "NC_000017.11")
+    monkeypatch.setattr(dotty_main, "driver", mock_driver)
     monkeypatch.setattr(
-        dotty_main, "assembly_to_hgnc_to_transcripts", _setup_mock_transcript_data()
+        dotty_main, "assembly_to_hgnc_to_transcripts", _setup_mock_transcript_data(mock_driver)
     )
     response = test_client.get("/api/v1/find-transcripts?hgnc_id=HGNC:1100&assembly=GRCh38")
     assert response.status_code == 200
 
     snapshot.assert_match(json.dumps(response.json(), indent=2), "response.json")
+
+
+def test_to_spdi_batch(test_client: TestClient, monkeypatch: MonkeyPatch):
+    mock_driver = _setup_mock_driver("c", "NM_000059.3")
+    parsed_var = mock_driver.parser.parse.return_value
+
+    def parse(q: str):
+        if q == "BRCA1":
+            raise hgvs.exceptions.HGVSParseError("invalid")
+        elif q == "NM_000059.3:c.275G>A":
+            raise hgvs.exceptions.HGVSDataNotAvailableError("no data")
+        return parsed_var
+
+    mock_driver.parser.parse.side_effect = parse
+    monkeypatch.setattr(dotty_main, "driver", mock_driver)
+
+    response = test_client.post(
+        "/api/v1/to-spdi/batch",
+        json=[
+            {"q": "NM_000059.3:c.274G>A"},
+            {"q": "BRCA1", "assembly": "GRCh37"},
+            {"q": "NM_000059.3:c.275G>A"},
+        ],
+    )
+    assert response.status_code == 200
+    expected = {
+        "results": [
+            {
+                "message": None,
+                "success": True,
+                "value": {
+                    "alternate_inserted": "C",
+                    "contig": "chr1",
+                    "pos": 100,
+                    "reference_deleted": "A",
+                    "assembly": "GRCh38",
+                },
+            },
+            {"message": "Problem parsing HGVS: invalid", "success": False, "value": None},
+            {"message": "Problem resolving HGVS: no data", "success": False, "value": None},
+        ]
+    }
+    assert response.json() == expected
+
+
+def test_to_spdi_batch_too_large(test_client: TestClient, monkeypatch: MonkeyPatch):
+    monkeypatch.setattr(settings, "MAX_BATCH_SIZE", 1)
+    response = test_client.post(
+        "/api/v1/to-spdi/batch",
+        json=[{"q": "NM_000059.3:c.274G>A"}, {"q": "NM_000059.3:c.275G>A"}],
+    )
+    assert response.status_code == 413
+
+
+def test_to_spdi_saturated(test_client: TestClient, monkeypatch: MonkeyPatch):
+    monkeypatch.setattr(dotty_main, "driver", _setup_mock_driver("c", "NC_000017.10"))
+    monkeypatch.setattr(
+        dotty_main,
+        "dispatcher",
+        Dispatcher(mode=ExecutionMode.THREAD, max_workers=0, max_pending=0),
+    )
+    response = test_client.get("/api/v1/to-spdi?q=NM_000059.3:c.274G>A")
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_to_spdi_cached(test_client: TestClient, monkeypatch: MonkeyPatch):
+    mock_driver = _setup_mock_driver("c", "NC_000017.10")
+    monkeypatch.setattr(dotty_main, "driver", mock_driver)
+    for _ in range(2):
+        response = test_client.get("/api/v1/to-spdi?q=NM_000059.3:c.274G>A")
+        assert response.status_code == 200
+        assert response.json()["success"]
+    response = test_client.post("/api/v1/to-spdi/batch", json=[{"q": " NM_000059.3:c.274G>A"}])
+    assert response.json()["results"][0]["success"]
+    assert mock_driver.parser.parse.call_count == 1
+
+    response = test_client.get("/api/v1/stats")
+    assert response.status_code == 200
+    assert response.json() == {
+        "result_cache": {"size": 1, "max_size": 100_000, "hits": 2, "misses": 1}
+    }
+
+
+def test_to_spdi_invalid_cached(test_client: TestClient, monkeypatch: MonkeyPatch):
+    mock_driver = Mock()
+    mock_driver.parser.parse.side_effect = hgvs.exceptions.HGVSParseError
+    monkeypatch.setattr(dotty_main, "driver", mock_driver)
+    for _ in range(2):
+        response = test_client.get("/api/v1/to-spdi?q=BRCA1")
+        assert not response.json()["success"]
+    assert mock_driver.parser.parse.call_count == 1
+
+
+def test_to_spdi_swapped_in_flight(monkeypatch: MonkeyPatch):
+    """Requests in flight finish on the data they started with when new data is swapped in."""
+    old_driver = _setup_mock_driver("c", "NC_000017.10")
+    old_driver.data_version = "0.2.21"
+    new_driver = _setup_mock_driver("c", "NC_000017.10")
+    new_driver.data_version = "0.2.22"
+    monkeypatch.setattr(dotty_main, "driver", old_driver)
+    monkeypatch.setattr(
+        dotty_main, "dispatcher", Dispatcher(ExecutionMode.INLINE, max_workers=1, max_pending=0)
+    )
+    monkeypatch.setattr(settings, "MAX_DATA_VERSIONS", 1)
+
+    async def resolve() -> dotty_main.SpdiResult:
+        request = asyncio.ensure_future(dotty_main.to_spdi("NM_000059.3:c.274G>A"))
+        await asyncio.sleep(0)  # the request waits for its computation
+        monkeypatch.setattr(dotty_main, "driver", new_driver)
+        return await request
+
+    assert asyncio.run(resolve()).success
+    assert old_driver.parser.parse.call_count == 1
+    assert new_driver.parser.parse.call_count == 0
+    assert list(dotty_main.result_cache._entries)[0][2] == "0.2.21"
+
+
+def test_to_spdi_coalesced(monkeypatch: MonkeyPatch):
+    """Concurrent identical requests are resolved once."""
+    mock_driver = _setup_mock_driver("c", "NC_000017.10")
+    monkeypatch.setattr(dotty_main, "driver", mock_driver)
+    monkeypatch.setattr(
+        dotty_main, "dispatcher", Dispatcher(ExecutionMode.THREAD, max_workers=2, max_pending=2)
+    )
+
+    async def resolve() -> list[dotty_main.SpdiResult]:
+        queries = ["NM_000059.3:c.274G>A"] * 3 + ["NM_000059.3:c.275G>A"]
+        return await asyncio.gather(*(dotty_main.to_spdi(q) for q in queries))
+
+    results = asyncio.run(resolve())
+    assert all(result.success for result in results)
+    assert mock_driver.parser.parse.call_count == 2
+    assert dotty_main.spdi_flights.coalesced == 2
+    assert len(dotty_main.spdi_flights) == 0
+    dotty_main.dispatcher.shutdown()
+
+
+def test_find_transcripts_coalesced(monkeypatch: MonkeyPatch):
+    """Concurrent identical requests build the response once, off the event loop."""
+    mock_driver = Mock()
+    monkeypatch.setattr(dotty_main, "driver", mock_driver)
+    monkeypatch.setattr(
+        dotty_main,
+        "assembly_to_hgnc_to_transcripts",
+        _setup_mock_transcripts(
+            mock_driver,
+            {Assembly.GRCH38: [{"id": "NR_000002.1", "hgnc": "1001", "genome_builds": {}}]},
+        ),
+    )
+    threads = set()
+    build = dotty_main._build_transcripts_response
+
+    def build_in_thread(*args) -> dotty_main.SerializedResponse:
+        threads.add(threading.get_ident())
+        return build(*args)
+
+    monkeypatch.setattr(dotty_main, "_build_transcripts_response", build_in_thread)
+
+    async def find() -> list:
+        request = Mock(headers={})
+        return await asyncio.gather(
+            *(dotty_main.find_transcripts(request, hgnc_id="HGNC:1001") for _ in range(3))
+        )
+
+    assert len({response.body for response in asyncio.run(find())}) == 1
+    assert dotty_main.transcript_flights.calls == 1
+    assert dotty_main.transcript_flights.coalesced == 2
+    assert threading.get_ident() not in threads
+    assert len(dotty_main.transcript_responses) == 1
+
+
+def test_to_spdi_persistent_cache(
+    test_client: TestClient, monkeypatch: MonkeyPatch, tmp_path: pathlib.Path
+):
+    mock_driver = _setup_mock_driver("c", "NC_000017.10")
+    mock_driver.data_version = settings.DATA_VERSION
+    monkeypatch.setattr(dotty_main, "driver", mock_driver)
+    cache = PersistentCache(str(tmp_path / "cache.sqlite"))
+    monkeypatch.setattr(dotty_main, "persistent_cache", cache)
+
+    response = test_client.get("/api/v1/to-spdi?q=NM_000059.3:c.274G>A")
+    assert response.json()["success"]
+    assert len(cache) == 1
+    # After a restart, the results are read from the persistent cache.
+    dotty_main.result_cache.clear()
+    assert test_client.get("/api/v1/to-spdi?q=NM_000059.3:c.274G>A").json() == response.json()
+    response = test_client.post(
+        "/api/v1/to-spdi/batch",
+        json=[{"q": "NM_000059.3:c.274G>A"}, {"q": "NM_000059.3:c.275G>A"}],
+    )
+    assert [result["success"] for result in response.json()["results"]] == [True, True]
+    assert mock_driver.parser.parse.call_count == 2
+    assert len(cache) == 2
+
+    response = test_client.get("/api/v1/stats")
+    assert response.json()["persistent_cache"] == {
+        "size": 2,
+        "size_bytes": cache.size(),
+        "max_size_bytes": 0,
+        "hits": 1,
+        "misses": 2,
+    }
+
+
+def test_warm_cache(test_client: TestClient, monkeypatch: MonkeyPatch, tmp_path: pathlib.Path):
+    mock_driver = _setup_mock_driver("c", "NC_000017.10")
+    parsed_var = mock_driver.parser.parse.return_value
+
+    def parse(q: str):
+        if q == "BRCA1":
+            raise hgvs.exceptions.HGVSParseError("invalid")
+        return parsed_var
+
+    mock_driver.parser.parse.side_effect = parse
+    mock_driver.data_version = settings.DATA_VERSION
+    monkeypatch.setattr(dotty_main, "driver", mock_driver)
+    cache = PersistentCache(str(tmp_path / "cache.sqlite"))
+    monkeypatch.setattr(dotty_main, "persistent_cache", cache)
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "secret")
+    monkeypatch.setattr(settings, "MAX_BATCH_SIZE", 2)
+
+    response = test_client.post(
+        "/api/v1/admin/warm-cache",
+        content=b"NM_000059.3:c.274G>A\nBRCA1\n\nNM_000059.3:c.275G>A\n",
+        headers={"Authorization": "Bearer secret"},
+    )
+    assert response.status_code == 200
+    assert response.json() == {"variants": 3, "failed": 1}
+    monkeypatch.setattr(settings, "MAX_LINE_LENGTH", 30)
+    response = test_client.post(
+        "/api/v1/admin/warm-cache",
+        content=b"A" * 40,
+        headers={"Authorization": "Bearer secret"},
+    )
+    assert response.status_code == 413
+    assert len(cache) == 3
+    dotty_main.result_cache.clear()
+    assert test_client.get("/api/v1/to-spdi?q=NM_000059.3:c.275G>A").json()["success"]
+    assert mock_driver.parser.parse.call_count == 3
+
+
+@pytest.mark.parametrize(
+    "accept_encoding,expected",
+    [
+        ("gzip", True),
+        ("deflate, gzip;q=0.5", True),
+        ("GZIP; q=1.0", True),
+        ("*", True),
+        ("", False),
+        ("identity", False),
+        ("gzip;q=0", False),
+        ("gzip;q=0.000, deflate", False),
+        ("*;q=0.1, gzip;q=0", False),
+        ("gzip;q=invalid", False),
+    ],
+)
+def test_accepts_gzip(accept_encoding: str, expected: bool):
+    assert dotty_main._accepts_gzip(accept_encoding) == expected
+
+
+def test_find_transcripts_cached(test_client: TestClient, monkeypatch: MonkeyPatch):
+    transcript = {
+        "id": "NM_000001.1",
+        "hgnc": "1001",
+        "gene_name": "GENE1",
+        "genome_builds": {
+            "GRCh38": {
+                "contig": "NC_000017.11",
+                "cds_start": 1050,
+                "cds_end": 3050,
+                "exons": [[1000, 3100, 0, 1, 2100, None]],
+            }
+        },
+    }
+    mock_driver = Mock()
+    monkeypatch.setattr(dotty_main, "driver", mock_driver)
+    assembly_to_hgnc_to_transcripts = _setup_mock_transcripts(
+        mock_driver, {Assembly.GRCH38: [transcript]}
+    )
+    monkeypatch.setattr(
+        dotty_main, "assembly_to_hgnc_to_transcripts", assembly_to_hgnc_to_transcripts
+    )
+
+    response = test_client.get("/api/v1/find-transcripts?hgnc_id=HGNC:1001")
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.json()["transcripts"][0]["id"] == "NM_000001.1"
+    etag = response.headers["ETag"]
+
+    # Served from the cache, even if the underlying data is gone.
+    assembly_to_hgnc_to_transcripts[Assembly.GRCH38].clear()
+    response = test_client.get(
+        "/api/v1/find-transcripts?hgnc_id=HGNC:1001", headers={"Accept-Encoding": "identity"}
+    )
+    assert response.status_code == 200
+    assert "Content-Encoding" not in response.headers
+    assert response.json()["transcripts"][0]["id"] == "NM_000001.1"
+    response = test_client.get(
+        "/api/v1/find-transcripts?hgnc_id=HGNC:1001", headers={"Accept-Encoding": "gzip;q=0"}
+    )
+    assert "Content-Encoding" not in response.headers
+
+    response = test_client.get(
+        "/api/v1/find-transcripts?hgnc_id=HGNC:1001", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+
+    response = test_client.get("/api/v1/find-transcripts?hgnc_id=HGNC:1002")
+    assert response.status_code == 404
+
+
+@pytest.mark.parametrize(
+    "chunks",
+    [
+        [b"a\r\n\n  b c \nd"],
+        [b"a", b"\r\n", b"\n  b", b" ", b"c \nd"],
+        [b"a\r\n\n  b c \n", b"d", b""],
+    ],
+)
+def test_iter_lines(chunks: list[bytes], monkeypatch: MonkeyPatch):
+    async def stream() -> typing.AsyncIterator[bytes]:
+        for chunk in chunks:
+            yield chunk
+
+    async def collect() -> list[str]:
+        return [line async for line in dotty_main._iter_lines(stream())]
+
+    assert asyncio.run(collect()) == ["a", "b c", "d"]
+    # Lines are limited in length, also across chunks.
+    monkeypatch.setattr(settings, "MAX_LINE_LENGTH", 4)
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(collect())
+    assert exc_info.value.status_code == 413
+
+
+def test_to_spdi_stream(test_client: TestClient, monkeypatch: MonkeyPatch):
+    mock_driver = _setup_mock_driver("c", "NC_000017.10")
+    parsed_var = mock_driver.parser.parse.return_value
+
+    def parse(q: str):
+        if q == "BRCA1":
+            raise hgvs.exceptions.HGVSParseError("invalid")
+        return parsed_var
+
+    mock_driver.parser.parse.side_effect = parse
+    monkeypatch.setattr(dotty_main, "driver", mock_driver)
+    monkeypatch.setattr(settings, "STREAM_CHUNK_SIZE", 2)
+    monkeypatch.setattr(settings, "STREAM_MAX_IN_FLIGHT", 1)
+
+    def body() -> typing.Iterator[bytes]:
+        yield b"NM_000059.3:c.274G>A\nBRCA1\n\nNM_000059.3:"
+        yield b"c.275G>A\nBRCA1"
+
+    response = test_client.post("/api/v1/to-spdi/stream", content=body())
+    assert response.status_code == 200
+    assert response.headers["Content-Type"] == "application/x-ndjson"
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert [result["success"] for result in results] == [True, False, True, False]
+    assert results[1] == {
+        "message": "Problem parsing HGVS: invalid",
+        "success": False,
+        "value": None,
+    }
+    assert results[2]["value"]["assembly"] == "GRCh38"
+
+    # An overlong line ends the response after the results of the lines before.
+    monkeypatch.setattr(settings, "MAX_LINE_LENGTH", 30)
+    response = test_client.post(
+        "/api/v1/to-spdi/stream", content=b"NM_000059.3:c.274G>A\n" + b"A" * 40
+    )
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert [result["success"] for result in results] == [True, False]
+    assert results[1]["message"] == "Line longer than 30 bytes"
+
+
+def test_find_transcripts_by_region(
+    test_client: TestClient, monkeypatch: MonkeyPatch, synthetic_driver: Driver
+):
+    monkeypatch.setattr(dotty_main, "driver", synthetic_driver)
+
+    response = test_client.get(
+        "/api/v1/find-transcripts-by-region?contig=chr17&start=101001&end=106000"
+    )
+    assert response.status_code == 200
+    # The non-coding transcript is skipped, as in find-transcripts.
+    assert [t["id"] for t in response.json()["transcripts"]] == [
+        "NM_000001.1",
+        "ENST00000000003.1",
+    ]
+    response = test_client.get(
+        "/api/v1/find-transcripts-by-region?contig=17&start=1&end=1000&assembly=GRCh37"
+    )
+    assert [t["id"] for t in response.json()["transcripts"]] == []
+    response = test_client.get(
+        "/api/v1/find-transcripts-by-region?contig=17&start=1001&end=1001&assembly=GRCh37"
+    )
+    assert [t["id"] for t in response.json()["transcripts"]] == ["NM_000001.1"]
+    response = test_client.get(
+        "/api/v1/find-transcripts-by-region"
+        "?contig=NC_000017.11&start=101101&end=101200&exonic=true"
+    )
+    assert response.json()["transcripts"] == []
+
+    response = test_client.get("/api/v1/find-transcripts-by-region?contig=chrZ&start=1&end=2")
+    assert response.status_code == 400
+    response = test_client.get("/api/v1/find-transcripts-by-region?contig=17&start=2&end=1")
+    assert response.status_code == 400
+
+
+def test_to_hgvs(
+    test_client: TestClient,
+    monkeypatch: MonkeyPatch,
+    synthetic_driver: Driver,
+    mock_seqrepo_fetching: None,
+):
+    monkeypatch.setattr(dotty_main, "driver", synthetic_driver)
+
+    response = test_client.get("/api/v1/to-hgvs?contig=chr17&pos=101051&ref=A&alt=G")
+    assert response.status_code == 200
+    assert response.json() == {
+        "success": True,
+        "value": [
+            {
+                "transcript": "NM_000001.1",
+                "hgnc_id": "HGNC:1001",
+                "hgnc_symbol": "GENE1",
+                "hgvs": "NM_000001.1:c.1A>G",
+                "message": None,
+            },
+            {
+                "transcript": "NR_000002.1",
+                "hgnc_id": "HGNC:1001",
+                "hgnc_symbol": "GENE1",
+                "hgvs": "NR_000002.1:n.51A>G",
+                "message": None,
+            },
+        ],
+        "message": None,
+    }
+
+    response = test_client.get("/api/v1/to-hgvs?contig=chr17&pos=101051&ref=A&alt=Q")
+    assert response.status_code == 422
+
+
+def test_to_hgvs_batch(
+    test_client: TestClient,
+    monkeypatch: MonkeyPatch,
+    synthetic_driver: Driver,
+    mock_seqrepo_fetching: None,
+):
+    monkeypatch.setattr(dotty_main, "driver", synthetic_driver)
+
+    response = test_client.post(
+        "/api/v1/to-hgvs/batch",
+        json=[
+            # Deletion in the last exon, with anchor base.
+            {"assembly": "GRCh37", "contig": "17", "pos": 3049, "ref": "NA", "alt": "N"},
+            {"contig": "chrZ", "pos": 1, "ref": "A", "alt": "G"},
+            {"contig": "chr17", "pos": 1, "ref": "A", "alt": "G"},
+        ],
+    )
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [tx["hgvs"] for tx in results[0]["value"]] == [
+        "NM_000001.1:c.300del",
+        "NR_000002.1:n.150del",
+    ]
+    assert results[1] == {"success": False, "value": [], "message": "Unknown contig chrZ on GRCh38"}
+    assert results[2] == {"success": True, "value": [], "message": None}
+
+
+def test_metrics(test_client: TestClient, monkeypatch: MonkeyPatch):
+    monkeypatch.setattr(dotty_main, "driver", _setup_mock_driver("c", "NM_000001.1"))
+
+    response = test_client.get("/api/v1/to-spdi?q=NM_000001.1:c.1A>G")
+    assert response.status_code == 200
+    test_client.get("/api/v1/to-spdi?q=NM_000001.1:c.1A>G")
+
+    response = test_client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    lines = response.text.splitlines()
+    assert "# TYPE dotty_stage_duration_seconds histogram" in lines
+    for stage in ("parse", "c_to_g", "g_to_vcf"):
+        labels = f'stage="{stage}",assembly="GRCh38",variant_type="c"'
+        assert any(
+            line.startswith(f"dotty_stage_duration_seconds_count{{{labels}}} ") for line in lines
+        )
+    assert any(
+        line.startswith(
+            'dotty_request_duration_seconds_count{endpoint="/api/v1/to-spdi",method="GET",'
+            'status="200"} '
+        )
+        for line in lines
+    )
+    assert 'dotty_cache_hits_total{cache="result"} 1' in lines
+    assert 'dotty_cache_misses_total{cache="result"} 1' in lines
+    assert 'dotty_cache_entries{cache="result"} 1' in lines
+    assert "dotty_dispatcher_pending 0" in lines
+
+
+def test_reload(
+    monkeypatch: MonkeyPatch,
+    synthetic_driver: Driver,
+    two_versions_data_dir: pathlib.Path,
+    settings_no_seqrepo: None,
+):
+    monkeypatch.setattr(settings, "DATA_DIR", str(two_versions_data_dir))
+    monkeypatch.setattr(dotty_main, "data_loaded", True)
+    for name in ("hgnc_to_transcripts", "assembly_to_hgnc_to_transcripts"):
+        monkeypatch.setattr(dotty_main, name, {})
+    monkeypatch.setattr(dotty_main, "driver", synthetic_driver)
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", None)
+    headers = {"Authorization": "Bearer secret"}
+
+    with TestClient(dotty_main.app) as client:
+        assert client.get("/api/v1/admin/reload", headers=headers).status_code == 403
+        monkeypatch.setattr(settings, "ADMIN_TOKEN", "secret")
+        response = client.get("/api/v1/admin/reload", headers={"Authorization": "Bearer wrong"})
+        assert response.status_code == 401
+        response = client.post("/api/v1/admin/reload?data_version=0.2.98", headers=headers)
+        assert response.status_code == 404
+
+        dotty_main.result_cache.put(("q", Assembly.GRCH38, "0.2.21", False), Mock())
+        response = client.post("/api/v1/admin/reload?data_version=0.2.99", headers=headers)
+        assert response.status_code == 202
+        assert response.json() == {
+            "data_version": settings.DATA_VERSION,
+            "loading_version": "0.2.99",
+            "message": None,
+        }
+        deadline = time.time() + 60
+        while response.json()["loading_version"] is not None:
+            assert time.time() < deadline
+            time.sleep(0.1)
+            response = client.get("/api/v1/admin/reload", headers=headers)
+        assert response.json() == {
+            "data_version": "0.2.99",
+            "loading_version": None,
+            "message": None,
+        }
+        assert len(dotty_main.result_cache) == 0
+
+        response = client.get("/api/v1/find-transcripts?hgnc_id=HGNC:1002")
+        assert [t["id"] for t in response.json()["transcripts"]] == ["ENST00000000003.1"]
+        response = client.get("/api/v1/find-transcripts?hgnc_id=HGNC:1001")
+        assert response.status_code == 404
+
+
+def _wait_until_ready(client: TestClient, assembly: Assembly):
+    """Wait until ``assembly`` is served."""
+    deadline = time.time() + 60
+    while client.get("/health/ready").json()["assemblies"][assembly.value] != "ready":
+        assert time.time() < deadline
+        time.sleep(0.05)
+
+
+def test_background_loading(
+    monkeypatch: MonkeyPatch, two_versions_data_dir: pathlib.Path, settings_no_seqrepo: None
+):
+    monkeypatch.setattr(settings, "DATA_DIR", str(two_versions_data_dir))
+    monkeypatch.setattr(settings, "SERVE_ASSEMBLIES_EARLY", True)
+    monkeypatch.setattr(dotty_main, "driver", None)
+    monkeypatch.setattr(dotty_main, "data_loaded", False)
+    monkeypatch.setattr(dotty_main, "load_states", {})
+    for name in ("hgnc_to_transcripts", "assembly_to_hgnc_to_transcripts", "served_assemblies"):
+        monkeypatch.setattr(dotty_main, name, getattr(dotty_main, name))
+    # Indexing each assembly waits until it is released.
+    released = {assembly: threading.Event() for assembly in Assembly}
+    index_assembly = dotty_main._index_assembly
+
+    def _index_assembly(driver: Driver, assembly: Assembly):
+        released[assembly].wait(60)
+        return index_assembly(driver, assembly)
+
+    monkeypatch.setattr(dotty_main, "_index_assembly", _index_assembly)
+    url = "/api/v1/find-transcripts-by-region?contig=chr17&start=101001&end=106000"
+
+    with TestClient(dotty_main.app) as client:
+        assert client.get("/health/live").json() == {"status": "ok", "message": None}
+        response = client.get("/health/ready")
+        assert response.status_code == 503
+        assert response.json()["assemblies"]["GRCh37"] == "pending"
+        response = client.get(url)
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == str(dotty_main.LOADING_RETRY_AFTER)
+        assert client.get("/api/v1/find-genes?q=GENE1").status_code == 503
+
+        # GRCh38 is served while GRCh37 is being loaded.
+        released[Assembly.GRCH38].set()
+        _wait_until_ready(client, Assembly.GRCH38)
+        response = client.get("/health/ready")
+        assert response.status_code == 200
+        assert response.json()["assemblies"]["GRCh37"] in ("loading", "indexing")
+        assert client.get(url).status_code == 200
+        assert client.get(f"{url}&assembly=GRCh37").status_code == 503
+
+        released[Assembly.GRCH37].set()
+        _wait_until_ready(client, Assembly.GRCH37)
+        assert client.get(f"{url}&assembly=GRCh37").status_code == 200
+        assert dotty_main.data_loaded
+
+
+def test_background_loading_failed(monkeypatch: MonkeyPatch):
+    monkeypatch.setattr(dotty_main, "data_loaded", False)
+    monkeypatch.setattr(dotty_main, "load_states", {})
+    monkeypatch.setattr(dotty_main, "load_error", None)
+    monkeypatch.setattr(dotty_main, "served_assemblies", dotty_main.served_assemblies)
+    monkeypatch.setattr(dotty_main, "build_data", Mock(side_effect=OSError("missing file")))
+
+    with TestClient(dotty_main.app) as client:
+        deadline = time.time() + 60
+        while client.get("/health/live").status_code == 200:
+            assert time.time() < deadline
+            time.sleep(0.05)
+        response = client.get("/health/ready")
+        assert response.status_code == 503
+        assert response.json() == {
+            "ready": False,
+            "data_version": settings.DATA_VERSION,
+            "assemblies": {"GRCh37": "failed", "GRCh38": "failed"},
+            "message": "Loading the data failed: missing file",
+        }
+
+
+def test_data_versions(
+    test_client: TestClient,
+    monkeypatch: MonkeyPatch,
+    synthetic_driver: Driver,
+    two_versions_data_dir: pathlib.Path,
+    settings_no_seqrepo: None,
+):
+    monkeypatch.setattr(settings, "DATA_DIR", str(two_versions_data_dir))
+    monkeypatch.setattr(dotty_main, "driver", synthetic_driver)
+    url = "/api/v1/find-transcripts-by-region?contig=chr17&start=101001&end=106000"
+
+    # Only the served version is available by default.
+    assert test_client.get(f"{url}&data_version=0.2.99").status_code == 404
+
+    monkeypatch.setattr(settings, "MAX_DATA_VERSIONS", 2)
+    for data_version in ("", f"&data_version={settings.DATA_VERSION}"):
+        response = test_client.get(f"{url}{data_version}")
+        assert [t["id"] for t in response.json()["transcripts"]] == [
+            "NM_000001.1",
+            "ENST00000000003.1",
+        ]
+    assert dotty_main.data_registry.versions() == []
+    response = test_client.get(f"{url}&data_version=0.2.99")
+    assert [t["id"] for t in response.json()["transcripts"]] == ["ENST00000000003.1"]
+    response = test_client.get("/api/v1/find-transcripts?hgnc_id=HGNC:1001&data_version=0.2.99")
+    assert response.status_code == 404
+    response = test_client.get("/api/v1/find-transcripts?hgnc_id=HGNC:1002&data_version=0.2.99")
+    assert [t["id"] for t in response.json()["transcripts"]] == ["ENST00000000003.1"]
+    assert [version for version, _ in dotty_main.data_registry.versions()] == ["0.2.99"]
+    assert ("HGNC:1002", Assembly.GRCH38, "0.2.99") in dotty_main.transcript_responses
+
+    # The transcripts are shared with versions loaded later.
+    data = dotty_main.data_registry.get("0.2.99")
+    tx_ac = data.assembly_to_hgnc_to_transcripts[Assembly.GRCH38]["HGNC:1002"][0]
+    ensembl = data.driver.data_providers[Assembly.GRCH38].transcripts[tx_ac]
+    assert dotty_main.transcript_pool.intern(dict(ensembl)) is ensembl
+
+    for data_version in ("0.2.98", "..%2Fdata"):
+        assert test_client.get(f"{url}&data_version={data_version}").status_code == 404
+
+    # The cached responses of a version go with it.
+    dotty_main.data_registry.clear()
+    assert not dotty_main.transcript_responses
+
+    # Worker processes would load the version each, only the served one is available.
+    monkeypatch.setattr(dotty_main, "forked_worker", True)
+    response = test_client.get(f"{url}&data_version=0.2.99")
+    assert response.status_code == 404
+    assert "worker processes" in response.json()["detail"]
+
+
+def test_find_genes(test_client: TestClient, monkeypatch: MonkeyPatch):
+    gene_index = GeneIndex(
+        [
+            GeneInfo("HGNC:1001", "GENE1", ("GN1", "GENEONE"), "synthetic gene 1"),
+            GeneInfo("HGNC:1002", "GENE2"),
+        ]
+    )
+    monkeypatch.setattr(dotty_main, "gene_index", gene_index)
+
+    response = test_client.get("/api/v1/find-genes?q=gn1")
+    assert response.status_code == 200
+    assert response.json() == {
+        "genes": [
+            {
+                "hgnc_id": "HGNC:1001",
+                "hgnc_symbol": "GENE1",
+                "aliases": ["GN1", "GENEONE"],
+                "description": "synthetic gene 1",
+                "matched": "GN1",
+            }
+        ]
+    }
+    response = test_client.get("/api/v1/find-genes?q=gene&prefix=true")
+    assert [gene["matched"] for gene in response.json()["genes"]] == ["GENE1", "GENE2"]
+    response = test_client.get("/api/v1/find-genes?q=gene&prefix=true&limit=1")
+    assert [gene["matched"] for gene in response.json()["genes"]] == ["GENE1"]
+    assert test_client.get("/api/v1/find-genes?q=gene").json() == {"genes": []}
+    assert test_client.get("/api/v1/find-genes?q=").status_code == 422
+    assert test_client.get("/api/v1/find-genes?q=g&limit=1000").status_code == 422
+
+
+def test_find_transcripts_by_gene(test_client: TestClient, monkeypatch: MonkeyPatch):
+    transcript = {"id": "NR_000002.1", "hgnc": "1001", "gene_name": "GENE1", "genome_builds": {}}
+    mock_driver = Mock()
+    monkeypatch.setattr(dotty_main, "driver", mock_driver)
+    monkeypatch.setattr(
+        dotty_main,
+        "assembly_to_hgnc_to_transcripts",
+        _setup_mock_transcripts(mock_driver, {Assembly.GRCH38: [transcript]}),
+    )
+    monkeypatch.setattr(dotty_main, "gene_index", GeneIndex([GeneInfo("HGNC:1001", "GENE1")]))
+
+    response = test_client.get("/api/v1/find-transcripts?gene=gene1")
+    assert response.status_code == 200
+    assert response.json() == {"transcripts": []}
+    assert test_client.get("/api/v1/find-transcripts?gene=GENE2").status_code == 404
+    assert test_client.get("/api/v1/find-transcripts").status_code == 400
+    response = test_client.get("/api/v1/find-transcripts?gene=GENE1&hgnc_id=HGNC:1001")
+    assert response.status_code == 400
@@ -0,0 +1,40 @@
+from dotty.metrics import CallbackMetric, Gauge, Histogram, Registry
+
+
+def test_histogram():
+    histogram = Histogram("test_seconds", "Test histogram", ("stage",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, "parse")
+    histogram.observe(0.5, "parse")
+    histogram.observe(5, "parse")
+    histogram.observe(0.1, 'a "quoted"\nstage')
+    assert histogram.render().splitlines() == [
+        "# HELP test_seconds Test histogram",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{stage="a \\"quoted\\"\\nstage",le="0.1"} 1',
+        'test_seconds_bucket{stage="a \\"quoted\\"\\nstage",le="1"} 1',
+        'test_seconds_bucket{stage="a \\"quoted\\"\\nstage",le="+Inf"} 1',
+        'test_seconds_sum{stage="a \\"quoted\\"\\nstage"} 0.1',
+        'test_seconds_count{stage="a \\"quoted\\"\\nstage"} 1',
+        'test_seconds_bucket{stage="parse",le="0.1"} 1',
+        'test_seconds_bucket{stage="parse",le="1"} 2',
+        'test_seconds_bucket{stage="parse",le="+Inf"} 3',
+        'test_seconds_sum{stage="parse"} 5.55',
+        'test_seconds_count{stage="parse"} 3',
+    ]
+
+
+def test_registry():
+    registry = Registry()
+    gauge = registry.register(Gauge("test_gauge", "Test gauge", ("stage",)))
+    gauge.set(1.5, "loading")
+    registry.register(
+        CallbackMetric("test_total", "Test counter", "counter", (), lambda: [((), 3)])
+    )
+    assert registry.render() == (
+        "# HELP test_gauge Test gauge\n"
+        "# TYPE test_gauge gauge\n"
+        'test_gauge{stage="loading"} 1.5\n'
+        "# HELP test_total Test counter\n"
+        "# TYPE test_total counter\n"
+        "test_total 3\n"
+    )
@@ -0,0 +1,129 @@
+import random
+
+import hgvs.exceptions
+import pytest
+
+from dotty.core import _shared_parser
+from dotty.parser import FastParser, parse_simple
+
+ACCESSIONS = [
+    "NM_000059.3",
+    "NR_027676.2",
+    "NC_000017.11",
+    "ENST00000000003.1",
+    "NM_000059",
+    "LRG_1",
+    "nm_1.1",
+    "NM_000059.3(BRCA2)",
+    "NM_000059.3(B)",
+    "NM_.1",
+    "1NM_1.1",
+    "NM_1.1.1",
+]
+TYPES = ["c", "n", "g", "m", "r", "p", "x"]
+POSITIONS = [
+    "1",
+    "274",
+    "0",
+    "-12",
+    "*45",
+    "274+5",
+    "274-1",
+    "-12-3",
+    "*45+2",
+    "+5",
+    "*-5",
+    "-*5",
+    "?",
+    "12+",
+    "(12)",
+    "1 ",
+]
+EDITS = [
+    "A>G",
+    "a>g",
+    "N>R",
+    "A>",
+    "AG>T",
+    "X>Y",
+    "del",
+    "delA",
+    "delAGT",
+    "del3",
+    "dup",
+    "dupAG",
+    "insACG",
+    "ins",
+    "delinsAT",
+    "delAinsT",
+    "delins",
+    "=",
+    "G=",
+    "AG=",
+    "inv",
+    "(A>G)",
+    "A>G ",
+]
+
+
+def _random_variants(count: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    variants = []
+    for _ in range(count):
+        interval = rng.choice(POSITIONS)
+        if rng.random() < 0.3:
+            interval += "_" + rng.choice(POSITIONS)
+        variants.append(
+            f"{rng.choice(ACCESSIONS)}:{rng.choice(TYPES)}.{interval}{rng.choice(EDITS)}"
+        )
+    return variants
+
+
+def test_parse_simple_matches_grammar():
+    """Differential test: the fast path accepts a subset of the grammar, with equal results."""
+    parser = _shared_parser().parser
+    fast_count = 0
+    for variant in _random_variants(3000):
+        fast = parse_simple(variant)
+        if fast is None:
+            continue
+        fast_count += 1
+        try:
+            full = parser.parse(variant)
+        except hgvs.exceptions.HGVSParseError:  # pragma: no cover
+            pytest.fail(f"{variant} is invalid but parsed by the fast path")
+        assert fast == full, variant
+        assert repr(fast.posedit) == repr(full.posedit), variant
+        assert str(fast) == str(full), variant
+    # The common forms must take the fast path.
+    assert fast_count > 100
+
+
+@pytest.mark.parametrize(
+    "variant",
+    [
+        "NM_000059.3:c.274G>A",
+        "NM_000059.3(BRCA2):c.274+5G>A",
+        "NM_000059.3:c.-12-3C>T",
+        "NM_000059.3:c.*45del",
+        "NM_000059.3:c.274_276delAGT",
+        "NM_000059.3:c.274dup",
+        "NM_000059.3:c.274_275insACG",
+        "NM_000059.3:c.274delinsAT",
+        "NR_027676.2:n.5765A>G",
+        "NC_000017.11:g.43045712_43045713delinsTT",
+        "NC_000017.11:g.43045712=",
+    ],
+)
+def test_parse_simple_common(variant: str):
+    assert parse_simple(variant) == _shared_parser().parser.parse(variant)
+
+
+def test_fast_parser_fallback():
+    parser = FastParser(_shared_parser().parser)
+    assert parse_simple("NM_000059.3:c.(274)G>A") is None
+    assert parser.parse("NM_000059.3:c.(274)G>A").posedit.pos.uncertain
+    assert str(parser.parse("NP_000050.2:p.Gly92Arg")) == "NP_000050.2:p.Gly92Arg"
+    with pytest.raises(hgvs.exceptions.HGVSParseError):
+        parser.parse("NM_000059.3:c.274G>A ")
+    assert str(parser.parse_c_interval("26+2_57-3")) == "26+2_57-3"
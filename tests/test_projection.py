@@ -0,0 +1,153 @@
+import pathlib
+import random
+import typing
+
+import hgvs.exceptions
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
+from hgvs.assemblymapper import AssemblyMapper
+from hgvs.edit import NARefAlt
+from hgvs.enums import Datum
+from hgvs.location import BaseOffsetInterval, BaseOffsetPosition
+from hgvs.posedit import PosEdit
+from hgvs.sequencevariant import SequenceVariant
+
+from benchmarks import synthetic
+from dotty.config import settings
+from dotty.core import (
+    Assembly,
+    DecodedJSONDataProvider,
+    project_substitutions_to_vcf,
+    project_to_vcf,
+)
+from dotty.projection import Projector
+
+
+def _random_transcript(rng: random.Random, tx_ac: str) -> dict[str, typing.Any]:
+    """Return a random cdot transcript on chr17 of GRCh38, with alignment gaps."""
+    # Genomic start and end, length on the transcript and gap of the exons in genomic order.
+    exons: list[tuple[int, int, int, str | None]] = []
+    alt_start = rng.randint(1_000, 100_000)
+    for _ in range(rng.randint(1, 4)):
+        gap_ops = [f"M{rng.randint(5, 50)}"]
+        for _ in range(rng.randint(0, 2)):
+            gap_ops += [f"{rng.choice('ID')}{rng.randint(1, 3)}", f"M{rng.randint(5, 50)}"]
+        alt_len = sum(int(op[1:]) for op in gap_ops if op[0] in "MD")
+        exon_len = sum(int(op[1:]) for op in gap_ops if op[0] in "MI")
+        gap = " ".join(gap_ops) if len(gap_ops) > 1 else None
+        exons.append((alt_start, alt_start + alt_len, exon_len, gap))
+        alt_start += alt_len + rng.randint(10, 500)
+    strand = rng.choice("+-")
+    cdot_exons = []
+    tx_start = 1
+    for exon_no, (start, end, exon_len, gap) in enumerate(exons if strand == "+" else exons[::-1]):
+        cdot_exons.append([start, end, exon_no, tx_start, tx_start + exon_len - 1, gap])
+        tx_start += exon_len
+    build_data = {"contig": "NC_000017.11", "strand": strand, "exons": sorted(cdot_exons)}
+    transcript: dict[str, typing.Any] = {
+        "id": tx_ac,
+        "gene_name": "GENE",
+        "genome_builds": {"GRCh38": build_data},
+    }
+    if rng.random() < 0.7:
+        transcript["start_codon"] = rng.randint(0, tx_start // 3)
+        transcript["stop_codon"] = rng.randint(transcript["start_codon"] + 1, tx_start - 1)
+    return transcript
+
+
+def test_project_matches_assembly_mapper():
+    """Differential test: the projected positions are those of ``AssemblyMapper``."""
+    rng = random.Random(0)
+    transcripts = {f"NM_{i:06d}.1": _random_transcript(rng, f"NM_{i:06d}.1") for i in range(50)}
+    hdp = DecodedJSONDataProvider(
+        [{"cdot_version": "0.2.21", "genome_builds": ["GRCh38"], "transcripts": transcripts}]
+    )
+    mapper = AssemblyMapper(
+        hdp,
+        assembly_name="GRCh38",
+        alt_aln_method="splign",
+        normalize=False,
+        replace_reference=False,
+        prevalidation_level=None,
+    )
+    projector = Projector(hdp, mapper, cache_size=10)
+
+    variants = []
+    for _ in range(3000):
+        tx_ac = rng.choice([*transcripts, "NM_999999.1"])
+        type_ = rng.choice("cn")
+        datum = Datum.SEQ_START
+        if type_ == "c":
+            datum = rng.choice([Datum.CDS_START, Datum.CDS_END])
+        base = rng.randint(-300, 300) or 1
+        offset = rng.choice([0, 0, rng.randint(-20, 20)])
+        end = BaseOffsetPosition(base + rng.choice([0, 0, 2]), offset, datum=datum)
+        pos = BaseOffsetInterval(BaseOffsetPosition(base, offset, datum=datum), end)
+        posedit = PosEdit(pos=pos, edit=NARefAlt(ref="A", alt="G"))
+        variants.append(SequenceVariant(ac=tx_ac, type=type_, posedit=posedit))
+
+    mapped = 0
+    for variant, projection in zip(variants, projector.project(variants)):
+        try:
+            alignment_mapper = mapper._fetch_AlignmentMapper(variant.ac)
+            if variant.type == "c":
+                pos_g = alignment_mapper.c_to_g(variant.posedit.pos)
+            else:
+                pos_g = alignment_mapper.n_to_g(variant.posedit.pos)
+        except hgvs.exceptions.HGVSError:
+            assert projection is None, variant
+            continue
+        if pos_g.uncertain or pos_g.start.base < 1:
+            # Positions in alignment gaps and before the start of the contig are left to hgvs.
+            assert projection is None, variant
+            continue
+        if projection is None:
+            # hgvs extrapolates ``n.`` positions just outside of the transcript.
+            bases = (variant.posedit.pos.start.base, variant.posedit.pos.end.base)
+            assert variant.type == "n", variant
+            assert not all(1 <= base <= alignment_mapper.tgt_len for base in bases), variant
+            continue
+        mapped += 1
+        assert projection == (
+            alignment_mapper.alt_ac,
+            alignment_mapper.strand,
+            pos_g.start.base,
+            pos_g.end.base,
+        ), variant
+    assert mapped > 300
+
+
+@pytest.mark.parametrize("have_seqrepo", [True, False])
+def test_project_substitutions_to_vcf(
+    tmp_path: pathlib.Path, monkeypatch: MonkeyPatch, have_seqrepo: bool
+):
+    """The vectorized projection of substitutions gives the results of ``project_to_vcf()``."""
+    synthetic.generate(tmp_path, genes=10, variants=10)
+    monkeypatch.setattr(settings, "HAVE_SEQREPO", have_seqrepo)
+    driver = synthetic.SyntheticDriver(str(tmp_path))
+    driver.load()
+
+    rng = random.Random(0)
+    tx_acs = list(driver.data_providers[Assembly.GRCH38].transcripts) + ["NM_999999.1"]
+    queries = ["BRCA1", "NC_000017.11:g.100A>G", f"{tx_acs[0]}:c.1del", f"{tx_acs[0]}:c.1a>G"]
+    for _ in range(500):
+        pos = rng.choice(
+            [str(rng.randint(1, 2000)), f"-{rng.randint(1, 99)}", f"*{rng.randint(1, 99)}"]
+        )
+        if rng.random() < 0.3:
+            pos += f"{rng.choice('+-')}{rng.randint(1, 100)}"
+        ref, alt = rng.choice("ACGTN"), rng.choice("ACGT")
+        queries.append(f"{rng.choice(tx_acs)}:{rng.choice('cn')}.{pos}{ref}>{alt}")
+
+    projected = 0
+    for assembly in Assembly:
+        results = project_substitutions_to_vcf(driver, queries, assembly)
+        assert results[:4] == [None] * 4
+        for q, result in zip(queries, results):
+            if result is not None:
+                projected += 1
+                assert result == project_to_vcf(driver, q, assembly), q
+    assert projected > 200
+
+    driver.projectors = {}
+    assert project_substitutions_to_vcf(driver, queries, Assembly.GRCH38) == [None] * len(queries)
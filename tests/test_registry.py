@@ -0,0 +1,100 @@
+import gc
+import threading
+import time
+
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
+
+from dotty import registry as registry_module
+from dotty.registry import DataRegistry, DataVersionError, TranscriptPool
+from dotty.store import CompactTranscript
+
+
+def test_transcript_pool():
+    pool = TranscriptPool()
+    first = pool.intern({"id": "NM_000001.1", "exons": [[1, 2]]})
+    second = pool.intern({"exons": [[1, 2]], "id": "NM_000001.1"})
+    assert second is first
+    assert pool.intern(first) is first
+    assert pool.intern({"id": "NM_000001.2", "exons": [[1, 2]]}) is not first
+    assert len(pool) == 1  # the other record is not referenced anymore
+
+    del first, second
+    gc.collect()
+    assert len(pool) == 0
+
+
+def test_transcript_pool_compact():
+    pool = TranscriptPool()
+    record = {"id": "NM_000001.1", "genome_builds": {"GRCh38": {"exons": [[1, 2, 0, 1, 1, None]]}}}
+    first = pool.intern(CompactTranscript(record))
+    assert isinstance(first, CompactTranscript)
+    assert pool.intern(CompactTranscript(record)) is first
+    assert pool.intern(record) is first
+
+
+def test_data_registry_lru():
+    loaded = []
+
+    def load(version: str) -> list[str]:
+        if version == "missing":
+            raise DataVersionError(version)
+        loaded.append(version)
+        return [version]
+
+    removed: list[str] = []
+    registry: DataRegistry[list[str]] = DataRegistry(load, max_versions=2, on_remove=removed.append)
+    assert registry.get("a") == ["a"]
+    assert registry.get("a") is registry.get("a")
+    registry.get("b")
+    registry.get("a")  # b is least recently used now
+    registry.get("c")
+    assert [version for version, _ in registry.versions()] == ["a", "c"]
+    assert registry.peek("b") is None
+    assert registry.evictions == 1
+    assert removed == ["b"]
+    with pytest.raises(DataVersionError):
+        registry.get("missing")
+    assert loaded == ["a", "b", "c"]
+
+    assert registry.pop("a") == ["a"]
+    assert registry.pop("a") is None
+    registry.clear()
+    assert removed == ["b", "a", "c"]
+
+
+def test_data_registry_memory_budget(monkeypatch: MonkeyPatch):
+    rss = [0]
+
+    def load(version: str) -> str:
+        rss[0] += 8 * 1024 * 1024
+        return version
+
+    monkeypatch.setattr(registry_module, "_rss", lambda: rss[0])
+    registry: DataRegistry[str] = DataRegistry(
+        load, max_versions=10, memory_budget=12 * 1024 * 1024
+    )
+    registry.get("a")
+    registry.get("b")
+    assert registry.versions() == [("b", 8 * 1024 * 1024)]
+    # The version just loaded is kept even if it exceeds the budget on its own.
+    registry.memory_budget = 1
+    registry.get("c")
+    assert [version for version, _ in registry.versions()] == ["c"]
+
+
+def test_data_registry_loads_once():
+    calls = []
+
+    def load(version: str) -> str:
+        calls.append(version)
+        time.sleep(0.1)
+        return version
+
+    registry: DataRegistry[str] = DataRegistry(load, max_versions=1)
+    threads = [threading.Thread(target=registry.get, args=("a",)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert calls == ["a"]
@@ -0,0 +1,188 @@
+import pathlib
+import random
+import re
+import shutil
+import struct
+from unittest.mock import Mock
+
+import pysam
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
+from bioutils.sequences import reverse_complement
+from hgvs.exceptions import HGVSDataNotAvailableError
+
+from dotty.cache import ResultCache
+from dotty.config import settings
+from dotty.core import Assembly, Driver, project_to_vcf
+from dotty.seqfetcher import CachingSeqFetcher, GenomeSeqFetcher, TwoBitFile, open_genome
+
+#: Sequence of 45 bases.
+SEQ = "ACGTACGTAC" * 4 + "GGGCC"
+
+
+class CountingSeqFetcher:
+    def __init__(self):
+        self.calls: list[tuple[str, int | None, int | None]] = []
+
+    def fetch_seq(self, ac: str, start_i: int | None = None, end_i: int | None = None) -> str:
+        self.calls.append((ac, start_i, end_i))
+        return SEQ[start_i:end_i]
+
+
+@pytest.mark.parametrize(
+    "start_i,end_i", [(0, 45), (3, 7), (9, 11), (8, 30), (38, 45), (40, 60), (60, 70), (5, 5)]
+)
+def test_caching_seq_fetcher(start_i: int, end_i: int):
+    fetcher = CountingSeqFetcher()
+    seq_fetcher = CachingSeqFetcher(fetcher, ResultCache(max_size=100), block_size=8)
+    assert seq_fetcher.fetch_seq("NC_1", start_i, end_i) == SEQ[start_i:end_i]
+    # The second fetch is served from the cache.
+    assert seq_fetcher.fetch_seq("NC_1", start_i, end_i) == SEQ[start_i:end_i]
+    assert len(fetcher.calls) <= 1
+
+
+def test_caching_seq_fetcher_prefetch():
+    fetcher = CountingSeqFetcher()
+    seq_fetcher = CachingSeqFetcher(fetcher, ResultCache(max_size=100), block_size=8, prefetch=1)
+    assert seq_fetcher.fetch_seq("NC_1", 17, 20) == SEQ[17:20]
+    assert fetcher.calls == [("NC_1", 8, 32)]
+    # The neighbouring blocks have been prefetched.
+    assert seq_fetcher.fetch_seq("NC_1", 9, 30) == SEQ[9:30]
+    assert seq_fetcher.fetch_seq("NC_2", 0, 3) == SEQ[0:3]
+    assert fetcher.calls == [("NC_1", 8, 32), ("NC_2", 0, 16)]
+    assert (seq_fetcher.cache.hits, seq_fetcher.cache.misses) == (3, 2)
+    # Whole sequences are not cached.
+    assert seq_fetcher.fetch_seq("NC_1") == SEQ
+    assert fetcher.calls[-1] == ("NC_1", None, None)
+
+
+def write_twobit(path: pathlib.Path, seqs: dict[str, str]):
+    """Write ``seqs`` to a 2bit file, runs of ``N`` are written as N blocks."""
+    header = struct.pack("<IIII", TwoBitFile.SIGNATURE, 0, len(seqs), 0)
+    index_size = sum(1 + len(name) + 4 for name in seqs)
+    index, records = b"", b""
+    for name, seq in seqs.items():
+        index += (
+            struct.pack("<B", len(name))
+            + name.encode()
+            + struct.pack("<I", len(header) + index_size + len(records))
+        )
+        n_blocks = [(m.start(), m.end() - m.start()) for m in re.finditer("N+", seq)]
+        record = struct.pack("<II", len(seq), len(n_blocks))
+        record += b"".join(struct.pack("<I", start) for start, _ in n_blocks)
+        record += b"".join(struct.pack("<I", size) for _, size in n_blocks)
+        record += struct.pack("<II", 0, 0)
+        packed = seq.replace("N", "T") + "T" * (-len(seq) % 4)
+        record += bytes(
+            sum("TCAG".index(base) << shift for base, shift in zip(packed[i : i + 4], (6, 4, 2, 0)))
+            for i in range(0, len(packed), 4)
+        )
+        records += record
+    path.write_bytes(header + index + records)
+
+
+def write_fasta(path: pathlib.Path, seqs: dict[str, str], line_width: int = 60):
+    with path.open("wt") as outputf:
+        for name, seq in seqs.items():
+            outputf.write(f">{name}\n")
+            for i in range(0, len(seq), line_width):
+                outputf.write(seq[i : i + line_width] + "\n")
+
+
+#: Sequences for the genome files.
+GENOME = {
+    "chr1": "NNNNACGTTGCAACGTNNACGTAC" * 5 + "AC",
+    "chr2": "GATTACA" * 20,
+    "chrM": "ACGT",
+}
+
+
+@pytest.fixture(params=["fasta", "bgzf", "2bit"])
+def genome_path(request: pytest.FixtureRequest, tmp_path: pathlib.Path) -> str:
+    if request.param == "2bit":
+        write_twobit(tmp_path / "genome.2bit", GENOME)
+        return str(tmp_path / "genome.2bit")
+    write_fasta(tmp_path / "genome.fa", GENOME)
+    if request.param == "bgzf":
+        pysam.tabix_compress(str(tmp_path / "genome.fa"), str(tmp_path / "genome.fa.gz"))
+        pysam.faidx(str(tmp_path / "genome.fa.gz"))
+        return str(tmp_path / "genome.fa.gz")
+    pysam.faidx(str(tmp_path / "genome.fa"))
+    return str(tmp_path / "genome.fa")
+
+
+@pytest.mark.parametrize(
+    "start,end", [(None, None), (0, 4), (2, 19), (5, 61), (59, 121), (100, 200), (30, 30)]
+)
+def test_open_genome(genome_path: str, start: int | None, end: int | None):
+    genome = open_genome(genome_path)
+    assert list(genome.references) == list(GENOME)
+    for name, seq in GENOME.items():
+        assert genome.fetch(name, start, end) == seq[start:end]
+
+
+def test_genome_seq_fetcher(genome_path: str):
+    seq_fetcher = GenomeSeqFetcher(genome_path, {"chr1": "NC_000001.11", "chrM": "NC_012920.1"})
+    assert seq_fetcher.fetch_seq("NC_000001.11", 3, 9) == GENOME["chr1"][3:9]
+    assert seq_fetcher.fetch_seq("NC_012920.1") == GENOME["chrM"]
+    with pytest.raises(HGVSDataNotAvailableError):
+        seq_fetcher.fetch_seq("NC_000002.12", 0, 10)
+
+
+def test_genome_seq_fetcher_transcript(genome_path: str):
+    """Transcript sequences are built from the exons, with the gaps of the alignment."""
+    seq_fetcher = GenomeSeqFetcher(genome_path, {"chr1": "NC_000001.11"})
+    with pytest.raises(HGVSDataNotAvailableError):
+        seq_fetcher.fetch_seq("NM_000001.1")
+    hdp = Mock()
+    hdp.get_tx_mapping_options.return_value = [
+        {"alt_ac": "NC_000002.12", "alt_aln_method": "splign"},
+        {"alt_ac": "NC_000001.11", "alt_aln_method": "splign"},
+    ]
+    hdp.get_tx_exons.return_value = [
+        {
+            "alt_strand": -1,
+            "ord": 1,
+            "alt_start_i": 5,
+            "alt_end_i": 12,
+            "tx_start_i": 10,
+            "tx_end_i": 18,
+            "cigar": "3=1D4=",
+        },
+        {
+            "alt_strand": -1,
+            "ord": 0,
+            "alt_start_i": 20,
+            "alt_end_i": 30,
+            "tx_start_i": 0,
+            "tx_end_i": 10,
+            "cigar": "10=",
+        },
+    ]
+    seq_fetcher.set_data_provider(hdp)
+    chr1 = GENOME["chr1"]
+    expected = reverse_complement(chr1[20:30]) + reverse_complement(chr1[5:8] + "N" + chr1[8:12])
+    assert seq_fetcher.fetch_seq("NM_000001.1") == expected
+    assert seq_fetcher.fetch_seq("NM_000001.1", 2, 12) == expected[2:12]
+    # The sequence is built once.
+    hdp.get_tx_exons.assert_called_once_with("NM_000001.1", "NC_000001.11", "splign")
+
+
+def test_driver_with_reference(
+    synthetic_data_dir: pathlib.Path, tmp_path: pathlib.Path, monkeypatch: MonkeyPatch
+):
+    data_dir = tmp_path / "data"
+    shutil.copytree(synthetic_data_dir, data_dir)
+    rng = random.Random(17)
+    chr17 = "".join(rng.choice("ACGT") for _ in range(110_000))
+    write_twobit(data_dir / "GRCh38.2bit", {"chr17": chr17})
+    monkeypatch.setattr(settings, "REFERENCE_GRCH38", "GRCh38.2bit")
+    driver = Driver(str(data_dir))
+    driver.load()
+
+    # The deletion of c.1 is anchored at the preceding base.
+    assembly, chrom, pos, ref, alt = project_to_vcf(driver, "NM_000001.1:c.1del", Assembly.GRCH38)
+    assert (assembly, chrom) == (Assembly.GRCH38, "17")
+    assert ref == chr17[pos - 1 : pos + len(ref) - 1]
+    assert len(ref) - len(alt) == 1
+    assert driver.seq_cache is not None and driver.seq_cache.misses > 0
@@ -0,0 +1,79 @@
+import os
+import pathlib
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_serve(synthetic_data_dir: pathlib.Path):
+    port = _free_port()
+    env = dict(os.environ, DATA_DIR=str(synthetic_data_dir), HAVE_SEQREPO="false")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "dotty", "serve", "--port", str(port), "--workers", "2"],
+        env=env,
+    )
+    try:
+        deadline = time.time() + 60
+        while True:
+            try:
+                response = httpx.get(
+                    f"http://127.0.0.1:{port}/api/v1/find-transcripts?hgnc_id=HGNC:1001"
+                )
+                break
+            except httpx.TransportError:
+                assert time.time() < deadline and process.poll() is None
+                time.sleep(0.2)
+        assert response.status_code == 200
+        assert [t["id"] for t in response.json()["transcripts"]] == ["NM_000001.1"]
+    finally:
+        process.send_signal(signal.SIGTERM)
+        assert process.wait(timeout=30) == 0
+
+
+def test_serve_reload(two_versions_data_dir: pathlib.Path, tmp_path: pathlib.Path):
+    port = _free_port()
+    env = dict(
+        os.environ,
+        DATA_DIR=str(two_versions_data_dir),
+        HAVE_SEQREPO="false",
+        PYTHONPATH=str(pathlib.Path(__file__).parents[1]),
+    )
+    env.pop("DATA_VERSION", None)
+    env_file = tmp_path / ".env"
+    env_file.write_text("DATA_VERSION=0.2.21\n")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "dotty", "serve", "--port", str(port), "--workers", "2"],
+        env=env,
+        cwd=tmp_path,
+    )
+    url = f"http://127.0.0.1:{port}/api/v1/find-transcripts?hgnc_id=HGNC:1001"
+    try:
+        deadline = time.time() + 60
+        while True:
+            try:
+                assert httpx.get(url).status_code == 200
+                break
+            except httpx.TransportError:
+                assert time.time() < deadline and process.poll() is None
+                time.sleep(0.2)
+
+        env_file.write_text("DATA_VERSION=0.2.99\n")
+        process.send_signal(signal.SIGHUP)
+        # The old workers serve until the new ones take over, no request fails.
+        while httpx.get(url).status_code == 200:
+            assert time.time() < deadline and process.poll() is None
+            time.sleep(0.05)
+        assert httpx.get(url).status_code == 404
+    finally:
+        process.send_signal(signal.SIGTERM)
+        assert process.wait(timeout=30) == 0
@@ -0,0 +1,91 @@
+import json
+import os
+import pathlib
+import shutil
+from unittest import mock
+
+import pytest
+from cdot.hgvs.dataproviders import JSONDataProvider
+
+from dotty.__main__ import main
+from dotty.config import settings
+from dotty.core import Assembly, Driver
+from dotty.snapshot import SnapshotDataProvider, SnapshotError, compile_snapshot
+
+
+@pytest.fixture
+def data_providers(
+    synthetic_data_dir: pathlib.Path, tmp_path: pathlib.Path
+) -> tuple[JSONDataProvider, SnapshotDataProvider]:
+    paths = [
+        str(synthetic_data_dir / f"cdot-{settings.DATA_VERSION}.{source}.grch38.json.gz")
+        for source in ("ensembl", "refseq")
+    ]
+    compile_snapshot(paths, str(tmp_path / "grch38.snapshot"))
+    with mock.patch.dict(os.environ, {"HGVS_SEQREPO_DIR": str(synthetic_data_dir / "seqrepo")}):
+        return JSONDataProvider(paths), SnapshotDataProvider(str(tmp_path / "grch38.snapshot"))
+
+
+def test_snapshot_transcripts(data_providers: tuple[JSONDataProvider, SnapshotDataProvider]):
+    json_dp, snapshot_dp = data_providers
+    assert sorted(snapshot_dp.transcripts) == sorted(json_dp.transcripts)
+    assert "NM_000001.1" in snapshot_dp.transcripts
+    assert "NM_999999.1" not in snapshot_dp.transcripts
+    assert snapshot_dp._get_transcript("NM_999999.1") is None
+    transcript = snapshot_dp.transcripts["NR_000002.1"]
+    assert transcript["gene_name"] == "GENE1"
+    assert transcript["genome_builds"]["GRCh38"]["exons"][1] == [
+        103000,
+        103102,
+        1,
+        101,
+        200,
+        "M50 D2 M50",
+    ]
+
+
+def test_snapshot_matches_json(data_providers: tuple[JSONDataProvider, SnapshotDataProvider]):
+    json_dp, snapshot_dp = data_providers
+    for tx_ac in json_dp.transcripts:
+        assert snapshot_dp.get_tx_exons(tx_ac, "NC_000017.11", "splign") == json_dp.get_tx_exons(
+            tx_ac, "NC_000017.11", "splign"
+        )
+        assert snapshot_dp.get_tx_info(tx_ac, "NC_000017.11", "splign") == json_dp.get_tx_info(
+            tx_ac, "NC_000017.11", "splign"
+        )
+        assert snapshot_dp.get_pro_ac_for_tx_ac(tx_ac) == json_dp.get_pro_ac_for_tx_ac(tx_ac)
+    for gene in ("GENE1", "GENE2", "GENE3"):
+        assert snapshot_dp.get_tx_for_gene(gene) == json_dp.get_tx_for_gene(gene)
+        assert snapshot_dp.get_gene_info(gene) == json_dp.get_gene_info(gene)
+    assert sorted(
+        snapshot_dp.get_tx_for_region("NC_000017.11", "splign", 102000, 102010),
+        key=lambda tx: tx["tx_ac"],
+    ) == sorted(
+        json_dp.get_tx_for_region("NC_000017.11", "splign", 102000, 102010),
+        key=lambda tx: tx["tx_ac"],
+    )
+
+
+def test_snapshot_invalid(tmp_path: pathlib.Path):
+    path = tmp_path / "invalid.snapshot"
+    path.write_text(json.dumps({"cdot_version": "0.2.21"}))
+    with pytest.raises(SnapshotError):
+        SnapshotDataProvider(str(path))
+
+
+def test_compile_data_and_load(
+    settings_no_seqrepo: None,
+    mock_seqrepo_fetching: None,
+    synthetic_data_dir: pathlib.Path,
+    tmp_path: pathlib.Path,
+):
+    data_dir = tmp_path / "data"
+    shutil.copytree(synthetic_data_dir, data_dir)
+    assert main(["compile-data", "--data-dir", str(data_dir)]) == 0
+
+    driver = Driver(str(data_dir))
+    driver.load()
+    for assembly in Assembly:
+        assert isinstance(driver.data_providers[assembly], SnapshotDataProvider)
+    var_c = driver.parser.parse("NM_000001.1:c.100A>G")
+    assert str(driver.assembly_mappers[Assembly.GRCH37].c_to_g(var_c)) == "NC_000017.10:g.2050A>G"
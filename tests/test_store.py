@@ -0,0 +1,115 @@
+import copy
+import pathlib
+import pickle
+
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
+
+from benchmarks import synthetic
+from dotty.config import settings
+from dotty.core import Assembly, DecodedJSONDataProvider
+from dotty.index import is_valid_transcript
+from dotty.main import Transcript
+from dotty.snapshot import load_cdot_json
+from dotty.store import CompactTranscript, _decoded, compact_transcripts
+
+TRANSCRIPT = {
+    "id": "NM_000001.1",
+    "gene_name": "GENE1",
+    "gene_version": "1",
+    "hgnc": "1",
+    "biotype": ["protein_coding"],
+    "start_codon": 2,
+    "stop_codon": 8,
+    "partial": 1,
+    "genome_builds": {
+        "GRCh38": {
+            "contig": "NC_000017.11",
+            "strand": "-",
+            "cds_start": 1005,
+            "cds_end": 2010,
+            "exons": [[1000, 1100, 1, 201, 300, "M50 I1 M49"], [2000, 2200, 0, 1, 200, None]],
+            "tag": "MANE Select",
+        }
+    },
+}
+
+
+def test_compact_transcript():
+    transcript = CompactTranscript(copy.deepcopy(TRANSCRIPT))
+    assert transcript == TRANSCRIPT
+    assert dict(transcript) == TRANSCRIPT
+    assert (
+        transcript["genome_builds"]["GRCh38"]["exons"][0]
+        == TRANSCRIPT["genome_builds"]["GRCh38"]["exons"][0]
+    )
+    assert transcript.get("protein") is None
+    assert "protein" not in transcript
+    assert "cds_start" in transcript["genome_builds"]["GRCh38"]
+    assert len(transcript) == len(TRANSCRIPT)
+    with pytest.raises(KeyError):
+        transcript["protein"]
+    assert pickle.loads(pickle.dumps(transcript)) == TRANSCRIPT
+
+
+def test_compact_transcript_shares_strings():
+    first, second = compact_transcripts(
+        {
+            tx_ac: copy.deepcopy(TRANSCRIPT)
+            for tx_ac in ["".join(["NM_000001", ".1"]), "NM_000002.1"]
+        }
+    ).values()
+    assert first["gene_name"] is second["gene_name"]
+    assert first["biotype"] == ["protein_coding"]
+    first_exons, second_exons = (tx["genome_builds"]["GRCh38"]["exons"] for tx in (first, second))
+    assert first_exons[0][5] is second_exons[0][5]
+
+
+def test_compact_transcript_memoizes_decoding():
+    first, second = (CompactTranscript(copy.deepcopy(TRANSCRIPT)) for _ in range(2))
+    first_exons = first["genome_builds"]["GRCh38"]["exons"]
+    assert first["genome_builds"] is first["genome_builds"]
+    assert first["genome_builds"]["GRCh38"]["exons"] is first_exons
+    assert second["genome_builds"]["GRCh38"]["exons"] is not first_exons
+    assert second["genome_builds"]["GRCh38"]["exons"] == first_exons
+
+
+def test_compact_transcript_contains_without_decoding():
+    alignment = CompactTranscript(copy.deepcopy(TRANSCRIPT))["genome_builds"]["GRCh38"]
+    currsize = _decoded.cache_info().currsize
+    assert "exons" in alignment
+    assert "tag" in alignment
+    assert "partial" not in alignment
+    assert _decoded.cache_info().currsize == currsize
+
+
+@pytest.fixture
+def synthetic_transcripts(tmp_path: pathlib.Path) -> dict[str, dict]:
+    synthetic.generate(tmp_path, genes=20, variants=1)
+    return load_cdot_json(str(next(tmp_path.glob("*.refseq.grch38.json.gz"))))
+
+
+def test_compact_data_provider(synthetic_transcripts: dict, monkeypatch: MonkeyPatch):
+    """The data provider answers the same with compact transcript records."""
+    monkeypatch.setattr(settings, "COMPACT_TRANSCRIPTS", False)
+    json_dp = DecodedJSONDataProvider([copy.deepcopy(synthetic_transcripts)])
+    monkeypatch.setattr(settings, "COMPACT_TRANSCRIPTS", True)
+    compact_dp = DecodedJSONDataProvider([synthetic_transcripts])
+    assert all(isinstance(tx, CompactTranscript) for tx in compact_dp.transcripts.values())
+
+    assert compact_dp.transcripts == json_dp.transcripts
+    for tx_ac, transcript in json_dp.transcripts.items():
+        contig = transcript["genome_builds"]["GRCh38"]["contig"]
+        assert compact_dp.get_tx_exons(tx_ac, contig, "splign") == json_dp.get_tx_exons(
+            tx_ac, contig, "splign"
+        )
+        assert compact_dp.get_tx_info(tx_ac, contig, "splign") == json_dp.get_tx_info(
+            tx_ac, contig, "splign"
+        )
+        assert compact_dp.get_tx_for_region(
+            contig, "splign", 1, 10**9
+        ) == json_dp.get_tx_for_region(contig, "splign", 1, 10**9)
+        if is_valid_transcript(transcript, Assembly.GRCH38):
+            assert Transcript._from_dict(
+                Assembly.GRCH38.value, compact_dp.transcripts[tx_ac]
+            ) == Transcript._from_dict(Assembly.GRCH38.value, transcript)
@@ -9,8 +9,15 @@ set -euo pipefail
 #                      default: 0.0.0.0
 #   HTTP_PORT       -- port
 #                      default: 8080
+#   HTTP_WORKERS    -- number of worker processes, forked after loading the data
+#                      default: 1
 
 HTTP_HOST=${HTTP_HOST-0.0.0.0}
 HTTP_PORT=${HTTP_PORT-8080}
+HTTP_WORKERS=${HTTP_WORKERS-1}
 
-uvicorn dotty.main:app --host $HTTP_HOST --port $HTTP_PORT
+if [[ "$HTTP_WORKERS" -gt 1 ]]; then
+    exec python -m dotty serve --host $HTTP_HOST --port $HTTP_PORT --workers $HTTP_WORKERS
+else
+    uvicorn dotty.main:app --host $HTTP_HOST --port $HTTP_PORT
+fi